@@ -55,6 +55,75 @@ CREATE TABLE "publishes" (
   "created_at" timestamp DEFAULT (now())
 );
 
+CREATE TABLE "publishes_latest" (
+  "pub_id" integer PRIMARY KEY,
+  "inst_instid" integer,
+  "indic_indicid" integer,
+  "area_areaid" integer,
+  "date_published" timestamp NOT NULL,
+  "date_from" timestamp NOT NULL,
+  "date_until" timestamp NOT NULL,
+  "value" numeric NOT NULL,
+  "is_forecast" char(1) NOT NULL,
+  "created_at" timestamp
+);
+
+CREATE TABLE "etl_watermark" (
+  "inst_instid" integer PRIMARY KEY,
+  "date_published" timestamp,
+  "content_hash" varchar(64),
+  "remote_version" varchar(255),
+  "updated_at" timestamp DEFAULT (now())
+);
+
+CREATE TABLE "etl_run" (
+  "run_id" INTEGER GENERATED BY DEFAULT AS IDENTITY UNIQUE PRIMARY KEY,
+  "inst_instid" integer,
+  "source" varchar(24) NOT NULL,
+  "mode" varchar(3) NOT NULL,
+  "status" varchar(16) NOT NULL,
+  "started_at" timestamp NOT NULL,
+  "finished_at" timestamp,
+  "rows_extracted" bigint,
+  "rows_transformed" bigint,
+  "rows_inserted" bigint,
+  "rows_skipped" bigint,
+  "bytes_downloaded" bigint,
+  "extract_seconds" double precision,
+  "transform_seconds" double precision,
+  "load_seconds" double precision,
+  "content_hash" varchar(64),
+  "error" text
+);
+
+CREATE TABLE "forecast_accuracy" (
+  "forecast_pub_id" integer PRIMARY KEY,
+  "inst_instid" integer,
+  "indic_indicid" integer,
+  "area_areaid" integer,
+  "date_published" timestamp NOT NULL,
+  "date_from" timestamp NOT NULL,
+  "date_until" timestamp NOT NULL,
+  "horizon" integer NOT NULL,
+  "forecast_value" double precision NOT NULL,
+  "actual_pub_id" integer NOT NULL,
+  "actual_value" double precision NOT NULL,
+  "actual_date_published" timestamp NOT NULL,
+  "error" double precision NOT NULL,
+  "abs_error" double precision NOT NULL,
+  "refreshed_at" timestamp NOT NULL
+);
+
+CREATE TABLE "forecast_accuracy_refresh" (
+  "refresh_id" INTEGER GENERATED BY DEFAULT AS IDENTITY UNIQUE PRIMARY KEY,
+  "mode" varchar(11) NOT NULL,
+  "last_created_at" timestamp,
+  "keys_refreshed" bigint,
+  "rows_refreshed" bigint,
+  "started_at" timestamp NOT NULL,
+  "finished_at" timestamp
+);
+
 CREATE TABLE "mapping" (
   "map_id" INTEGER GENERATED BY DEFAULT AS IDENTITY UNIQUE PRIMARY KEY,
   "indic_indicid" integer,
@@ -84,14 +153,44 @@ COMMENT ON COLUMN "publishes"."pub_id" IS 'Auto incremental';
 
 COMMENT ON COLUMN "mapping"."map_id" IS 'Auto incremental';
 
+COMMENT ON COLUMN "etl_run"."run_id" IS 'Auto incremental';
+
+COMMENT ON COLUMN "forecast_accuracy_refresh"."refresh_id" IS 'Auto incremental';
+
 ALTER TABLE "indicator" ADD FOREIGN KEY ("inst_instid") REFERENCES "institution" ("instid");
 
 ALTER TABLE "publishes" ADD FOREIGN KEY ("inst_instid") REFERENCES "institution" ("instid");
 
 ALTER TABLE "publishes" ADD FOREIGN KEY ("indic_indicid") REFERENCES "indicator" ("indicid");
 
+ALTER TABLE "etl_watermark" ADD FOREIGN KEY ("inst_instid") REFERENCES "institution" ("instid");
+
+ALTER TABLE "etl_run" ADD FOREIGN KEY ("inst_instid") REFERENCES "institution" ("instid");
+
 ALTER TABLE "mapping" ADD FOREIGN KEY ("indic_indicid") REFERENCES "indicator" ("indicid");
 
 ALTER TABLE "mapping" ADD FOREIGN KEY ("uindic_indicid") REFERENCES "unified_indicator" ("uindicid");
 
 ALTER TABLE "publishes" ADD FOREIGN KEY ("area_areaid") REFERENCES "area" ("areaid");
+
+CREATE UNIQUE INDEX "publishes_natural_key_uidx" ON "publishes" ("inst_instid", "indic_indicid", "area_areaid", "date_from", "date_until", "date_published");
+
+CREATE INDEX "publishes_inst_published_idx" ON "publishes" ("inst_instid", "date_published");
+
+CREATE INDEX "publishes_indicator_area_idx" ON "publishes" ("indic_indicid", "area_areaid", "date_from");
+
+CREATE INDEX "publishes_created_at_idx" ON "publishes" ("created_at");
+
+CREATE INDEX "publishes_published_idx" ON "publishes" ("date_published");
+
+CREATE INDEX "publishes_area_idx" ON "publishes" ("area_areaid");
+
+CREATE UNIQUE INDEX "publishes_latest_key_uidx" ON "publishes_latest" ("indic_indicid", "area_areaid", "date_from", "date_until", "inst_instid");
+
+CREATE INDEX "publishes_latest_inst_idx" ON "publishes_latest" ("inst_instid", "pub_id");
+
+CREATE INDEX "etl_run_source_started_idx" ON "etl_run" ("source", "started_at");
+
+CREATE INDEX "forecast_accuracy_key_idx" ON "forecast_accuracy" ("indic_indicid", "area_areaid", "date_from", "date_until");
+
+CREATE INDEX "forecast_accuracy_inst_horizon_idx" ON "forecast_accuracy" ("inst_instid", "horizon");
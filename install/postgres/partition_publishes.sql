@@ -0,0 +1,65 @@
+-- Optional: convert publishes into a table partitioned by range of date_published (one partition per year).
+-- The original table is kept as publishes_unpartitioned and can be dropped once the new layout is verified.
+-- Run through `python manage.py build_publishes_indexes --partition` or from psql as the database owner.
+DO $$
+DECLARE
+    first_year integer;
+    last_year integer;
+    partition_year integer;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_class WHERE relname = 'publishes' AND relkind = 'p') THEN
+        RAISE NOTICE 'publishes is already partitioned';
+        RETURN;
+    END IF;
+
+    ALTER TABLE publishes RENAME TO publishes_unpartitioned;
+    ALTER INDEX IF EXISTS publishes_pkey RENAME TO publishes_unpartitioned_pkey;
+    ALTER INDEX IF EXISTS publishes_pub_id_key RENAME TO publishes_unpartitioned_pub_id_key;
+    ALTER INDEX IF EXISTS publishes_natural_key_uidx RENAME TO publishes_unpartitioned_natural_key_uidx;
+    ALTER INDEX IF EXISTS publishes_inst_published_idx RENAME TO publishes_unpartitioned_inst_published_idx;
+    ALTER INDEX IF EXISTS publishes_indicator_area_idx RENAME TO publishes_unpartitioned_indicator_area_idx;
+    ALTER INDEX IF EXISTS publishes_created_at_idx RENAME TO publishes_unpartitioned_created_at_idx;
+    ALTER INDEX IF EXISTS publishes_published_idx RENAME TO publishes_unpartitioned_published_idx;
+    ALTER INDEX IF EXISTS publishes_area_idx RENAME TO publishes_unpartitioned_area_idx;
+
+    CREATE SEQUENCE publishes_partitioned_pub_id_seq AS integer;
+    PERFORM setval('publishes_partitioned_pub_id_seq', COALESCE((SELECT max(pub_id) FROM publishes_unpartitioned), 0) + 1, false);
+
+    CREATE TABLE publishes (
+      pub_id integer NOT NULL DEFAULT nextval('publishes_partitioned_pub_id_seq'),
+      inst_instid integer REFERENCES institution (instid),
+      indic_indicid integer REFERENCES indicator (indicid),
+      area_areaid integer REFERENCES area (areaid),
+      date_published timestamp NOT NULL,
+      date_from timestamp NOT NULL,
+      date_until timestamp NOT NULL,
+      value numeric NOT NULL,
+      is_forecast char(1) NOT NULL,
+      created_at timestamp DEFAULT (now()),
+      PRIMARY KEY (pub_id, date_published)
+    ) PARTITION BY RANGE (date_published);
+    ALTER SEQUENCE publishes_partitioned_pub_id_seq OWNED BY publishes.pub_id;
+
+    SELECT COALESCE(min(extract(year FROM date_published))::integer, extract(year FROM now())::integer),
+           COALESCE(max(extract(year FROM date_published))::integer, extract(year FROM now())::integer)
+    INTO first_year, last_year
+    FROM publishes_unpartitioned;
+
+    -- Partitions for the stored vintages plus the next five years, anything else lands in the default partition
+    FOR partition_year IN first_year .. greatest(last_year, extract(year FROM now())::integer) + 5 LOOP
+        EXECUTE format('CREATE TABLE publishes_y%s PARTITION OF publishes FOR VALUES FROM (%L) TO (%L)',
+                       partition_year, make_date(partition_year, 1, 1), make_date(partition_year + 1, 1, 1));
+    END LOOP;
+    CREATE TABLE publishes_default PARTITION OF publishes DEFAULT;
+
+    INSERT INTO publishes SELECT * FROM publishes_unpartitioned;
+
+    CREATE UNIQUE INDEX publishes_natural_key_uidx ON publishes (inst_instid, indic_indicid, area_areaid, date_from, date_until, date_published);
+    CREATE INDEX publishes_inst_published_idx ON publishes (inst_instid, date_published);
+    CREATE INDEX publishes_indicator_area_idx ON publishes (indic_indicid, area_areaid, date_from);
+    CREATE INDEX publishes_created_at_idx ON publishes (created_at);
+    CREATE INDEX publishes_published_idx ON publishes (date_published);
+    CREATE INDEX publishes_area_idx ON publishes (area_areaid);
+    ANALYZE publishes;
+END;
+$$;
@@ -1,11 +1,129 @@
-CREATE OR REPLACE FUNCTION save_publications()
-RETURNS VOID AS $$
+-- Incremental snapshots of publishes.
+-- Every call of save_publications() copies only the rows inserted (pub_id) or rewritten (created_at)
+-- since the previous snapshot into publishes_save, tagged with the id of the new snapshot.
+-- restore_publications(snapshot_id) brings publishes back to its state at that snapshot.
+
+CREATE TABLE IF NOT EXISTS publishes_snapshot (
+  "snapshot_id" INTEGER GENERATED BY DEFAULT AS IDENTITY UNIQUE PRIMARY KEY,
+  "label" varchar(255),
+  "started_at" timestamp NOT NULL,
+  "finished_at" timestamp,
+  "max_pub_id" integer,
+  "max_created_at" timestamp,
+  "rows_copied" bigint,
+  "duration" interval
+);
+
+-- publishes_save used to be a full copy of publishes, its rows are kept as the baseline (snapshot_id NULL)
+CREATE TABLE IF NOT EXISTS publishes_save (LIKE publishes INCLUDING DEFAULTS);
+ALTER TABLE publishes_save ADD COLUMN IF NOT EXISTS "snapshot_id" integer;
+ALTER TABLE publishes_save ADD COLUMN IF NOT EXISTS "is_rewrite" boolean NOT NULL DEFAULT false;
+CREATE INDEX IF NOT EXISTS publishes_save_pub_id_idx ON publishes_save (pub_id, snapshot_id);
+CREATE INDEX IF NOT EXISTS publishes_save_rewrite_idx ON publishes_save (pub_id) WHERE is_rewrite;
+CREATE INDEX IF NOT EXISTS publishes_save_created_at_idx ON publishes_save (created_at);
+
+DROP FUNCTION IF EXISTS save_publications();
+DROP FUNCTION IF EXISTS save_publications(varchar);
+
+CREATE OR REPLACE FUNCTION save_publications(p_label varchar DEFAULT NULL)
+RETURNS TABLE (snapshot_id integer, rows_copied bigint, duration interval) AS $$
+DECLARE
+    v_started_at timestamp := clock_timestamp();
+    v_snapshot_id integer;
+    v_last_pub_id integer;
+    v_last_created_at timestamp;
+    v_rows bigint;
 BEGIN
-    -- Step 1: Drop the target table if it exists
-    DROP TABLE IF EXISTS publishes_save;
+    -- Step 1: High-water marks of the rows already saved
+    SELECT COALESCE(max(s.pub_id), 0), COALESCE(max(s.created_at), '-infinity')
+    INTO v_last_pub_id, v_last_created_at
+    FROM publishes_save s;
+
+    INSERT INTO publishes_snapshot (label, started_at)
+    VALUES (p_label, v_started_at)
+    RETURNING publishes_snapshot.snapshot_id INTO v_snapshot_id;
+
+    -- Step 2: Copy the rows inserted or rewritten since then
+    INSERT INTO publishes_save (pub_id, inst_instid, indic_indicid, area_areaid, date_published,
+                                date_from, date_until, value, is_forecast, created_at, snapshot_id, is_rewrite)
+    SELECT p.pub_id, p.inst_instid, p.indic_indicid, p.area_areaid, p.date_published,
+           p.date_from, p.date_until, p.value, p.is_forecast, p.created_at, v_snapshot_id,
+           p.pub_id <= v_last_pub_id
+    FROM publishes p
+    WHERE p.pub_id > v_last_pub_id
+       OR p.created_at > v_last_created_at;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    -- Step 3: Record the metrics and the state of publishes at this snapshot
+    UPDATE publishes_snapshot ps
+    SET finished_at = clock_timestamp(),
+        max_pub_id = (SELECT max(p.pub_id) FROM publishes p),
+        max_created_at = (SELECT max(p.created_at) FROM publishes p),
+        rows_copied = v_rows,
+        duration = clock_timestamp() - v_started_at
+    WHERE ps.snapshot_id = v_snapshot_id;
+
+    RETURN QUERY
+    SELECT ps.snapshot_id, ps.rows_copied, ps.duration
+    FROM publishes_snapshot ps
+    WHERE ps.snapshot_id = v_snapshot_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION restore_publications(p_snapshot_id integer)
+RETURNS TABLE (rows_deleted bigint, rows_restored bigint) AS $$
+DECLARE
+    v_max_pub_id integer;
+    v_max_created_at timestamp;
+    v_deleted bigint;
+    v_restored bigint;
+    v_reinserted bigint;
+BEGIN
+    SELECT COALESCE(ps.max_pub_id, 0), COALESCE(ps.max_created_at, '-infinity')
+    INTO v_max_pub_id, v_max_created_at
+    FROM publishes_snapshot ps
+    WHERE ps.snapshot_id = p_snapshot_id;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Snapshot % does not exist', p_snapshot_id;
+    END IF;
+
+    -- Step 1: Rows inserted after the snapshot
+    DELETE FROM publishes p WHERE p.pub_id > v_max_pub_id;
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+
+    -- Step 2: Rows rewritten after the snapshot, or by an earlier restore, get back the version saved at or before it
+    UPDATE publishes p
+    SET value = s.value,
+        is_forecast = s.is_forecast,
+        created_at = s.created_at
+    FROM (
+        SELECT DISTINCT ON (ps.pub_id) ps.*
+        FROM publishes_save ps
+        WHERE COALESCE(ps.snapshot_id, 0) <= p_snapshot_id
+          AND ps.pub_id <= v_max_pub_id
+          AND ps.pub_id IN (SELECT pc.pub_id FROM publishes pc WHERE pc.created_at > v_max_created_at
+                            UNION
+                            SELECT r.pub_id FROM publishes_save r WHERE r.is_rewrite)
+        ORDER BY ps.pub_id, ps.snapshot_id DESC NULLS LAST
+    ) s
+    WHERE p.pub_id = s.pub_id;
+    GET DIAGNOSTICS v_restored = ROW_COUNT;
+
+    -- Step 3: Rows deleted after the snapshot
+    INSERT INTO publishes (pub_id, inst_instid, indic_indicid, area_areaid, date_published,
+                           date_from, date_until, value, is_forecast, created_at)
+    SELECT s.pub_id, s.inst_instid, s.indic_indicid, s.area_areaid, s.date_published,
+           s.date_from, s.date_until, s.value, s.is_forecast, s.created_at
+    FROM (
+        SELECT DISTINCT ON (ps.pub_id) ps.*
+        FROM publishes_save ps
+        WHERE COALESCE(ps.snapshot_id, 0) <= p_snapshot_id
+          AND ps.pub_id <= v_max_pub_id
+        ORDER BY ps.pub_id, ps.snapshot_id DESC NULLS LAST
+    ) s
+    WHERE NOT EXISTS (SELECT 1 FROM publishes p WHERE p.pub_id = s.pub_id);
+    GET DIAGNOSTICS v_reinserted = ROW_COUNT;
 
-    -- Step 2: Create the target table and insert all data from the source table
-    CREATE TABLE publishes_save AS
-    SELECT * FROM publishes;
+    RETURN QUERY SELECT v_deleted, v_restored + v_reinserted;
 END;
 $$ LANGUAGE plpgsql;
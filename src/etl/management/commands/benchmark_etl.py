@@ -0,0 +1,153 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from .include.base import BASE_DIR
+from .include.oecd import OECDClient
+from .include.imf import IMFClient
+from .include.philadephia import PhiladelphiaClient
+from .include.ecb import ECBClient
+from .include.benchmark import (StandInServer, SyntheticData, ensure_fixtures, ensure_areas, measure_phase,
+                                compare, baseline_key)
+from indicator.models import Indicator
+from pathlib import Path
+import gc
+import json
+import logging
+import tempfile
+
+SOURCES = ('oecd', 'imf', 'ecb', 'philadelphia')
+PHASES = ('extract', 'transform', 'load')
+# Apps whose unmanaged tables are created on the fly on SQLite
+ETL_APPS = ('institution', 'indicator', 'geography', 'etl')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = """Benchmark the extract, transform and load phases of every source offline.
+    Synthetic OECD SDMX CSV, IMF datamapper JSON and ECB/Philadelphia Fed pages are served by a
+    local HTTP server; each source runs at every scale (rows of the OECD and IMF data, the ECB and
+    Philadelphia pages have a fixed size) against the configured database, inside a transaction
+    that is rolled back. Throughput and peak RSS of every phase are compared to a baseline file."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', nargs='+', choices=SOURCES, default=list(SOURCES),
+                            help='Sources to benchmark (default all)')
+        parser.add_argument('--scale', nargs='+', type=int, default=[10_000, 100_000],
+                            help='Rows of the OECD and IMF data, e.g. 10000 1000000 5000000 (default 10000 100000)')
+        parser.add_argument('--baseline', type=Path, default=BASE_DIR / 'data' / 'benchmark_baseline.json',
+                            help='Baseline file (default data/benchmark_baseline.json)')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Record the results as the new baseline instead of comparing them')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed throughput drop / peak RSS growth against the baseline (default 0.25)')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['verbosity'] < 2:
+            logging.disable(logging.INFO)
+        results = []
+        try:
+            with StandInServer() as server, tempfile.TemporaryDirectory(prefix='etl-benchmark-') as tmp:
+                for source in kwargs['source']:
+                    scales = kwargs['scale'] if source in ('oecd', 'imf') else [0]
+                    for scale in scales:
+                        results.extend(self.run_source(server, Path(tmp) / f"{source}-{scale}", source, scale))
+        finally:
+            logging.disable(logging.NOTSET)
+        self.report(results)
+        vendor = connection.vendor
+        baseline_path = Path(kwargs['baseline'])
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        if kwargs['save_baseline']:
+            baseline.update({baseline_key(vendor, result): {'rows_per_second': result['rows_per_second'],
+                                                            'peak_rss_mb': result['peak_rss_mb']}
+                             for result in results})
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline_path}"))
+            return
+        if not baseline:
+            self.stdout.write(f"No baseline at {baseline_path}, run with --save-baseline to record one")
+            return
+        regressions = compare(results, baseline, vendor, kwargs['tolerance'])
+        if regressions:
+            raise CommandError("Performance regressions:\n" + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regression against the baseline"))
+
+    def run_source(self, server, directory, source, scale):
+        self.stdout.write(f"Benchmarking {source}" + (f" at {scale:,} rows" if scale else ''))
+        data = SyntheticData(directory / 'served', server, scale or 1)
+        endpoints = {
+            'OECD_ENDPOINT': f"{server.url}/oecd",
+            'OECD_SEARCH_ENDPOINT': f"{server.url}{server.search_path}",
+            'IMF_ENDPOINT': f"{server.url}/imf",
+            'ECB_ENDPOINT': f"{server.url}/ecb/table_3_{{year}}q{{quarter}}.en.html",
+            'PHILADELPHIA_ENDPOINT': f"{server.url}/philadelphia/spf-q{{quarter}}-{{year}}",
+        }
+        results = []
+        with override_settings(ETL_DATA_DIR=str(directory / 'data'), HTTP_CACHE_ENABLED=False, **endpoints):
+            self.ensure_tables()
+            try:
+                with transaction.atomic():
+                    client = self.prepare(source, data)
+                    for phase in PHASES:
+                        gc.collect()
+                        results.append(measure_phase(client, phase, source, scale))
+                    raise Rollback
+            except Rollback:
+                pass
+        return results
+
+    def prepare(self, source, data):
+        """
+        Creates the fixtures of source, writes its synthetic responses and returns its client.
+
+        """
+        institution = ensure_fixtures(source)
+        if source == 'oecd':
+            ensure_areas(data.area_codes(data.oecd_areas()))
+            data.oecd()
+            return OECDClient('etl')
+        if source == 'imf':
+            # The client requests every IMF indicator of the database
+            indicators = sorted(set(Indicator.objects.filter(inst_instid=institution)
+                                    .values_list('abbreviation', flat=True)))
+            ensure_areas(data.area_codes(data.imf_areas(len(indicators))))
+            data.imf(indicators)
+            return IMFClient('etl')
+        year, quarter = 2024, 4
+        if source == 'ecb':
+            data.ecb()
+            return ECBClient(settings.ECB_ENDPOINT.format(year=year, quarter=quarter), 'etl')
+        data.philadelphia()
+        return PhiladelphiaClient(settings.PHILADELPHIA_ENDPOINT.format(year=year, quarter=quarter), 'etl')
+
+    def ensure_tables(self):
+        """
+        The tables are created by install/postgres/3. create_tables.sql, on other backends
+        (SQLite) the missing ones are created from the models.
+
+        """
+        existing = set(connection.introspection.table_names())
+        if connection.vendor == 'postgresql':
+            if 'publishes' not in existing:
+                raise CommandError("Run install/postgres/3. create_tables.sql first")
+            return
+        with connection.schema_editor() as schema_editor:
+            for model in apps.get_models():
+                if model._meta.app_label in ETL_APPS and model._meta.db_table not in existing:
+                    schema_editor.create_model(model)
+
+    def report(self, results):
+        self.stdout.write(f"{'source':<14}{'scale':>10}{'phase':>11}{'rows':>11}{'seconds':>10}"
+                          f"{'rows/s':>12}{'peak MB':>10}{'MB down':>10}")
+        for result in results:
+            rows_per_second = f"{result['rows_per_second']:>12,.0f}" if result['rows_per_second'] else f"{'-':>12}"
+            downloaded = f"{result['bytes_downloaded'] / 1024 / 1024:>10.1f}" if result['bytes_downloaded'] else f"{'-':>10}"
+            self.stdout.write(f"{result['source']:<14}{result['scale'] or '-':>10}{result['phase']:>11}"
+                              f"{result['rows'] or 0:>11,}{result['wall_seconds']:>10.2f}{rows_per_second}"
+                              f"{result['peak_rss_mb'] or 0:>10.0f}{downloaded}")
@@ -0,0 +1,129 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.conf import settings
+from pathlib import Path
+REL_PATH_PARTITION_SCRIPT = 'install/postgres/partition_publishes.sql'
+
+# Every index is listed with a query of the access pattern it serves, used to verify it with EXPLAIN
+PUBLISHES_INDEXES = [
+    {
+        'name': 'publishes_natural_key_uidx',
+        'definition': 'UNIQUE INDEX {concurrently} IF NOT EXISTS publishes_natural_key_uidx ON publishes '
+                      '(inst_instid, indic_indicid, area_areaid, date_from, date_until, date_published)',
+        # History lookup of the loader (inst, indicator, area, date_from) is served by this prefix
+        'query': "SELECT value FROM publishes WHERE inst_instid = 1 AND indic_indicid = 1 AND area_areaid = 1 "
+                 "AND date_from = '2000-01-01' AND date_until = '2001-01-01' AND is_forecast = 'N' "
+                 "ORDER BY date_published DESC LIMIT 1",
+    },
+    {
+        'name': 'publishes_inst_published_idx',
+        'definition': 'INDEX {concurrently} IF NOT EXISTS publishes_inst_published_idx ON publishes '
+                      '(inst_instid, date_published)',
+        # Latest vintage per institution (OECDClient.get_last_update)
+        'query': "SELECT date_published FROM publishes WHERE inst_instid = 1 ORDER BY date_published DESC LIMIT 1",
+    },
+    {
+        'name': 'publishes_indicator_area_idx',
+        'definition': 'INDEX {concurrently} IF NOT EXISTS publishes_indicator_area_idx ON publishes '
+                      '(indic_indicid, area_areaid, date_from)',
+        # Series of an indicator across vintages (admin filtering and searches by indicator)
+        'query': "SELECT value FROM publishes WHERE indic_indicid = 1 AND area_areaid = 1 ORDER BY date_from",
+    },
+    {
+        'name': 'publishes_created_at_idx',
+        'definition': 'INDEX {concurrently} IF NOT EXISTS publishes_created_at_idx ON publishes (created_at)',
+        # Admin changelist ordering
+        'query': "SELECT pub_id FROM publishes ORDER BY created_at DESC LIMIT 100",
+    },
+    {
+        'name': 'publishes_published_idx',
+        'definition': 'INDEX {concurrently} IF NOT EXISTS publishes_published_idx ON publishes (date_published)',
+        # Vintage filters of the admin (date hierarchy) and of the query API across institutions
+        'query': "SELECT pub_id FROM publishes WHERE date_published >= '2024-01-01' AND date_published < '2025-01-01'",
+    },
+    {
+        'name': 'publishes_area_idx',
+        'definition': 'INDEX {concurrently} IF NOT EXISTS publishes_area_idx ON publishes (area_areaid)',
+        # Admin search and query API filter by area code
+        'query': "SELECT pub_id FROM publishes WHERE area_areaid = 1",
+    },
+]
+
+
+class Command(BaseCommand):
+    help = """Build the composite indexes of the publishes table without blocking writes
+    (CREATE INDEX CONCURRENTLY) and verify with EXPLAIN that every access pattern can use its index.
+    Optionally converts publishes into a table partitioned by date_published."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partition', action='store_true',
+                            help=f'Partition publishes by year of date_published ({REL_PATH_PARTITION_SCRIPT})')
+        parser.add_argument('--skip-verify', action='store_true',
+                            help='Do not verify the indexes with EXPLAIN')
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Indexes can only be built on PostgreSQL")
+        if kwargs['partition']:
+            self.partition()
+        partitioned = self.is_partitioned()
+        for index in PUBLISHES_INDEXES:
+            self.build_index(index, partitioned)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE publishes")
+        if not kwargs['skip_verify']:
+            self.verify()
+        self.stdout.write(self.style.SUCCESS('Publishes indexes are in place.'))
+
+    def partition(self):
+        script = Path(settings.BASE_DIR.parent.resolve() / REL_PATH_PARTITION_SCRIPT)
+        if not script.exists():
+            raise CommandError(f"File {script} not found.")
+        self.stdout.write(f'Partitioning publishes with {script}')
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(script.read_text())
+        self.stdout.write(self.style.SUCCESS(
+            'Publishes partitioned, the previous table is kept as publishes_unpartitioned.'))
+
+    def is_partitioned(self) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = 'publishes'::regclass")
+            return cursor.fetchone()[0] == 'p'
+
+    def build_index(self, index, partitioned):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT idx.indisvalid FROM pg_index idx JOIN pg_class c ON c.oid = idx.indexrelid "
+                           "WHERE c.relname = %s", [index['name']])
+            row = cursor.fetchone()
+            if row is not None and row[0]:
+                self.stdout.write(f"Index {index['name']} already exists")
+                return
+            if row is not None:
+                # Left behind invalid by an interrupted concurrent build
+                self.stdout.write(f"Index {index['name']} is invalid, rebuilding")
+                cursor.execute(f"DROP INDEX {'' if partitioned else 'CONCURRENTLY'} {index['name']}")
+            # Partitioned tables do not support concurrent builds
+            concurrently = '' if partitioned else 'CONCURRENTLY'
+            self.stdout.write(f"Building index {index['name']}")
+            cursor.execute('CREATE ' + index['definition'].format(concurrently=concurrently))
+
+    def verify(self):
+        failed = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Small tables are scanned sequentially anyway, only check that the index is usable
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            for index in PUBLISHES_INDEXES:
+                # On a partitioned table the plan refers to the indexes of the partitions
+                cursor.execute("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                               "WHERE i.inhparent = %s::regclass", [index['name']])
+                index_names = [index['name']] + [row[0] for row in cursor.fetchall()]
+                cursor.execute("EXPLAIN " + index['query'])
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                index_lines = [line.strip() for line in plan.splitlines() if any(name in line for name in index_names)]
+                if index_lines:
+                    self.stdout.write(f"{index['name']}: {index_lines[0]}")
+                else:
+                    failed.append(index['name'])
+                    self.stderr.write(f"{index['name']} is not used by its query:\n{plan}")
+        if failed:
+            raise CommandError(f"Indexes not used by their queries: {', '.join(failed)}")
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from indicator.export import EXPORT_FORMATS, export_chunks, pa
+from indicator.query import DATE_FILTERS, LIST_FILTERS, QueryError, publication_filters
+from pathlib import Path
+import sys
+import time
+
+
+class Command(BaseCommand):
+    help = """Export publications with the codes of their institution, indicator and area to CSV or Parquet.
+    Rows are read with a server-side cursor and written in chunks, so any export runs in constant memory.
+    Filters are the ones of the query API (/api/publications/)."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default=None,
+                            help='Output format (default taken from the suffix of --output, else csv)')
+        parser.add_argument('--output', default='-',
+                            help='Output file (default standard output)')
+        for name in [*LIST_FILTERS, *DATE_FILTERS]:
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name,
+                                help='Comma separated values' if name in LIST_FILTERS else 'YYYY-MM-DD')
+        parser.add_argument('--is-forecast', dest='is_forecast', choices=('Y', 'N'))
+
+    def handle(self, *args, **kwargs):
+        output = kwargs['output']
+        export_format = kwargs['format']
+        if export_format is None:
+            suffixes = {options['suffix']: name for name, options in EXPORT_FORMATS.items()}
+            export_format = suffixes.get(Path(output).suffix, 'csv')
+        if export_format == 'parquet' and pa is None:
+            raise CommandError("Parquet exports require pyarrow")
+        try:
+            filters = publication_filters({name: kwargs.get(name) for name in [*LIST_FILTERS, *DATE_FILTERS,
+                                                                              'is_forecast']})
+        except QueryError as e:
+            raise CommandError(str(e))
+        start = time.perf_counter()
+        written = 0
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for chunk in export_chunks(filters, export_format):
+                stream.write(chunk)
+                written += len(chunk)
+        finally:
+            if output != '-':
+                stream.close()
+        self.stderr.write(self.style.SUCCESS(
+            f"Exported {written / 1024 / 1024:.1f} MB of {export_format} to {output} "
+            f"in {time.perf_counter() - start:.2f}s"))
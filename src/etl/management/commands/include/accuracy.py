@@ -0,0 +1,145 @@
+import logging
+from typing import Dict, List, Optional
+from django.db import connection, transaction
+from django.utils import timezone
+from etl.models import AccuracyRefresh
+from .loader import drop_temporary_tables
+
+# Keys of publishes inserted or rewritten since the last refresh (the loader stamps created_at on both):
+# their forecasts are compared again
+DIRTY_KEYS_SQL = """
+    CREATE TEMPORARY TABLE accuracy_dirty_keys ON COMMIT DROP AS
+    SELECT DISTINCT indic_indicid, area_areaid, date_from, date_until
+    FROM publishes
+    WHERE created_at >= %s AND indic_indicid IS NOT NULL AND area_areaid IS NOT NULL
+"""
+
+DELETE_DIRTY_SQL = """
+    DELETE FROM forecast_accuracy a
+    USING accuracy_dirty_keys d
+    WHERE a.indic_indicid = d.indic_indicid AND a.area_areaid = d.area_areaid
+      AND a.date_from = d.date_from AND a.date_until = d.date_until
+"""
+
+# Latest realized value of every (indicator, area, period), restricted to the dirty keys by {dirty_join}
+# in incremental refreshes. Materialized once rather than as a CTE, which each parallel worker of the
+# insert would sort again
+ACTUALS_SQL = """
+    CREATE TEMPORARY TABLE accuracy_actuals ON COMMIT DROP AS
+    SELECT DISTINCT ON (p.indic_indicid, p.area_areaid, p.date_from, p.date_until)
+           p.indic_indicid, p.area_areaid, p.date_from, p.date_until,
+           p.pub_id, p.value, p.date_published
+    FROM publishes p
+    {dirty_join}
+    WHERE p.is_forecast = 'N'
+    ORDER BY p.indic_indicid, p.area_areaid, p.date_from, p.date_until, p.date_published DESC, p.pub_id DESC
+"""
+DIRTY_JOIN = "JOIN accuracy_dirty_keys d USING (indic_indicid, area_areaid, date_from, date_until)"
+
+# Every forecast joined to the latest actual of its key; the horizon is counted in quarters from the
+# vintage to the last day of the period (date_until is the start of the next one)
+INSERT_ACCURACY_SQL = """
+    INSERT INTO forecast_accuracy (forecast_pub_id, inst_instid, indic_indicid, area_areaid, date_published,
+                                   date_from, date_until, horizon, forecast_value, actual_pub_id, actual_value,
+                                   actual_date_published, error, abs_error, refreshed_at)
+    SELECT f.pub_id, f.inst_instid, f.indic_indicid, f.area_areaid, f.date_published,
+           f.date_from, f.date_until,
+           (EXTRACT(YEAR FROM f.date_until - interval '1 day') * 4
+            + EXTRACT(QUARTER FROM f.date_until - interval '1 day'))
+           - (EXTRACT(YEAR FROM f.date_published) * 4 + EXTRACT(QUARTER FROM f.date_published)),
+           f.value, a.pub_id, a.value, a.date_published,
+           f.value - a.value, abs(f.value - a.value), %s
+    FROM publishes f
+    JOIN accuracy_actuals a USING (indic_indicid, area_areaid, date_from, date_until)
+    WHERE f.is_forecast = 'Y'
+"""
+
+SUMMARY_SQL = """
+    SELECT i.abbreviation, a.horizon, count(*), avg(a.error), avg(a.abs_error), sqrt(avg(a.error * a.error))
+    FROM forecast_accuracy a
+    JOIN institution i ON i.instid = a.inst_instid
+    {where}
+    GROUP BY i.abbreviation, a.horizon
+    ORDER BY i.abbreviation, a.horizon
+"""
+
+
+class AccuracyEngine:
+    """
+    Compares the forecasts of publishes with the realized values and materializes the errors in
+    forecast_accuracy: one row per forecast whose (indicator, area, period) has a realized value,
+    joined to the latest vintage of that value. Set-based SQL, PostgreSQL only.
+
+    A refresh only revisits the keys with rows inserted or rewritten by the loader since the previous
+    refresh (created_at from the last_created_at recorded in forecast_accuracy_refresh): new or revised
+    forecasts, and new or revised actuals that change the error of every older forecast of the key.
+    A full refresh rebuilds the table, e.g. after rows were deleted from publishes.
+
+    Args:
+        logger (logging.Logger, optional): Logger for progress messages
+
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+
+    def refresh(self, full: bool = False) -> AccuracyRefresh:
+        started_at = timezone.now()
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Concurrent refreshes would compare the same keys against the same watermark
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('forecast_accuracy'))")
+            previous = None if full else AccuracyRefresh.objects.order_by('-refresh_id').first()
+            since = previous.last_created_at if previous is not None else None
+            cursor.execute("SELECT max(created_at) FROM publishes")
+            last_created_at = cursor.fetchone()[0]
+            # The latest actuals are found by sorting the realized values of the keys
+            cursor.execute("SET LOCAL work_mem = '256MB'")
+            drop_temporary_tables(cursor, 'accuracy_dirty_keys', 'accuracy_actuals')
+            if since is None:
+                cursor.execute("TRUNCATE forecast_accuracy")
+                keys = None
+                cursor.execute(ACTUALS_SQL.format(dirty_join=''))
+            else:
+                cursor.execute(DIRTY_KEYS_SQL, [since])
+                keys = cursor.rowcount
+                cursor.execute("ANALYZE accuracy_dirty_keys")
+                cursor.execute(DELETE_DIRTY_SQL)
+                cursor.execute(ACTUALS_SQL.format(dirty_join=DIRTY_JOIN))
+            cursor.execute("ANALYZE accuracy_actuals")
+            cursor.execute(INSERT_ACCURACY_SQL, [started_at])
+            rows = cursor.rowcount
+            refresh = AccuracyRefresh.objects.create(
+                mode='incremental' if since is not None else 'full',
+                last_created_at=last_created_at,
+                keys_refreshed=keys,
+                rows_refreshed=rows,
+                started_at=started_at,
+                finished_at=timezone.now())
+        self.logger.info(f"Forecast accuracy {refresh.mode} refresh: {keys if keys is not None else 'all'} keys and {rows} forecasts "
+                         f"up to created_at {last_created_at} in {(refresh.finished_at - started_at).total_seconds():.2f}s")
+        return refresh
+
+    def summary(self, institutions: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Bias (mean error), MAE and RMSE of the forecasts by institution and horizon (quarters).
+
+        """
+        where, params = '', []
+        if institutions:
+            where, params = 'WHERE i.abbreviation = ANY(%s)', [list(institutions)]
+        with connection.cursor() as cursor:
+            cursor.execute(SUMMARY_SQL.format(where=where), params)
+            return [{'institution': institution, 'horizon': int(horizon), 'forecasts': count,
+                     'bias': bias, 'mae': mae, 'rmse': rmse}
+                    for institution, horizon, count, bias, mae, rmse in cursor.fetchall()]
+
+
+def refresh_accuracy(logger: logging.Logger) -> None:
+    """
+    Incremental refresh after ETL loads, a failure is logged without failing the load.
+
+    """
+    try:
+        AccuracyEngine(logger).refresh()
+    except Exception as e:
+        logger.warning(f"Could not refresh the forecast accuracy: {e}")
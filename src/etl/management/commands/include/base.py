@@ -3,18 +3,45 @@ import logging
 from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Optional, Dict, List
-import concurrent.futures
+from functools import cached_property
+import datetime
+import hashlib
+import threading
+import time
 import pandas as pd
 import numpy as np
 from institution.models import Institution
 from indicator.models import Indicator, Publishes
+from indicator.cache import invalidate_publications
 from geography.models import Area
+from etl.models import Watermark
+from .loader import PublishesLoader, records_to_instances
+from .httpcache import HTTPCache
+from .fetch import ThreadPoolFetcher
+from .storage import get_format
+from .ledger import RunLedger, RunStats
+from .instrumentation import Instrumentation
+from .logs import source_logger
+from .accuracy import refresh_accuracy
+from .threads import ThreadShared
+from .latest import LatestVintages
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.utils import timezone
 import warnings
 warnings.filterwarnings("ignore")
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-class BaseAPIClient(ABC):
+def data_dir() -> Path:
+    """
+    Directory of the downloaded and transformed files, ETL_DATA_DIR or the data directory of the commands.
+
+    """
+    return Path(settings.ETL_DATA_DIR) if settings.ETL_DATA_DIR else BASE_DIR / "data"
+
+
+class BaseAPIClient(ThreadShared, ABC):
 
     """
     This abstract class provides basic functionality for making HTTP requests to APIs
@@ -27,7 +54,7 @@ class BaseAPIClient(ABC):
         headers (Dict, optional): HTTP headers to include in requests.
 
     Basic Functionality:
-        - _setup_logger: Setup logger for the API client
+        - _setup_logger: Logger of the API client's source (etl.<institution>)
         - Main entry function
             download_local: Downloads API response data to local files
 
@@ -39,6 +66,28 @@ class BaseAPIClient(ABC):
 
     """
     DEFAULT_TIMEOUT = 60
+    # Abbreviation of the institution of the source, set by the subclasses
+    institution: Optional[str] = None
+    # What the remote_version compared by database_up_to_date is: 'version' probes the source,
+    # 'vintage' is the quarter of date_published, for the sources publishing one page per vintage
+    freshness = 'version'
+    # Vintage of the published data, set by the sources with the 'vintage' freshness
+    date_published: Optional[pd.Timestamp] = None
+    # Cleared by the orchestrator, which refreshes forecast_accuracy once after loading every source
+    refresh_accuracy = True
+    DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+    PHASES = {
+        'etl': ('extract', 'transform', 'load'),
+        'e': ('extract',),
+        't': ('transform',),
+        'l': ('load',),
+    }
+    # Statistic reported as the row count of each phase
+    PHASE_ROWS = {
+        'extract': 'rows_extracted',
+        'transform': 'rows_transformed',
+        'load': 'rows_inserted',
+    }
 
     def __init__(
             self,
@@ -47,48 +96,95 @@ class BaseAPIClient(ABC):
             params: Optional[Dict] = {},
             headers: Optional[Dict] = {}):
         self.BASE_DIR = BASE_DIR
-        self.DATA_DIR = self.BASE_DIR / "data"
+        self.DATA_DIR = data_dir()
         self.base_endpoint = base_endpoint
         self.params = params
         self.headers = headers
         self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        self.init_thread_state()
         self.logger = self._setup_logger()
+        self.loader = PublishesLoader(self.logger)
+        self.storage = get_format(settings.ETL_INTERMEDIATE_FORMAT, self.logger)
+        self.stats = RunStats()
+        self.fetcher = ThreadPoolFetcher(max_per_host=settings.HTTP_MAX_PER_HOST,
+                                    retries=settings.HTTP_MAX_RETRIES,
+                                    backoff=settings.HTTP_BACKOFF,
+                                    logger=self.logger)
+        self.http_cache = HTTPCache(self.DATA_DIR / 'http_cache',
+                                    max_bytes=settings.HTTP_CACHE_MAX_SIZE_MB * 1024 * 1024,
+                                    max_age=settings.HTTP_CACHE_MAX_AGE_DAYS * 86400) \
+            if settings.HTTP_CACHE_ENABLED else None
         self.logger.info(
             f"API client initialized with endpoint: {self.base_endpoint}")
 
+    THREAD_ATTRIBUTES = ('sessions',)
+
+    def init_thread_state(self) -> None:
+        self.sessions = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        HTTP session of the calling thread, requests.Session is not thread-safe: every fetcher worker
+        keeps its own session and pooled connections.
+
+        """
+        session = getattr(self.sessions, 'session', None)
+        if session is None:
+            session = self.sessions.session = requests.Session()
+            session.headers.update(self.headers)
+        return session
+
     def _setup_logger(self) -> logging.Logger:
         """
-        Set up a logger for the API client.
+        Logger of the API client's source. Its handlers are configured once with LOGGING in the settings.
 
         """
-        logger = logging.getLogger(__name__)
-        logger.setLevel(logging.INFO)
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        return logger
+        return source_logger(self.institution)
 
     def run(self):
-        if self.mode == 'etl':
-            if self.database_up_to_date():
+        """
+        Runs the phases of the mode and records the run (status, row counts, bytes, durations) in etl_run.
+
+        """
+        if self.mode not in self.PHASES:
+            raise ValueError("Invalid mode. Choose from 'etl', 'e', 't' or 'l'")
+        ledger = RunLedger(self.institution, self.mode, self.logger)
+        ledger.start()
+        try:
+            if self.mode == 'etl' and self.database_up_to_date():
                 self.logger.info("Database is up-to-date. Exiting ETL process")
+                ledger.finish('up-to-date', self.stats)
                 return
-            self.run_extract()
-            self.run_transform()
-            self.run_load()
-        elif self.mode == 'e':
-            self.run_extract()
-            return 
-        elif self.mode == 't':
-            self.run_transform()
-        elif self.mode == 'l':
-            self.run_load()
-        else:
-            raise ValueError("Invalid mode. Choose from 'etl' or 'extract'")
+            for phase in self.PHASES[self.mode]:
+                self.run_phase(phase)
+        except Exception as e:
+            ledger.finish('failed', self.stats, e)
+            raise
+        ledger.finish('done', self.stats)
+
+    def run_phase(self, phase: str, *args):
+        """
+        Runs a single phase ('extract', 'transform' or 'load') of the ETL process with the given arguments,
+        its duration is added to the run statistics and it is emitted as an instrumentation event.
+
+        """
+        start = time.perf_counter()
+        try:
+            with self.instrumentation.step(phase) as event:
+                getattr(self, f"run_{phase}")(*args)
+                event['rows'] = self.stats.as_dict().get(self.PHASE_ROWS[phase])
+        finally:
+            self.stats.add(f"{phase}_seconds", time.perf_counter() - start)
+
+    @cached_property
+    def instrumentation(self) -> Instrumentation:
+        """
+        Timing, memory and profiling of the ETL steps, see Instrumentation.
+        Commands enable profiling by setting its `profile` attribute.
+
+        """
+        return Instrumentation(self.institution, self.logger, profile_dir=self.DATA_DIR / 'profiles')
 
     def download_local(
         self,
@@ -121,37 +217,95 @@ class BaseAPIClient(ABC):
     def _get_data(self, endpoint) -> requests.Response:
         """
         Fetches data from the API.
+        Requests are conditional on the validators of the cached response, on 304 Not Modified
+        the cached body is returned with `from_cache` set to True.
         """
+        response, cached = self._conditional_get(endpoint)
+        if response.status_code == 304 and cached is not None:
+            self.logger.info(f"Not modified since last download: {endpoint}")
+            return self.http_cache.load(cached, endpoint)
+        response.raise_for_status()
+        response.from_cache = False
+        self.stats.add('bytes_downloaded', len(response.content))
+        if self.http_cache:
+            self.http_cache.store(endpoint, self.params, response)
+        return response
+
+    def _download(self, endpoint, out_path: Path, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> bool:
+        """
+        Streams the response body to out_path in chunks of chunk_size bytes so that
+        it is never held in memory. Returns False if the cached body was reused (304 Not Modified).
+
+        """
+        response, cached = self._conditional_get(endpoint, stream=True)
+        with response:
+            if response.status_code == 304 and cached is not None:
+                self.logger.info(f"Not modified since last download: {endpoint}")
+                self.http_cache.load_file(cached, out_path)
+                return False
+            response.raise_for_status()
+            with open(out_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    self.stats.add('bytes_downloaded', len(chunk))
+        if self.http_cache:
+            self.http_cache.store_file(endpoint, self.params, response, out_path)
+        return True
+
+    def _conditional_get(self, endpoint, stream: bool = False):
+        cached = self.http_cache.lookup(endpoint, self.params) if self.http_cache else None
+        headers = dict(self.headers)
+        if cached is not None:
+            headers.update(self.http_cache.conditional_headers(cached))
         response = self.session.get(endpoint,
                                     allow_redirects=True,
                                     params=self.params,
-                                    headers=self.headers,
-                                    timeout=self.timeout)
-        response.raise_for_status()
-        return response
+                                    headers=headers,
+                                    timeout=self.timeout,
+                                    stream=stream)
+        return response, cached
+
+    def responses_unchanged(self, responses: List[requests.Response]) -> bool:
+        """
+        True if every response was answered with 304 Not Modified.
+
+        """
+        return bool(responses) and all(getattr(response, 'from_cache', False) for response in responses)
 
     def setup_endpoints(self) -> List[str]:
         pass
 
-    def _get_data_concurrent(self):
+    def _get_data_concurrent(self) -> List[requests.Response]:
         """
         Fetches data from the API using concurrent requests.
+        Responses are returned in the order of setup_endpoints.
 
         """
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [executor.submit(self._get_data, endpoint)
-                       for endpoint in self.setup_endpoints()]
-            results = [future.result()
-                       for future in concurrent.futures.as_completed(futures)]
-        return results
+        return list(self._get_data_by_endpoint().values())
+
+    def _get_data_by_endpoint(self) -> Dict[str, requests.Response]:
+        """
+        Fetches every endpoint of setup_endpoints through the fetcher (bounded concurrency per host,
+        retries with backoff) and returns the responses keyed by endpoint.
+
+        """
+        return self.fetcher.fetch_all(self.setup_endpoints(), self._get_data)
 
     def merge_responses(self, responses: List[requests.Response]):
         pass
     
-    def run_load(self):
-        self.logger.info(f"Start loading data from {self.file_path_for_loading}")
-        df = pd.read_csv(self.file_path_for_loading)
-        self.logger.info(f"Data loaded from {self.file_path_for_loading}")
+    def run_load(self, df: Optional[pd.DataFrame] = None):
+        """
+        Loads transformed data into the publishes table.
+        Reads file_path_for_loading unless an already transformed data frame is given
+        (e.g. several quarters concatenated for a single batched load).
+
+        """
+        if df is None:
+            self.logger.info(f"Start loading data from {self.file_path_for_loading}")
+            df = self.storage.read(self.file_path_for_loading)
+            self.logger.info(f"Data loaded from {self.file_path_for_loading}")
+        df = df.reset_index(drop=True)
         ###############################################################################################################
         ##################################   Query institution       ##################################################
         ###############################################################################################################
@@ -161,8 +315,18 @@ class BaseAPIClient(ABC):
             institution_instance = Institution.objects.get(abbreviation=institution)
         except Institution.DoesNotExist:
             self.logger.error(f"Could not find institution with abbreviation {institution}")
+            self.stats.set('error', f"Could not find institution with abbreviation {institution}")
             return
         self.logger.info(f"Retrieved institution instance {institution}")
+        content_hash = self.content_hash(df)
+        self.stats.set('content_hash', content_hash)
+        watermark = self.get_watermark()
+        if watermark is not None and watermark.content_hash == content_hash:
+            self.logger.info(f"Data unchanged since the last load of {institution}, skipping")
+            self.stats.add('rows_inserted', 0)
+            self.stats.add('rows_skipped', len(df))
+            self.update_watermark(institution_instance, df, content_hash)
+            return
         ###############################################################################################################
         ###############################    Indicators - areas serialization             ###############################
         ###############################################################################################################
@@ -178,73 +342,226 @@ class BaseAPIClient(ABC):
         historical = df[df['is_forecast'] == 'N']
         self.logger.info(f"Historical data: {len(historical)} records")
         self.logger.info(f"Projections data: {len(projections)} records")
-        ###############################################################################################################
-        ###############################    Prepare projections and bulk insert   ######################################
-        ###############################################################################################################
+        inserted = 0
         try:
-            self.logger.info(f"Serializing projections data and inserting to database")
-            projections_instances = self.serialize_records(projections, institution_instance, indicator_mapper, area_mapper)
-            Publishes.objects.bulk_create(projections_instances, batch_size=1000) 
-            self.logger.info(f"Inserted {len(projections_instances)} records")
-        except Exception as e:
-            self.logger.error(f"An error occurred during projections data insertion: {e}")
-            return
-        ###############################################################################################################
-        ###############################    Prepare historized and bulk insert   ######################################
-        ###############################################################################################################
+            ###########################################################################################################
+            ###############################    Prepare projections and bulk insert   ##################################
+            ###########################################################################################################
+            try:
+                self.logger.info(f"Preparing projections data and inserting to database")
+                with self.instrumentation.step('prepare_records', mode='P') as event:
+                    projections_records = self.prepare_records(projections, institution_instance, indicator_mapper, area_mapper)
+                    event['rows'] = len(projections_records)
+                with self.instrumentation.step('bulk_create', mode='P') as event:
+                    inserted = self.loader.load(projections_records, institution_instance)
+                    event['rows'] = inserted
+            except Exception as e:
+                self.logger.error(f"An error occurred during projections data insertion: {e}")
+                self.stats.set('error', f"Projections data insertion: {e}")
+                return
+            ###########################################################################################################
+            ###############################    Prepare historized and bulk insert   ###################################
+            ###########################################################################################################
+            try:
+                self.logger.info(f"Preparing historized data and inserting to database")
+                with self.instrumentation.step('prepare_records', mode='H') as event:
+                    historized_records = self.prepare_records(historical, institution_instance, indicator_mapper,
+                                                              area_mapper, mode='H')
+                    event['rows'] = len(historized_records)
+                with self.instrumentation.step('bulk_create', mode='H') as event:
+                    historized_inserted = self.loader.load(historized_records, institution_instance, mode='H')
+                    event['rows'] = historized_inserted
+                inserted += historized_inserted
+                self.logger.info(f"Data loaded successfully")
+            except Exception as e:
+                self.logger.error(f"An error occurred during historized data insertion: {e}")
+                self.stats.set('error', f"Historized data insertion: {e}")
+                return
+            self.stats.add('rows_skipped', len(df) - inserted)
+            # Only a complete load moves the watermark: after a failed step it would make the next run skip
+            # the rows that were not loaded (same content hash, source version or date_published)
+            self.update_watermark(institution_instance, df, content_hash)
+        finally:
+            # Every loader call is atomic on its own, the rows of a step that succeeded before a failing one
+            # stay in publishes and the tables and caches derived from it follow them
+            self.stats.add('rows_inserted', inserted)
+            if inserted:
+                self.after_load(institution_instance)
+
+    def after_load(self, institution: Institution) -> None:
+        """
+        Brings the tables derived from publishes up to date with the rows just loaded for the institution
+        (rebuilt from scratch with --full by refresh_latest_publications and refresh_forecast_accuracy)
+        and invalidates the cached query API responses over it.
+
+        """
+        if connection.vendor == 'postgresql':
+            try:
+                LatestVintages(self.logger).refresh(institution.pk)
+            except Exception as e:
+                self.logger.warning(f"Could not refresh the latest vintages of {institution.abbreviation}: {e}")
+            if self.refresh_accuracy:
+                refresh_accuracy(self.logger)
         try:
-            self.logger.info(f"Serializing historized data and inserting to database")
-            historized_instances = self.serialize_records(historical, institution_instance, indicator_mapper, area_mapper, 
-                                                        mode='H')
-            Publishes.objects.bulk_create(historized_instances, batch_size=1000) 
-            self.logger.info(f"Inserted {len(historized_instances)} records")
-            self.logger.info(f"Data loaded successfully")
+            invalidate_publications([institution.abbreviation])
         except Exception as e:
-            self.logger.error(f"An error occurred during historized data insertion: {e}")
-            return
-        
-    def serialize_records(self, df: pd.DataFrame, 
-                          
+            self.logger.warning(f"Could not invalidate the cached queries of {institution.abbreviation}: {e}")
+
+    def serialize_records(self, df: pd.DataFrame,
                           institution: Institution,
                           indicator_mapper: Dict,
                           area_mapper: Dict,
                           mode='P') -> List[Publishes]:
-        serialized_instances = []
-        if mode == 'H':
-            existing_records = Publishes.objects.filter(inst_instid=institution, is_forecast='N').values(
-                'indic_indicid', 'area_areaid', 'date_from', 'date_until', 'value')
-            existing_records_mapper = {
-                                    (record['indic_indicid'], record['area_areaid'], record['date_from'], record['date_until']) : float(record['value'])
-            for record in existing_records
-            }
-        for _, row in df.iterrows():
-            indicator = indicator_mapper.get(row['indic_indicid'], None)
-            area = area_mapper.get(row['area_areaid'], None)
-
-            if not indicator or not area:
-                continue
-                
-            if mode == 'H':
-                key_record = (indicator.indicid, area.areaid, pd.to_datetime(row['date_from']), pd.to_datetime(row['date_until']))
-                if key_record in existing_records_mapper:
-                    if existing_records_mapper[key_record] == float(row['value']):
-                        # self.logger.info("Skipping record")
-                        continue  
-            
-            instance = Publishes(
-                inst_instid = institution,
-                indic_indicid = indicator,
-                area_areaid = area,
-                date_published=row['date_published'],
-                date_from=row['date_from'],
-                date_until=row['date_until'],
-                value=row['value'],
-                is_forecast=row['is_forecast'],
-                created_at=pd.Timestamp.now()
-            )
-            serialized_instances.append(instance)
+        """
+        Serializes a transformed data frame into Publishes instances ready for bulk insertion.
+
+        The heavy lifting (code resolution, date parsing, deduplication) is done
+        column-wise in prepare_records; this method only zips the resulting arrays
+        into model instances. run_load hands the prepared records to the loader instead.
+
+        """
+        with self.instrumentation.step('serialize_records', mode=mode) as event:
+            records = self.prepare_records(df, institution, indicator_mapper, area_mapper, mode=mode)
+            serialized_instances = records_to_instances(records, institution)
+            event['rows'] = len(serialized_instances)
         self.logger.info(f"Serialized {len(serialized_instances)} records")
         return serialized_instances
-    
-    def database_up_to_date(self):
-        return False
\ No newline at end of file
+
+    def prepare_records(self, df: pd.DataFrame,
+                        institution: Institution,
+                        indicator_mapper: Dict,
+                        area_mapper: Dict,
+                        mode='P') -> pd.DataFrame:
+        """
+        Builds the columnar insert payload for the publishes table.
+
+        Indicator and area codes are resolved to primary keys with a vectorized map
+        and dates are parsed once per column. Rows with an unknown indicator or area are skipped.
+
+        In historical mode ('H') records whose value equals the latest stored value for the
+        same (indicator, area, date_from, date_until) must be skipped. When the loader merges
+        inside the database (PostgreSQL) this is left to it; otherwise the stored history is
+        fetched and the unchanged records are dropped with a merge.
+
+        """
+        indicator_ids = {code: indicator.indicid for code, indicator in indicator_mapper.items()}
+        area_ids = {code: area.areaid for code, area in area_mapper.items()}
+        records = pd.DataFrame({
+            'indic_indicid': df['indic_indicid'].map(indicator_ids),
+            'area_areaid': df['area_areaid'].map(area_ids),
+            'date_published': self._to_naive_datetime(df['date_published']),
+            'date_from': self._to_naive_datetime(df['date_from']),
+            'date_until': self._to_naive_datetime(df['date_until']),
+            'value': df['value'].astype(float),
+            'is_forecast': df['is_forecast'],
+        })
+        records = records.dropna(subset=['indic_indicid', 'area_areaid'])
+        records = records.astype({'indic_indicid': int, 'area_areaid': int})
+
+        if mode == 'H' and not records.empty and not self.loader.supports_copy():
+            key = ['indic_indicid', 'area_areaid', 'date_from', 'date_until']
+            existing_records = pd.DataFrame.from_records(
+                Publishes.objects.filter(inst_instid=institution, is_forecast='N').order_by('date_published', 'pub_id').values_list(
+                    *key, 'value'),
+                columns=key + ['value'])
+            if not existing_records.empty:
+                existing_records['date_from'] = self._to_naive_datetime(existing_records['date_from'])
+                existing_records['date_until'] = self._to_naive_datetime(existing_records['date_until'])
+                existing_records['value'] = existing_records['value'].astype(float)
+                existing_records = existing_records.drop_duplicates(subset=key, keep='last')
+                merged = records.merge(existing_records, on=key, how='left', suffixes=('', '_existing'))
+                unchanged = (merged['value_existing'] == merged['value']).to_numpy()
+                records = records[~unchanged]
+        return records.reset_index(drop=True)
+
+    @staticmethod
+    def _to_naive_datetime(column: pd.Series) -> pd.Series:
+        """
+        Parses a date column once and normalizes it to naive UTC timestamps,
+        so values read from csv files compare equal to values read from the database.
+
+        """
+        parsed = pd.to_datetime(column)
+        if parsed.dt.tz is not None:
+            parsed = parsed.dt.tz_convert('UTC').dt.tz_localize(None)
+        return parsed
+
+    def database_up_to_date(self) -> bool:
+        """
+        True if the version published by the source is the one recorded at its last load.
+
+        """
+        watermark = self.get_watermark()
+        if watermark is None or watermark.remote_version is None:
+            return False
+        return self.remote_version is not None and self.remote_version == watermark.remote_version
+
+    @cached_property
+    def remote_version(self) -> Optional[str]:
+        """
+        Version of the data currently published by the source, probed once per client (None if unknown).
+
+        """
+        try:
+            return self.probe_remote_version()
+        except Exception as e:
+            self.logger.warning(f"Could not probe the version of {self.institution}: {e}")
+            return None
+
+    def probe_remote_version(self) -> Optional[str]:
+        """
+        Validators of a HEAD request on the base endpoint, sources override it with cheaper metadata.
+
+        """
+        if self.freshness == 'vintage':
+            return f"{self.date_published.year}-Q{self.date_published.quarter}"
+        return self._head_version(self.base_endpoint)
+
+    def _head_version(self, endpoint) -> Optional[str]:
+        response = self.session.head(endpoint,
+                                     allow_redirects=True,
+                                     params=self.params,
+                                     headers=self.headers,
+                                     timeout=self.timeout)
+        response.raise_for_status()
+        return response.headers.get('ETag') or response.headers.get('Last-Modified')
+
+    def get_watermark(self) -> Optional[Watermark]:
+        try:
+            return Watermark.objects.filter(inst_instid__abbreviation=self.institution).first()
+        except DatabaseError as e:
+            self.logger.warning(f"Could not read the watermark of {self.institution}: {e}")
+            return None
+
+    def update_watermark(self, institution: Institution, df: pd.DataFrame, content_hash: str) -> None:
+        """
+        Records the latest date_published, the content hash and the source version of a load.
+
+        """
+        # Versions are only probed in 'etl' runs, vintages need no request
+        remote_version = self.remote_version if self.freshness == 'vintage' else self.__dict__.get('remote_version')
+        date_published = self._to_naive_datetime(df['date_published']).max().to_pydatetime()
+        watermark = self.get_watermark()
+        if watermark is not None and watermark.date_published is not None:
+            date_published = max(date_published, self._naive_utc(watermark.date_published))
+        try:
+            Watermark.objects.update_or_create(inst_instid=institution, defaults={
+                'date_published': timezone.make_aware(date_published, datetime.timezone.utc),
+                'content_hash': content_hash,
+                'remote_version': remote_version,
+                'updated_at': timezone.now(),
+            })
+        except DatabaseError as e:
+            self.logger.warning(f"Could not update the watermark of {self.institution}: {e}")
+
+    @staticmethod
+    def _naive_utc(value: datetime.datetime) -> datetime.datetime:
+        # publishes-like tables use timestamp without time zone, PostgreSQL returns them naive
+        if timezone.is_aware(value):
+            return timezone.make_naive(value, datetime.timezone.utc)
+        return value
+
+    @staticmethod
+    def content_hash(df: pd.DataFrame) -> str:
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        return hashlib.sha256(hashes.tobytes()).hexdigest()
\ No newline at end of file
@@ -0,0 +1,369 @@
+import http.server
+import json
+import math
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from geography.models import Area
+from indicator.models import Indicator
+from institution.models import Institution
+from .instrumentation import peak_rss_mb
+
+MB = 1024 * 1024
+OECD_MEASURES = [f"BENCH_OECD_{i}" for i in range(8)]
+IMF_INDICATORS = [f"BENCH_IMF_{i}" for i in range(8)]
+ECB_LABELS = {
+    'inflation': ('Inflation forecasts', 'HICP'),
+    'core': ('Core inflation forecasts', 'CHICP'),
+    'gdp': ('Real GDP growth forecasts', 'RGDP'),
+    'unemployment': ('Unemployment rate forecasts', 'UR'),
+}
+PHILADELPHIA_TABLES = [
+    ['Real GDP (%)', 'Unemployment Rate (%)', 'Payrolls (000s/month)'],
+    ['Headline CPI', 'Core CPI', 'Headline PCE', 'Core PCE'],
+]
+PHILADELPHIA_CODES = ['RGDP', 'UR', 'PL', 'HCPI', 'CCPI', 'HPCE', 'CPCE']
+OECD_UPLOAD_DATE = '2024-12-03'
+PUBLISHED_YEAR, PUBLISHED_QUARTER = 2024, 4
+CONTENT_TYPES = {
+    '.csv': 'application/vnd.sdmx.data+csv; charset=utf-8',
+    '.json': 'application/json',
+    '.html': 'text/html; charset=utf-8',
+}
+
+
+class StandInServer:
+    """
+    Local HTTP server standing in for the OECD, IMF, ECB and Philadelphia Fed endpoints.
+
+    GET and HEAD requests are answered with the files registered in `routes` (path -> file),
+    streamed from disk; POST requests to `search_path` return the OECD search metadata.
+
+    """
+
+    def __init__(self, search_path: str = '/oecd/search'):
+        self.routes: Dict[str, Path] = {}
+        self.search_path = search_path
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                self._send_file(body=False)
+
+            def do_GET(self):
+                self._send_file(body=True)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.path.split('?')[0] != server.search_path:
+                    self.send_error(404)
+                    return
+                payload = json.dumps({'dataflows': [{'lastUpdated': f"{OECD_UPLOAD_DATE}T00:00:00Z"}]}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_file(self, body: bool):
+                path = server.routes.get(self.path.split('?')[0])
+                if path is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPES.get(path.suffix, 'application/octet-stream'))
+                self.send_header('Content-Length', str(path.stat().st_size))
+                self.send_header('ETag', f'"{path.stat().st_mtime_ns}"')
+                self.end_headers()
+                if body:
+                    with open(path, 'rb') as f:
+                        shutil.copyfileobj(f, self.wfile)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class SyntheticData:
+    """
+    Writes reproducible synthetic responses of every source to directory and registers
+    them on a StandInServer.
+
+    OECD and IMF data are full grids of areas x indicators x periods cut to `rows` rows,
+    written in blocks of areas so that millions of rows never sit in memory at once.
+    The ECB and Philadelphia Fed pages have a fixed size: they hold one survey each.
+
+    Args:
+        directory (Path): Directory of the generated files
+        server (StandInServer): Server the files are registered on
+        rows (int): Number of observations of the OECD and IMF data
+        seed (int, optional): Seed of the random values. Defaults to 0
+
+    """
+    OECD_YEARS = range(1990, 2040)
+    IMF_YEARS = range(1980, 2030)
+    AREAS_PER_BLOCK = 100
+
+    def __init__(self, directory: Path, server: StandInServer, rows: int, seed: int = 0):
+        self.directory = directory
+        self.server = server
+        self.rows = rows
+        self.random = np.random.default_rng(seed)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def area_codes(count: int) -> List[str]:
+        return [f"BM{i:05d}" for i in range(count)]
+
+    def oecd_areas(self) -> int:
+        periods = len(self.OECD_YEARS) * 5
+        return math.ceil(self.rows / (len(OECD_MEASURES) * periods))
+
+    def imf_areas(self, indicators: int) -> int:
+        return math.ceil(self.rows / (indicators * len(self.IMF_YEARS)))
+
+    def oecd(self) -> None:
+        """
+        Annual (/oecd/..A) and quarterly (/oecd/..Q) SDMX CSV, one fifth of the rows annual.
+
+        """
+        annual = [str(year) for year in self.OECD_YEARS]
+        quarterly = [f"{year}-Q{quarter}" for year in self.OECD_YEARS for quarter in range(1, 5)]
+        areas = self.area_codes(self.oecd_areas())
+        budget = {'A': self.rows // 5, 'Q': self.rows - self.rows // 5}
+        for freq, periods in (('A', annual), ('Q', quarterly)):
+            path = self.directory / f"oecd_{freq}.csv"
+            remaining = budget[freq]
+            with open(path, 'w', newline='') as f:
+                f.write('STRUCTURE,STRUCTURE_ID,ACTION,REF_AREA,MEASURE,FREQ,TIME_PERIOD,OBS_VALUE\r\n')
+                for start in range(0, len(areas), self.AREAS_PER_BLOCK):
+                    if remaining <= 0:
+                        break
+                    block = areas[start:start + self.AREAS_PER_BLOCK]
+                    size = min(remaining, len(block) * len(OECD_MEASURES) * len(periods))
+                    frame = pd.DataFrame({
+                        'STRUCTURE': 'DATAFLOW',
+                        'STRUCTURE_ID': 'OECD.ECO.MAD:DSD_EO@DF_EO',
+                        'ACTION': 'I',
+                        'REF_AREA': np.repeat(block, len(OECD_MEASURES) * len(periods))[:size],
+                        'MEASURE': np.tile(np.repeat(OECD_MEASURES, len(periods)), len(block))[:size],
+                        'FREQ': freq,
+                        'TIME_PERIOD': np.tile(periods, len(block) * len(OECD_MEASURES))[:size],
+                        'OBS_VALUE': self.random.normal(2, 1.5, size).round(4),
+                    })
+                    frame.to_csv(f, index=False, header=False, lineterminator='\r\n')
+                    remaining -= size
+            self.server.routes[f"/oecd/..{freq}"] = path
+
+    def imf(self, indicators: List[str]) -> None:
+        """
+        One datamapper JSON document per indicator (/imf/<indicator>).
+
+        """
+        years = [str(year) for year in self.IMF_YEARS]
+        areas = self.area_codes(self.imf_areas(len(indicators)))
+        per_indicator = math.ceil(self.rows / len(indicators))
+        for indicator in indicators:
+            values = {}
+            remaining = per_indicator
+            for area in areas:
+                if remaining <= 0:
+                    break
+                observations = years[:remaining]
+                values[area] = dict(zip(observations, self.random.normal(2, 1.5, len(observations)).round(4).tolist()))
+                remaining -= len(observations)
+            path = self.directory / f"imf_{indicator}.json"
+            with open(path, 'w') as f:
+                json.dump({'values': {indicator: values}}, f, separators=(',', ':'))
+            self.server.routes[f"/imf/{indicator}"] = path
+
+    def ecb(self) -> str:
+        """
+        SPF table page of the ECB, returns its path on the server.
+
+        """
+        horizons = [str(PUBLISHED_YEAR + i) for i in range(4)] + [f"{PUBLISHED_YEAR + 5}"]
+        links = ''.join(f'<a href="#{anchor}">{label}</a>' for anchor, (label, _) in ECB_LABELS.items())
+        tables = []
+        for _ in ECB_LABELS:
+            head = '<tr><th></th>' + ''.join(f'<th>{horizon}</th>' for horizon in horizons) + '</tr>'
+            rows = ''.join(
+                f'<tr><td>{measure}</td>' + ''.join(f'<td>{value:.1f}</td>' for value in self.random.normal(2, 0.5, len(horizons))) + '</tr>'
+                for measure in ('Mean point estimate', 'Standard deviation', 'Number of replies'))
+            tables.append(f'<table><thead>{head}</thead><tbody>{rows}</tbody></table>')
+        route = f"/ecb/table_3_{PUBLISHED_YEAR}q{PUBLISHED_QUARTER}.en.html"
+        self.server.routes[route] = self._write_html('ecb.html', links + ''.join(tables))
+        return route
+
+    def philadelphia(self) -> str:
+        """
+        SPF forecast tables of the Philadelphia Fed, returns the path of the page on the server.
+
+        """
+        periods = [f"{PUBLISHED_YEAR}:Q{PUBLISHED_QUARTER}"] + \
+            [f"{PUBLISHED_YEAR + 1}:Q{quarter}" for quarter in range(1, 5)] + \
+            [str(PUBLISHED_YEAR + i) for i in range(4)]
+        tables = []
+        for indicators in PHILADELPHIA_TABLES:
+            head = '<tr><th></th>' + ''.join(f'<th colspan="2">{indicator}</th>' for indicator in indicators) + '</tr>' + \
+                '<tr><th>Quarter</th>' + '<th>Previous</th><th>Current</th>' * len(indicators) + '</tr>'
+            rows = ''.join(
+                f'<tr><td>{period}</td>' + ''.join(f'<td>{value:.1f}</td>' for value in self.random.normal(2, 0.5, 2 * len(indicators))) + '</tr>'
+                for period in periods)
+            tables.append(f'<table><thead>{head}</thead><tbody>{rows}</tbody></table>')
+        route = f"/philadelphia/spf-q{PUBLISHED_QUARTER}-{PUBLISHED_YEAR}"
+        self.server.routes[route] = self._write_html('philadelphia.html', ''.join(tables))
+        return route
+
+    def _write_html(self, name: str, body: str) -> Path:
+        path = self.directory / name
+        path.write_text(f"<html><body>{body}</body></html>")
+        return path
+
+
+def ensure_fixtures(source: str) -> Institution:
+    """
+    Creates the institution and the indicators the synthetic data of source refers to.
+    Meant to run inside the transaction of the benchmark, which is rolled back.
+
+    """
+    abbreviation, indicators, areas = {
+        'oecd': ('OECD', OECD_MEASURES, []),
+        'imf': ('IMF', IMF_INDICATORS, []),
+        'ecb': ('ECB', [f"{code}{measure}" for _, code in ECB_LABELS.values() for measure in ('_MPE', '_STD')], ['EA17']),
+        'philadelphia': ('FRBP', PHILADELPHIA_CODES, ['USA']),
+    }[source]
+    institution, _ = Institution.objects.get_or_create(
+        abbreviation=abbreviation, defaults={'name': f"{abbreviation} (benchmark)"})
+    existing = set(Indicator.objects.filter(inst_instid=institution).values_list('abbreviation', flat=True))
+    Indicator.objects.bulk_create([Indicator(inst_instid=institution, name=code, unit='%', abbreviation=code)
+                                   for code in indicators if code not in existing])
+    ensure_areas(areas)
+    return institution
+
+
+def ensure_areas(codes: List[str]) -> None:
+    existing = set(Area.objects.filter(code__in=codes).values_list('code', flat=True))
+    Area.objects.bulk_create([Area(code=code, name=f"Benchmark area {code}")
+                              for code in codes if code not in existing], batch_size=1000)
+
+
+def current_rss_mb() -> Optional[float]:
+    """
+    Resident set size of the process, falls back to its peak where /proc is not available.
+
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / MB
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+class RSSSampler:
+    """
+    Samples the RSS of the process every `interval` seconds while the block runs
+    and keeps the highest value in `peak` (MB), so that every phase gets its own peak.
+
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = None
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.peak = current_rss_mb()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self._update()
+
+    def _sample(self):
+        while not self.stopped.wait(self.interval):
+            self._update()
+
+    def _update(self):
+        rss = current_rss_mb()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+
+def baseline_key(vendor: str, result: Dict) -> str:
+    return f"{vendor}/{result['source']}/{result['scale']}/{result['phase']}"
+
+
+def compare(results: List[Dict], baseline: Dict, vendor: str, tolerance: float) -> List[str]:
+    """
+    Returns a message for every phase slower (rows per second) or heavier (peak RSS)
+    than its baseline by more than tolerance (e.g. 0.25 for 25%).
+
+    """
+    regressions = []
+    for result in results:
+        reference = baseline.get(baseline_key(vendor, result))
+        if reference is None:
+            continue
+        key = baseline_key(vendor, result)
+        if reference.get('rows_per_second') and result['rows_per_second'] is not None \
+                and result['rows_per_second'] < reference['rows_per_second'] * (1 - tolerance):
+            regressions.append(f"{key}: {result['rows_per_second']:,.0f} rows/s, "
+                               f"baseline {reference['rows_per_second']:,.0f} rows/s")
+        if reference.get('peak_rss_mb') and result['peak_rss_mb'] is not None \
+                and result['peak_rss_mb'] > reference['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{key}: peak RSS {result['peak_rss_mb']:,.0f} MB, "
+                               f"baseline {reference['peak_rss_mb']:,.0f} MB")
+    return regressions
+
+
+def measure_phase(client, phase: str, source: str, scale: int) -> Dict:
+    """
+    Runs one phase of client and returns its rows, wall/CPU time, throughput and peak RSS.
+
+    """
+    with RSSSampler() as sampler:
+        start = time.perf_counter()
+        client.run_phase(phase)
+        wall = time.perf_counter() - start
+    event = client.instrumentation.events[-1]
+    stats = client.stats.as_dict()
+    rows = stats.get(client.PHASE_ROWS[phase])
+    return {
+        'source': source,
+        'scale': scale,
+        'phase': phase,
+        'rows': rows,
+        'wall_seconds': wall,
+        'cpu_seconds': event['cpu_seconds'],
+        'rows_per_second': rows / wall if rows and wall > 0 else None,
+        'peak_rss_mb': sampler.peak,
+        'bytes_downloaded': stats.get('bytes_downloaded') if phase == 'extract' else None,
+    }
@@ -1,7 +1,9 @@
 from html.parser import HTMLParser
-import requests
+from io import StringIO
+from functools import cached_property
 import pandas as pd
 from .base import BaseAPIClient
+from .periods import parse_period, parse_periods
 import numpy as np
 import ssl
 ssl._create_default_https_context = ssl._create_unverified_context
@@ -32,6 +34,10 @@ class ECBParser(HTMLParser):
             #print(self.data)
 
 class ECBClient(BaseAPIClient):
+    institution = 'ECB'
+    # Every published quarter has its own page
+    freshness = 'vintage'
+
     def __init__(self, url, mode='t'):
         super().__init__(url)
         self.mode = mode
@@ -40,11 +46,8 @@ class ECBClient(BaseAPIClient):
         self.date_index_start = self.date_index_end - 6
         self.year_published = url[self.date_index_start:self.date_index_end][:4]
         self.quarter_published = url[self.date_index_end-1]
-        self.date_published = self.parse_date(self.year_published + '-Q' + self.quarter_published)
-        self.institution = 'ECB'
+        self.date_published = parse_period(self.year_published + '-Q' + self.quarter_published)
         self.area = 'EA17'  ## Euro Area
-        self.labels = self.get_columns()
-        self.raw_tables = self.get_data()
         self.filtered_measures = ['Mean point estimate', 'Standard deviation']
         self.measure_mapping = {
             'Mean point estimate' : '_MPE',
@@ -60,12 +63,22 @@ class ECBClient(BaseAPIClient):
             'Unemployment rate forecasts' : 'UR',
         } 
         self.DB_COLUMNS = ['inst_instid','indic_indicid','area_areaid','date_published','date_from','date_until','value','is_forecast']
-        if not self.raw_data_reconciled():
-            raise ValueError("Data not reconciled")
-        self.ECB_DIR = self.BASE_DIR / 'data' / 'ecb'
+        self.ECB_DIR = self.DATA_DIR / 'ecb'
         self.file_path = self.ECB_DIR /  f"ECB_{self.year_published}-Q{self.quarter_published}.csv"
-        self.file_path_for_loading = self.ECB_DIR /  f"ECB_data_transformed.csv"
-        self.ECB_DIR.mkdir(parents=True, exist_ok=True)
+        self.file_path_for_loading = self.ECB_DIR /  f"ECB_data_transformed_{self.year_published}-Q{self.quarter_published}{self.storage.suffix}"
+
+    # The page is only downloaded when the extract phase needs it
+    @cached_property
+    def page(self) -> str:
+        return self.get_page()
+
+    @cached_property
+    def labels(self):
+        return self.get_columns()
+
+    @cached_property
+    def raw_tables(self):
+        return self.get_data()
 
     def filter_table(self, table):
         mask = table['measure'].isin(self.filtered_measures)
@@ -73,6 +86,8 @@ class ECBClient(BaseAPIClient):
     
     def run_extract(self):
         self.logger.info("Running extract for ECB")
+        if not self.raw_data_reconciled():
+            raise ValueError("Data not reconciled")
         renaming = {'Unnamed: 0': 'measure'}
         dfs = []
         for table, label in zip(self.raw_tables, self.labels):
@@ -85,6 +100,8 @@ class ECBClient(BaseAPIClient):
                 raise KeyError
             dfs.append(filtered_table)
         self.data = pd.concat(dfs)
+        self.stats.set('rows_extracted', len(self.data))
+        self.ECB_DIR.mkdir(parents=True, exist_ok=True)
         self.data.to_csv(self.file_path, index=False)
     
     def run_transform(self):
@@ -102,15 +119,15 @@ class ECBClient(BaseAPIClient):
         transformed_df['inst_instid'] = self.institution
         transformed_df['area_areaid'] = self.area
         transformed_df['date_published'] = self.date_published
-        transformed_df['date_from'] = pd.to_datetime(unpivoted_df['date_from'])
-
-        transformed_df['date_until'] = unpivoted_df.apply(lambda x: 
-                                                          pd.to_datetime(x['date_from']) + pd.DateOffset(years=1), axis=1)
-        transformed_df['value'] = unpivoted_df['value'].replace('N.A.', np.nan)
+        transformed_df['date_from'] = unpivoted_df['date_from']
+        transformed_df['date_until'] = unpivoted_df['date_until']
+        transformed_df['value'] = pd.to_numeric(unpivoted_df['value'].replace('N.A.', np.nan))
         transformed_df.dropna(subset=['value'], inplace=True)
         transformed_df['is_forecast'] = 'Y'
-        transformed_df.to_csv(self.file_path_for_loading, index=False)
+        self.storage.write(transformed_df, self.file_path_for_loading)
+        self.stats.set('rows_transformed', len(transformed_df))
         self.logger.info(f"Data transformed and saved to {self.file_path_for_loading}")
+        return transformed_df
 
     def raw_data_reconciled(self):
         if len(self.labels) == 0:
@@ -128,45 +145,29 @@ class ECBClient(BaseAPIClient):
         df = df[date_related_mask].copy()
         self.logger.info("Data records after date filtering: " + str(df.shape[0]))
         df.reset_index(drop=True, inplace=True)
-        df['date_from'] = df['date_from'].str.replace(' ', '-')
-        # df['FREQ'] = df['date_from'].apply(lambda x: 'A' if len(x) == 4 else 'Q')
         try:
-            df['date_from'] = df['date_from'].apply(self.parse_date)
+            # Every ECB horizon spans one year from its start, whatever its period
+            periods = parse_periods(df['date_from'], span=pd.DateOffset(years=1))
+            df['date_from'] = periods['date_from']
+            df['date_until'] = periods['date_until']
         except Exception as e:
             self.logger.error(f"Error parsing date column: {e}")
             raise
         df.dropna(axis=1, how='all', inplace=True)
         return df
 
-    def parse_date(self, date: str) -> pd.Timestamp:
-        try:
-            if len(date) == 4:
-                return pd.Timestamp(date + "-01-01")
-            if len(date) == 7 and "-Q" in date:
-                year, quarter = date.split("-Q")
-                month = int(quarter) * 3 - 2
-                return pd.Timestamp(f"{year}-{month:02d}-01")
-            try:
-                from dateutil import parser
-                return pd.Timestamp(parser.parse(date).replace(day=1))
-            except ValueError:
-                raise ValueError(f"Date {date} not in expected format")
-            
-        except Exception as e:
-            self.logger.error(f"Error parsing date {date}: {e}")
-            raise
+    def get_page(self) -> str:
+        """
+        Downloads the page once, labels and tables are both parsed from it.
+
+        """
+        return self.fetcher.fetch_one(self.url, self._get_data).text
 
     def get_columns(self):
-        try:
-            col_parser = ECBParser()
-            response = requests.get(self.url)
-            response.raise_for_status()
-        except Exception as err:
-            print(err)
-            return None
-        col_parser.feed(response.text)
+        col_parser = ECBParser()
+        col_parser.feed(self.page)
         return col_parser.data
     
     def get_data(self):
-        tables = pd.read_html(self.url)
+        tables = pd.read_html(StringIO(self.page))
         return tables
@@ -0,0 +1,111 @@
+import concurrent.futures
+import contextlib
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, TypeVar
+from urllib.parse import urlparse
+import requests
+from .ratelimit import HostRateLimiter
+
+T = TypeVar('T')
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class ThreadPoolFetcher:
+    """
+    Runs blocking fetch calls (e.g. BaseAPIClient._get_data) concurrently in a pool of threads.
+
+    At most `max_per_host` requests are in flight per host. Throttled (429) and server error (5xx)
+    responses, connection errors and timeouts are retried up to `retries` times with exponential
+    backoff and full jitter, honouring a numeric Retry-After header. Results are keyed by endpoint,
+    in the order the endpoints were given.
+
+    Args:
+        max_per_host (int, optional): Maximum concurrent requests per host. Defaults to 4
+        retries (int, optional): Retries per endpoint after the first attempt. Defaults to 4
+        backoff (float, optional): Base delay in seconds, doubled on every retry. Defaults to 0.5
+        max_backoff (float, optional): Upper bound of a single delay in seconds. Defaults to 30
+        rate_limiter (HostRateLimiter, optional): Acquired before every attempt, e.g. shared by the
+            clients of a backfill
+        logger (logging.Logger, optional): Logger for retry messages
+
+    """
+
+    def __init__(self,
+                 max_per_host: int = 4,
+                 retries: int = 4,
+                 backoff: float = 0.5,
+                 max_backoff: float = 30.0,
+                 rate_limiter: Optional[HostRateLimiter] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limiter = rate_limiter
+        self.logger = logger or logging.getLogger(__name__)
+
+    def fetch_all(self, endpoints: Iterable[str], fetch: Callable[[str], T]) -> Dict[str, T]:
+        """
+        Calls fetch for every endpoint and returns {endpoint: result} in endpoint order.
+        The first endpoint failing after all retries raises its error, the pending ones are cancelled.
+
+        """
+        endpoints = list(dict.fromkeys(endpoints))
+        if not endpoints:
+            return {}
+        semaphores = {host: threading.Semaphore(self.max_per_host)
+                      for host in {urlparse(endpoint).netloc for endpoint in endpoints}}
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_per_host * len(semaphores))
+        try:
+            futures = [executor.submit(self._fetch, endpoint, fetch, semaphores[urlparse(endpoint).netloc])
+                       for endpoint in endpoints]
+            return {endpoint: future.result() for endpoint, future in zip(endpoints, futures)}
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def fetch_one(self, endpoint: str, fetch: Callable[[str], T]) -> T:
+        """
+        Calls fetch for a single endpoint in the calling thread, with the same retry policy.
+
+        """
+        return self._fetch(endpoint, fetch, contextlib.nullcontext())
+
+    def _fetch(self, endpoint, fetch, semaphore):
+        for attempt in range(self.retries + 1):
+            with semaphore:
+                try:
+                    return self._attempt(endpoint, fetch)
+                except Exception as e:
+                    error = e
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+            # The slot is released while waiting
+            self.logger.warning(f"Retrying {endpoint} in {delay:.1f}s after: {error}")
+            time.sleep(delay)
+
+    def _attempt(self, endpoint, fetch):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(endpoint)
+        return fetch(endpoint)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Returns the delay before the next attempt, or None if the error is not retried.
+
+        """
+        if attempt >= self.retries:
+            return None
+        if isinstance(error, requests.HTTPError):
+            response = error.response
+            if response is None or response.status_code not in RETRY_STATUS:
+                return None
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        elif not isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return None
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
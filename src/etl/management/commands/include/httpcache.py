@@ -0,0 +1,158 @@
+import hashlib
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+import requests
+from .threads import ThreadShared
+
+
+class HTTPCache(ThreadShared):
+    """
+    On-disk cache of HTTP responses keyed by URL and query parameters.
+
+    Every entry keeps the body and the ETag/Last-Modified validators of the response, so that
+    the next request for the same URL can be made conditional. Entries unused for longer than
+    `max_age` seconds are evicted first, then the least recently used ones until the cache
+    fits in `max_bytes`.
+
+    Args:
+        directory (Path): Directory holding the cached bodies and their metadata
+        max_bytes (int): Maximum total size of the cached bodies
+        max_age (float): Maximum time in seconds since an entry was last used
+
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, max_age: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.init_thread_state()
+
+    def _key(self, url: str, params: Optional[Dict]) -> str:
+        identity = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def _paths(self, key: str):
+        return self.directory / f"{key}.body", self.directory / f"{key}.json"
+
+    def lookup(self, url: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Returns the metadata of the cached response for url, or None.
+
+        """
+        body_path, meta_path = self._paths(self._key(url, params))
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        if not body_path.exists():
+            return None
+        meta['body_path'] = body_path
+        return meta
+
+    def conditional_headers(self, meta: Optional[Dict]) -> Dict[str, str]:
+        if meta is None:
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url: str, params: Optional[Dict], response: requests.Response) -> None:
+        """
+        Saves a response carrying a validator, responses without ETag or Last-Modified are not cached.
+
+        """
+        self._store(url, params, response, lambda body_path: self._write_atomic(body_path, response.content))
+
+    def store_file(self, url: str, params: Optional[Dict], response: requests.Response, path: Path) -> None:
+        """
+        Same as store() for a streamed response whose body was written to path.
+
+        """
+        self._store(url, params, response, lambda body_path: self._copy_atomic(path, body_path))
+
+    def _store(self, url: str, params: Optional[Dict], response: requests.Response, write_body) -> None:
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        key = self._key(url, params)
+        body_path, meta_path = self._paths(key)
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': response.headers.get('Content-Type'),
+            'encoding': response.encoding,
+            'stored_at': time.time(),
+        }
+        with self.lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            write_body(body_path)
+            self._write_atomic(meta_path, json.dumps(meta).encode())
+            self.evict()
+
+    def load(self, meta: Dict, url: str) -> requests.Response:
+        """
+        Rebuilds the cached response of a 304 Not Modified answer and marks the entry as used.
+
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = meta['body_path'].read_bytes()
+        response.encoding = meta.get('encoding')
+        if meta.get('content_type'):
+            response.headers['Content-Type'] = meta['content_type']
+        response.from_cache = True
+        meta['body_path'].touch()
+        return response
+
+    def load_file(self, meta: Dict, path: Path) -> None:
+        """
+        Copies the cached body of a 304 Not Modified answer to path and marks the entry as used.
+
+        """
+        shutil.copyfile(meta['body_path'], path)
+        meta['body_path'].touch()
+
+    def evict(self) -> int:
+        """
+        Removes expired entries, then the least recently used ones beyond max_bytes.
+        Returns the number of removed entries.
+
+        """
+        now = time.time()
+        entries = []
+        for body_path in self.directory.glob('*.body'):
+            stat = body_path.stat()
+            entries.append((stat.st_mtime, stat.st_size, body_path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for last_used, size, body_path in entries:
+            if now - last_used <= self.max_age and total <= self.max_bytes:
+                break
+            body_path.unlink(missing_ok=True)
+            body_path.with_suffix('.json').unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    @staticmethod
+    def _copy_atomic(source: Path, path: Path) -> None:
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        shutil.copyfile(source, tmp_path)
+        tmp_path.replace(path)
+
+    @staticmethod
+    def _write_atomic(path: Path, content: bytes) -> None:
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(content)
+        tmp_path.replace(path)
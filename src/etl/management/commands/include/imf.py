@@ -1,4 +1,5 @@
 from .base import BaseAPIClient
+from .periods import parse_periods
 from typing import Dict, List
 import requests
 from pathlib import Path
@@ -8,8 +9,10 @@ from typing import Optional, Dict, List
 import time
 from indicator.models import Indicator
 from institution.models import Institution
+import numpy as np
+import gzip
 import json
-IMF_ENDPOINT = "https://www.imf.org/external/datamapper/api/v1"
+from django.conf import settings
 
 
 """
@@ -19,24 +22,27 @@ IMF_ENDPOINT = "https://www.imf.org/external/datamapper/api/v1"
 4. Change the dtypes to IMF dtypes
 5. Change the institution to IMF
 6. Change the setup_endpoints method to return IMF endpoints
-7. Change the merge_responses method to merge IMF responses
+7. Write the IMF responses with save_data, one line per indicator (replaces merge_responses, which
+   merged every response into a single dict before writing it)
 7. rewrite the run_transform method to transform IMF data
 """
 class IMFClient(BaseAPIClient):
+    institution = "IMF"
+
     def __init__(self, mode='e'):
-        super().__init__(base_endpoint=IMF_ENDPOINT)
+        super().__init__(base_endpoint=settings.IMF_ENDPOINT)
         self.logger.info("IMF API client initialized")
         self.mode = mode
-        self.IMF_DIR = self.BASE_DIR / 'data' / 'imf'
+        self.IMF_DIR = self.DATA_DIR / 'imf'
         self.IMF_upload_date = pd.Timestamp.now().strftime("%Y-%m-%d")
-        self.file_path = self.IMF_DIR /  f"IMF_ECONOMIC_OUTLOOK_{self.IMF_upload_date}.json"
-        self.file_path_for_loading = self.IMF_DIR / "imf_data_transformed.csv"
+        # Raw responses are kept as compact JSON lines, one indicator per line
+        self.compress = True
+        self.file_path = self.IMF_DIR /  f"IMF_ECONOMIC_OUTLOOK_{self.IMF_upload_date}.ndjson{'.gz' if self.compress else ''}"
+        self.file_path_for_loading = self.IMF_DIR / f"imf_data_transformed{self.storage.suffix}"
         self.column_mapping = {
 
         }
         self.dtypes = {}
-        self.institution = "IMF"
-        self.IMF_DIR.mkdir(parents=True, exist_ok=True)
         self.DB_COLUMNS = ["inst_instid", "indic_indicid", "area_areaid", 
                            "date_published", "date_from", "date_until",
                            "value",  
@@ -44,53 +50,91 @@ class IMFClient(BaseAPIClient):
 
     def run_transform(self) -> pd.DataFrame:
         self.logger.info(f"Start transforming data from {self.file_path}")
-        with open(self.file_path, 'r') as f:
-            jsondata = json.loads(f.read())
-        df = pd.DataFrame(columns=self.DB_COLUMNS)
         self.logger.info("Start unpacking data")
-        df = self.unpack_symbol(jsondata)
-        self.logger.info("Data unpacked")
+        df = self.unpack_file()
+        self.logger.info(f"Data unpacked: {len(df)} records")
         self.logger.info("Parsing dates")
-        df["date_from"] = pd.to_datetime(df["date_from"])
-        df["date_until"] = df["date_from"] + pd.DateOffset(years=1)
+        periods = parse_periods(df["date_from"])
+        df["date_from"] = periods["date_from"]
+        df["date_until"] = periods["date_until"]
         df["date_published"] = pd.Timestamp(f"{pd.Timestamp.now().year}-01-01")
         self.logger.info("Classifying forecast data")
-        df['is_forecast'] = 'N'
-        df.loc[df['date_from'] >= df['date_published'], 'is_forecast'] = 'Y'
-        df.to_csv(self.file_path_for_loading, index=False)
+        df['is_forecast'] = pd.Categorical(np.where(df['date_from'] >= df['date_published'], 'Y', 'N'))
+        self.storage.write(df, self.file_path_for_loading)
+        self.stats.set('rows_transformed', len(df))
         self.logger.info("Data transformed and saved to local file")
 
     def run_extract(self):
         responses = self._get_data_concurrent()
-        data = self.merge_responses(responses)
+        if self.responses_unchanged(responses) and self.file_path.exists():
+            self.logger.info(f"IMF data not modified, keeping {self.file_path}")
+            return
         self.logger.info("Data extracted")
-        self.logger.info("indicators: " + str(data.keys()))
-        self.save_data(data)
+        self.save_data(responses)
         self.logger.info("Data saved to local file")
 
     def setup_endpoints(self) -> List[str]:
         institution_id = Institution.objects.get(abbreviation = self.institution)
         indicators = Indicator.objects.filter(inst_instid = institution_id).values('abbreviation').values()
-        indicators_set = list({indicators[i]['abbreviation'] for i in range(len(indicators))})
+        indicators_set = sorted({indicators[i]['abbreviation'] for i in range(len(indicators))})
         return [self.base_endpoint + f"/{indicator}" for indicator in indicators_set]
         
-    def merge_responses(self, responses: List[requests.Response]) -> dict:
-        merged_response = {}
-        for response in responses:
-            merged_response.update(response.json()['values'])
-        return merged_response
+    def open_raw(self, mode: str):
+        if self.compress:
+            return gzip.open(self.file_path, mode + 't', encoding='utf-8')
+        return open(self.file_path, mode, encoding='utf-8')
+
+    def probe_remote_version(self) -> Optional[str]:
+        # The datamapper answers HEAD without ETag or Last-Modified, the IMF is always extracted again
+        return None
+
+    def save_data(self, responses: List[requests.Response]) -> None:
+        """
+        Writes one compact JSON line per indicator, responses are decoded one at a time.
+
+        """
+        self.IMF_DIR.mkdir(parents=True, exist_ok=True)
+        indicators = []
+        rows = 0
+        with self.open_raw('w') as f:
+            for response in responses:
+                for indicator, areas in response.json()['values'].items():
+                    f.write(json.dumps({'indicator': indicator, 'values': areas}, separators=(',', ':')))
+                    f.write('\n')
+                    indicators.append(indicator)
+                    rows += sum(len(observations) for observations in areas.values())
+        self.logger.info("indicators: " + str(indicators))
+        self.stats.set('rows_extracted', rows)
 
-    def save_data(self, data: str) -> None:
-        with open(self.file_path, "w") as f:
-            json.dump(data, f, indent=4)
+    def unpack_file(self) -> pd.DataFrame:
+        """
+        Unpacks the indicator -> area -> year -> value lines into columnar arrays as they are parsed.
+        Indicators and areas are stored once each and expanded to categorical columns by their codes.
 
-    def unpack_symbol(self, jsondata: Dict) -> pd.DataFrame:
-        result = [
-            (self.institution, indicator, area, '', year,'', value, '')
-            for indicator, sub_dict1 in jsondata.items()
-            for area, sub_dict2 in sub_dict1.items()
-            for year, value in sub_dict2.items()
-        ]
-        df_result = pd.DataFrame(result, columns=self.DB_COLUMNS)
-        return df_result
-    
\ No newline at end of file
+        """
+        indicator_codes, area_codes = {}, {}
+        row_indicators, row_areas, counts, years, values = [], [], [], [], []
+        with self.open_raw('r') as f:
+            for line in f:
+                record = json.loads(line)
+                indicator_code = indicator_codes.setdefault(record['indicator'], len(indicator_codes))
+                for area, observations in record['values'].items():
+                    row_indicators.append(indicator_code)
+                    row_areas.append(area_codes.setdefault(area, len(area_codes)))
+                    counts.append(len(observations))
+                    years.extend(observations.keys())
+                    values.extend(observations.values())
+        # One code per (indicator, area) block, repeated over its observations
+        counts = np.asarray(counts, dtype=np.int64)
+        return pd.DataFrame({
+            'inst_instid': pd.Categorical.from_codes(np.zeros(len(years), dtype=np.int8), [self.institution]),
+            'indic_indicid': pd.Categorical.from_codes(np.repeat(np.asarray(row_indicators, dtype=np.int32), counts),
+                                                       list(indicator_codes)),
+            'area_areaid': pd.Categorical.from_codes(np.repeat(np.asarray(row_areas, dtype=np.int32), counts),
+                                                     list(area_codes)),
+            'date_published': None,
+            'date_from': years,
+            'date_until': None,
+            'value': np.asarray(values, dtype=float),
+            'is_forecast': None,
+        }, columns=self.DB_COLUMNS)
@@ -0,0 +1,126 @@
+import contextlib
+import cProfile
+import io
+import json
+import logging
+import pstats
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows, peak RSS is then left out
+    resource = None
+
+PROFILERS = ('cprofile', 'tracemalloc')
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of the process so far, in MB.
+
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class Instrumentation:
+    """
+    Measures steps of the ETL process and emits one structured (JSON) event per step.
+
+    Every event carries the source, the step, its wall and CPU time in seconds, the peak RSS of
+    the process in MB and the rows it handled when the step reports them. With a profiler
+    ('cprofile' or 'tracemalloc') each step is also profiled: cProfile statistics are written to
+    `profile_dir` and summarized in the log, tracemalloc adds the peak traced memory and the top
+    allocation sites to the event.
+
+    Args:
+        source (str): Name of the source, added to every event
+        logger (logging.Logger): Logger the events are written to
+        profile (str, optional): 'cprofile', 'tracemalloc' or None. Defaults to None
+        profile_dir (Path, optional): Directory of the cProfile statistics files
+
+    """
+    TOP_ENTRIES = 15
+
+    def __init__(self,
+                 source: str,
+                 logger: logging.Logger,
+                 profile: Optional[str] = None,
+                 profile_dir: Optional[Path] = None):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"Invalid profiler {profile}. Choose from {', '.join(PROFILERS)}")
+        self.source = source
+        self.logger = logger
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.events: List[Dict] = []
+        self.profiling = False
+
+    @contextlib.contextmanager
+    def step(self, name: str, **fields):
+        """
+        Measures the enclosed block. The yielded event can be completed by the block,
+        e.g. event['rows'] = len(df); it is emitted even if the block raises.
+
+        """
+        event = {'event': 'etl_step', 'source': self.source, 'step': name, **fields}
+        profiler = self._start_profiler()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield event
+            event['status'] = 'ok'
+        except Exception:
+            event['status'] = 'failed'
+            raise
+        finally:
+            event['wall_seconds'] = round(time.perf_counter() - wall, 6)
+            event['cpu_seconds'] = round(time.process_time() - cpu, 6)
+            event['peak_rss_mb'] = peak_rss_mb()
+            self._stop_profiler(profiler, name, event)
+            self.emit(event)
+
+    def emit(self, event: Dict) -> None:
+        self.events.append(event)
+        self.logger.info(json.dumps(event, default=str), extra={'etl_event': event})
+
+    def _start_profiler(self):
+        # Nested steps are covered by the profile of the outermost one
+        if self.profile is None or self.profiling:
+            return None
+        self.profiling = True
+        if self.profile == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        tracemalloc.start()
+        return tracemalloc
+
+    def _stop_profiler(self, profiler, name: str, event: Dict) -> None:
+        if profiler is None:
+            return
+        self.profiling = False
+        if profiler is tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            event['traced_peak_mb'] = peak / (1024 * 1024)
+            event['top_allocations'] = [
+                {'location': str(stat.traceback), 'size_mb': stat.size / (1024 * 1024), 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:self.TOP_ENTRIES]]
+            return
+        profiler.disable()
+        if self.profile_dir is not None:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            path = self.profile_dir / f"{self.source}_{name}_{time.strftime('%Y%m%d-%H%M%S')}.prof"
+            profiler.dump_stats(path)
+            event['profile'] = str(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(self.TOP_ENTRIES)
+        self.logger.info(f"cProfile of {self.source} {name}:\n{summary.getvalue()}")
@@ -0,0 +1,85 @@
+import logging
+from typing import List, Optional
+from django.db import connection, transaction
+
+COLUMNS = ('pub_id, inst_instid, indic_indicid, area_areaid, date_published, date_from, date_until, value, '
+           'is_forecast, created_at')
+
+# The loader stamps created_at on every row it inserts or rewrites, so the rows of the institution
+# changed since the previous refresh are the ones from the newest created_at stored in publishes_latest
+# (rows that lost to a later vintage are merely compared again)
+SINCE_SQL = "SELECT max(created_at) FROM publishes_latest WHERE inst_instid = %s"
+
+# Latest vintage of every key among the changed rows of the institution. A row replaces the stored one
+# when it is a later vintage, or the same row with a revised value; reloading an old vintage changes nothing
+UPSERT_LATEST_SQL = f"""
+    INSERT INTO publishes_latest ({COLUMNS})
+    SELECT DISTINCT ON (indic_indicid, area_areaid, date_from, date_until) {COLUMNS}
+    FROM publishes
+    WHERE inst_instid = %(institution)s {{since}}
+      AND indic_indicid IS NOT NULL AND area_areaid IS NOT NULL
+    ORDER BY indic_indicid, area_areaid, date_from, date_until, date_published DESC, pub_id DESC
+    ON CONFLICT (indic_indicid, area_areaid, date_from, date_until, inst_instid) DO UPDATE
+    SET pub_id = EXCLUDED.pub_id, date_published = EXCLUDED.date_published,
+        value = EXCLUDED.value, is_forecast = EXCLUDED.is_forecast, created_at = EXCLUDED.created_at
+    WHERE (EXCLUDED.date_published, EXCLUDED.pub_id) > (publishes_latest.date_published, publishes_latest.pub_id)
+       OR (EXCLUDED.pub_id = publishes_latest.pub_id
+           AND (EXCLUDED.value, EXCLUDED.is_forecast) IS DISTINCT FROM (publishes_latest.value, publishes_latest.is_forecast))
+"""
+SINCE_FILTER = "AND created_at >= %(since)s"
+
+REBUILD_SQL = f"""
+    INSERT INTO publishes_latest ({COLUMNS})
+    SELECT DISTINCT ON (indic_indicid, area_areaid, date_from, date_until, inst_instid) {COLUMNS}
+    FROM publishes
+    WHERE inst_instid IS NOT NULL AND indic_indicid IS NOT NULL AND area_areaid IS NOT NULL {{where}}
+    ORDER BY indic_indicid, area_areaid, date_from, date_until, inst_instid, date_published DESC, pub_id DESC
+"""
+
+
+class LatestVintages:
+    """
+    Maintains publishes_latest, the latest vintage (highest date_published) of every institution,
+    indicator, area and period of publishes, so that the current forecasts are read with an index
+    lookup instead of a scan over every vintage. PostgreSQL only.
+
+    Args:
+        logger (logging.Logger, optional): Logger for progress messages
+
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+
+    def refresh(self, institution_id: int) -> int:
+        """
+        Upserts the rows of the institution loaded or revised since the previous refresh, returns the
+        number of keys inserted, moved to a later vintage or revised.
+
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(SINCE_SQL, [institution_id])
+            since = cursor.fetchone()[0]
+            cursor.execute(UPSERT_LATEST_SQL.format(since=SINCE_FILTER if since is not None else ''),
+                           {'institution': institution_id, 'since': since})
+            rows = cursor.rowcount
+        self.logger.info(f"Latest vintages of institution {institution_id}: {rows} keys updated from rows changed "
+                         f"since {since}")
+        return rows
+
+    def rebuild(self, institution_ids: Optional[List[int]] = None) -> int:
+        """
+        Recomputes publishes_latest from scratch for the institutions (default all), e.g. after rows
+        were deleted from publishes. Returns the number of keys.
+
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            if institution_ids is None:
+                cursor.execute("TRUNCATE publishes_latest")
+                cursor.execute(REBUILD_SQL.format(where=''))
+            else:
+                cursor.execute("DELETE FROM publishes_latest WHERE inst_instid = ANY(%s)", [institution_ids])
+                cursor.execute(REBUILD_SQL.format(where='AND inst_instid = ANY(%s)'), [institution_ids])
+            rows = cursor.rowcount
+        self.logger.info(f"Latest vintages rebuilt: {rows} keys")
+        return rows
@@ -0,0 +1,99 @@
+import logging
+from typing import Dict, Optional
+from django.db import DatabaseError
+from django.utils import timezone
+from etl.models import EtlRun
+from institution.models import Institution
+from .threads import ThreadShared
+
+# Counters and phase durations recorded in etl_run
+STAT_FIELDS = ('rows_extracted', 'rows_transformed', 'rows_inserted', 'rows_skipped', 'bytes_downloaded',
+               'extract_seconds', 'transform_seconds', 'load_seconds', 'content_hash')
+
+
+class RunStats(ThreadShared):
+    """
+    Statistics of one ETL run of a client, safe to update from the fetcher threads.
+
+    """
+
+    def __init__(self):
+        self.values: Dict = {}
+        self.init_thread_state()
+
+    def add(self, name: str, amount) -> None:
+        with self.lock:
+            self.values[name] = self.values.get(name, 0) + amount
+
+    def set(self, name: str, value) -> None:
+        with self.lock:
+            self.values[name] = value
+
+    def update(self, values: Dict) -> None:
+        with self.lock:
+            self.values.update(values)
+
+    def merge(self, other: 'RunStats') -> None:
+        """
+        Adds the counters and durations of another run, e.g. of every quarter of a backfill.
+
+        """
+        for name, value in other.as_dict().items():
+            if isinstance(value, (int, float)):
+                self.add(name, value)
+            else:
+                self.set(name, value)
+
+    def as_dict(self) -> Dict:
+        with self.lock:
+            return dict(self.values)
+
+
+class RunLedger:
+    """
+    Records one ETL run of a source in the etl_run table: a row is created with status 'running'
+    when the run starts and completed with its status, statistics and error when it ends.
+
+    The ledger never fails a run, database errors (e.g. the table was not created) are logged.
+
+    Args:
+        institution (str): Abbreviation of the institution, also used as the source name
+        mode (str): ETL mode of the run ('etl', 'e', 't' or 'l')
+        logger (logging.Logger, optional): Logger for ledger errors
+
+    """
+
+    def __init__(self, institution: str, mode: str, logger: Optional[logging.Logger] = None):
+        self.institution = institution
+        self.mode = mode
+        self.logger = logger or logging.getLogger(__name__)
+        self.run: Optional[EtlRun] = None
+
+    def start(self) -> None:
+        try:
+            self.run = EtlRun.objects.create(
+                inst_instid=Institution.objects.filter(abbreviation=self.institution).first(),
+                source=self.institution,
+                mode=self.mode,
+                status='running',
+                started_at=timezone.now())
+        except DatabaseError as e:
+            self.logger.warning(f"Could not record the ETL run of {self.institution}: {e}")
+
+    def finish(self, status: str, stats: RunStats, error: Optional[Exception] = None) -> None:
+        if self.run is None:
+            return
+        values = stats.as_dict()
+        # Loads log and record their errors instead of raising them
+        error = error or values.get('error')
+        if error is not None:
+            status = 'failed'
+        values = {name: value for name, value in values.items() if name in STAT_FIELDS}
+        try:
+            EtlRun.objects.filter(pk=self.run.pk).update(
+                status=status,
+                finished_at=timezone.now(),
+                error=str(error) if error is not None else None,
+                **values)
+        except DatabaseError as e:
+            self.logger.warning(f"Could not record the ETL run of {self.institution}: {e}")
@@ -0,0 +1,234 @@
+import datetime
+import io
+import itertools
+import logging
+import time
+from typing import Dict, List, Tuple
+import pandas as pd
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from indicator.models import Publishes
+from institution.models import Institution
+
+STAGING_TABLE = "publishes_stage"
+NATURAL_KEY_INDEX = "publishes_natural_key_uidx"
+LOAD_COLUMNS = ['inst_instid', 'indic_indicid', 'area_areaid', 'date_published',
+                'date_from', 'date_until', 'value', 'is_forecast', 'created_at']
+NATURAL_KEY = ['inst_instid', 'indic_indicid', 'area_areaid', 'date_from', 'date_until', 'date_published']
+
+# Historical rows whose value equals the latest stored value of the same period are not new information
+SKIP_UNCHANGED_HISTORY_SQL = f"""
+    DELETE FROM {STAGING_TABLE} s
+    WHERE s.value = (
+        SELECT p.value
+        FROM publishes p
+        WHERE p.inst_instid = s.inst_instid
+          AND p.indic_indicid = s.indic_indicid
+          AND p.area_areaid = s.area_areaid
+          AND p.date_from = s.date_from
+          AND p.date_until = s.date_until
+          AND p.is_forecast = 'N'
+        ORDER BY p.date_published DESC, p.pub_id DESC
+        LIMIT 1)"""
+
+# Merge on the natural key: a vintage that is loaded again only rewrites the values that changed
+MERGE_SQL = f"""
+    INSERT INTO publishes ({', '.join(LOAD_COLUMNS)})
+    SELECT DISTINCT ON ({', '.join(NATURAL_KEY)}) {', '.join(LOAD_COLUMNS)}
+    FROM {STAGING_TABLE}
+    ORDER BY {', '.join(NATURAL_KEY)}, stage_id DESC
+    ON CONFLICT ({', '.join(NATURAL_KEY)})
+    DO UPDATE SET value = EXCLUDED.value,
+                  is_forecast = EXCLUDED.is_forecast,
+                  created_at = EXCLUDED.created_at
+    WHERE publishes.value IS DISTINCT FROM EXCLUDED.value"""
+
+
+def records_to_instances(records: pd.DataFrame, institution: Institution) -> List[Publishes]:
+    """
+    Builds Publishes instances from a prepared records frame (see BaseAPIClient.prepare_records).
+
+    """
+    columns = {
+        'pub_id': itertools.repeat(None),
+        'inst_instid_id': itertools.repeat(institution.pk),
+        'indic_indicid_id': records['indic_indicid'].tolist(),
+        'area_areaid_id': records['area_areaid'].tolist(),
+        'date_published': _to_pydatetime_list(records['date_published']),
+        'date_from': _to_pydatetime_list(records['date_from']),
+        'date_until': _to_pydatetime_list(records['date_until']),
+        'value': records['value'].tolist(),
+        'is_forecast': records['is_forecast'].tolist(),
+        'created_at': itertools.repeat(pd.Timestamp.now().to_pydatetime()),
+    }
+    # Positional arguments in concrete field order take the fast path of Model.__init__
+    field_names = [field.attname for field in Publishes._meta.concrete_fields]
+    return [Publishes(*row) for row in zip(*(columns[name] for name in field_names))]
+
+
+def _to_pydatetime_list(column: pd.Series) -> List:
+    return column.to_numpy().astype('datetime64[us]').tolist()
+
+
+def _naive_utc(value):
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value, datetime.timezone.utc)
+    return value
+
+
+def drop_temporary_tables(cursor, *tables: str) -> None:
+    """
+    Drops the ON COMMIT DROP tables of a previous load or refresh before they are created again.
+    They are only dropped at the outermost commit, so a run nested in a transaction (e.g. the
+    benchmark) still holds the tables of the previous one.
+
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS {', '.join(tables)}")
+
+
+class PublishesLoader:
+    """
+    Writes prepared publishes records to the database.
+
+    On PostgreSQL the records are streamed with COPY FROM STDIN into a temporary
+    staging table and merged into publishes with a single INSERT ... ON CONFLICT
+    on the natural key (inst, indicator, area, date_from, date_until, date_published).
+    Unchanged historical values are dropped from the staging table beforehand,
+    so deduplication never pulls the stored history into Python.
+    Any other backend (e.g. SQLite during development) falls back to bulk_create and
+    bulk_update with the same merge.
+
+    Args:
+        logger (logging.Logger): Logger of the calling API client
+        using (str, optional): Database alias. Defaults to DEFAULT_DB_ALIAS
+        batch_size (int, optional): Batch size of the bulk_create fallback. Defaults to 1000
+        copy_chunk_size (int, optional): Rows buffered per COPY call. Defaults to 100000
+
+    """
+
+    def __init__(self,
+                 logger: logging.Logger,
+                 using: str = DEFAULT_DB_ALIAS,
+                 batch_size: int = 1000,
+                 copy_chunk_size: int = 100_000):
+        self.logger = logger
+        self.using = using
+        self.batch_size = batch_size
+        self.copy_chunk_size = copy_chunk_size
+        self._natural_key_checked = False
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def supports_copy(self) -> bool:
+        return self.connection.vendor == 'postgresql'
+
+    def load(self, records: pd.DataFrame, institution: Institution, mode: str = 'P') -> int:
+        """
+        Inserts the records and returns the number of rows written.
+        mode='H' marks historical records (see SKIP_UNCHANGED_HISTORY_SQL).
+
+        """
+        if records.empty:
+            self.logger.info("Nothing to insert")
+            return 0
+        start = time.perf_counter()
+        if self.supports_copy():
+            inserted = self._copy_load(records, institution, mode)
+        else:
+            inserted = self._bulk_create_load(records, institution)
+        elapsed = time.perf_counter() - start
+        rate = inserted / elapsed if elapsed > 0 else float('inf')
+        self.logger.info(f"Inserted {inserted} records in {elapsed:.2f}s ({rate:,.0f} rows/sec), "
+                         f"skipped {len(records) - inserted} duplicate or unchanged records")
+        return inserted
+
+    def _bulk_create_load(self, records: pd.DataFrame, institution: Institution) -> int:
+        """
+        Same merge on the natural key as MERGE_SQL: new keys are inserted and stored rows are only
+        rewritten when their value changed, the last record of a key wins.
+
+        """
+        records = records.drop_duplicates(NATURAL_KEY[1:], keep='last')
+        stored = self._stored_values(records, institution)
+        inserts, updates = [], []
+        for instance in records_to_instances(records, institution):
+            key = (instance.indic_indicid_id, instance.area_areaid_id, instance.date_from, instance.date_until,
+                   instance.date_published)
+            if key not in stored:
+                inserts.append(instance)
+            elif float(stored[key][1]) != instance.value:
+                instance.pub_id = stored[key][0]
+                updates.append(instance)
+        queryset = Publishes.objects.using(self.using)
+        with transaction.atomic(using=self.using):
+            queryset.bulk_create(inserts, batch_size=self.batch_size)
+            queryset.bulk_update(updates, ['value', 'is_forecast', 'created_at'], batch_size=self.batch_size)
+        return len(inserts) + len(updates)
+
+    def _stored_values(self, records: pd.DataFrame, institution: Institution) -> Dict[Tuple, Tuple]:
+        """
+        (pub_id, value) of the stored rows of the loaded vintages, by natural key with naive UTC dates.
+
+        """
+        vintages = [timezone.make_aware(vintage, datetime.timezone.utc)
+                    for vintage in _to_pydatetime_list(records['date_published'].drop_duplicates())]
+        rows = Publishes.objects.using(self.using).filter(inst_instid=institution, date_published__in=vintages) \
+            .values_list('indic_indicid_id', 'area_areaid_id', 'date_from', 'date_until', 'date_published',
+                         'pub_id', 'value')
+        return {tuple(_naive_utc(value) for value in row[:5]): row[5:] for row in rows}
+
+    def _check_natural_key(self, cursor) -> None:
+        if self._natural_key_checked:
+            return
+        cursor.execute("SELECT 1 FROM pg_indexes WHERE tablename = 'publishes' AND indexname = %s",
+                       [NATURAL_KEY_INDEX])
+        if cursor.fetchone() is None:
+            raise RuntimeError(f"Unique index {NATURAL_KEY_INDEX} is missing on publishes. "
+                               f"Run 'python manage.py migrate etl' first")
+        self._natural_key_checked = True
+
+    def _analyze(self, cursor) -> None:
+        """
+        Gives the planner statistics for the history lookup. Temporary tables are never analyzed
+        automatically, and a publishes table that was analyzed while empty (e.g. right after
+        create_tables.sql) makes the planner scan every row of the institution for each staged row.
+
+        """
+        cursor.execute(f"ANALYZE {STAGING_TABLE}")
+        cursor.execute("SELECT reltuples FROM pg_class WHERE oid = 'publishes'::regclass")
+        if cursor.fetchone()[0] <= 0:
+            cursor.execute("ANALYZE publishes")
+
+    def _copy_load(self, records: pd.DataFrame, institution: Institution, mode: str) -> int:
+        payload = records.assign(inst_instid=institution.pk, created_at=pd.Timestamp.now())[LOAD_COLUMNS]
+        columns = ', '.join(LOAD_COLUMNS)
+        with transaction.atomic(using=self.using), self.connection.cursor() as cursor:
+            self._check_natural_key(cursor)
+            drop_temporary_tables(cursor, STAGING_TABLE)
+            cursor.execute(f"""
+                CREATE TEMPORARY TABLE {STAGING_TABLE} (
+                    stage_id bigserial,
+                    inst_instid integer,
+                    indic_indicid integer,
+                    area_areaid integer,
+                    date_published timestamp,
+                    date_from timestamp,
+                    date_until timestamp,
+                    value numeric,
+                    is_forecast char(1),
+                    created_at timestamp
+                ) ON COMMIT DROP""")
+            for start in range(0, len(payload), self.copy_chunk_size):
+                buffer = io.StringIO()
+                # Microseconds keep created_at apart between loads, it tracks the rows changed by each load
+                payload.iloc[start:start + self.copy_chunk_size].to_csv(
+                    buffer, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S.%f')
+                buffer.seek(0)
+                cursor.copy_expert(f"COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            if mode == 'H':
+                self._analyze(cursor)
+                cursor.execute(SKIP_UNCHANGED_HISTORY_SQL)
+            cursor.execute(MERGE_SQL)
+            return cursor.rowcount
@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import weakref
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue
+from typing import Optional
+
+# Attributes of every LogRecord, anything else was passed with extra={...}
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+def source_logger(source: Optional[str]) -> logging.Logger:
+    """
+    Logger of an ETL source, e.g. etl.OECD. Its level can be set per source with ETL_LOG_LEVELS,
+    the records are written by the handlers of the etl logger (see LOGGING in the settings).
+
+    """
+    return logging.getLogger(f"etl.{source}" if source else "etl")
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line. Fields passed with extra={...} are added to
+    the object, the structured events of the ETL steps are added with extra={'etl_event': event}
+    and replace the message.
+
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        event = getattr(record, 'etl_event', None)
+        if event is not None:
+            payload.update(event)
+        else:
+            payload['message'] = record.getMessage()
+        payload.update({name: value for name, value in vars(record).items()
+                        if name not in RECORD_ATTRIBUTES and name != 'etl_event'})
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    Hands the records to a queue and writes them to a stream from a background thread, so that
+    the ETL never waits for the formatting and writing of its log lines.
+
+    The formatter set on this handler (the 'formatter' of its LOGGING entry) is used by the stream
+    handler of the listener. Forked processes (the transform workers) write their records
+    directly, a listener thread does not survive the fork.
+
+    Args:
+        stream (optional): Stream the records are written to. Defaults to sys.stderr
+
+    """
+    instances = weakref.WeakSet()
+
+    def __init__(self, stream=None):
+        # Created first so that logging.shutdown closes this handler (and flushes the queue) before it
+        self.target = logging.StreamHandler(stream)
+        super().__init__(Queue(-1))
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        self.instances.add(self)
+
+    def setFormatter(self, fmt: Optional[logging.Formatter]) -> None:
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The records stay in this process: formatting is left to the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.listener is None:
+            self.target.handle(record)
+        else:
+            super().enqueue(record)
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+            self.target.close()
+        finally:
+            self.release()
+        super().close()
+
+    @classmethod
+    def after_fork(cls) -> None:
+        for handler in cls.instances:
+            handler.listener = None
+
+
+os.register_at_fork(after_in_child=QueueListenerHandler.after_fork)
@@ -1,30 +1,29 @@
 from .base import BaseAPIClient
-import requests
+from .periods import parse_periods
 from pathlib import Path
 import pandas as pd
-from io import StringIO
 from .utils import get_last_upload_date_OECD
 from typing import Optional, Dict, List
-import time
+from functools import cached_property
 from indicator.models import Publishes
 from institution.models import Institution
+from django.conf import settings
 OECD_HEADERS = {
     'Accept': 'application/vnd.sdmx.data+csv; charset=utf-8; version=2'
 }
-OECD_ENDPOINT_LAST = "https://sdmx.oecd.org/public/rest/data/OECD.ECO.MAD,DSD_EO@DF_EO"
 OECD_PARAMS = {}
 
 
 class OECDClient(BaseAPIClient):
+    institution = "OECD"
+
     def __init__(self, mode='t'):
-        super().__init__(base_endpoint=OECD_ENDPOINT_LAST,
+        super().__init__(base_endpoint=settings.OECD_ENDPOINT,
                          headers=OECD_HEADERS, params=OECD_PARAMS)
         self.logger.info("OECD API client initialized")
         self.mode = mode
-        self.OECD_upload_date = get_last_upload_date_OECD()
-        self.OECD_DIR = self.BASE_DIR / 'data' / 'oecd'
-        self.file_path = self.OECD_DIR /  f"OECD_ECONOMIC_OUTLOOK_{self.OECD_upload_date}.csv"
-        self.file_path_for_loading = self.OECD_DIR / "oecd_data_transformed.csv"
+        self.OECD_DIR = self.DATA_DIR / 'oecd'
+        self.file_path_for_loading = self.OECD_DIR / f"oecd_data_transformed{self.storage.suffix}"
         self.column_mapping = {
             "REF_AREA": "area_areaid",
             "MEASURE": "indic_indicid",
@@ -33,98 +32,140 @@ class OECDClient(BaseAPIClient):
         }
         self.dtypes = {"REF_AREA": str, "MEASURE": str,
                        "OBS_VALUE": float, "TIME_PERIOD": str}
-        self.institution = "OECD"
-        self.OECD_DIR.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = 200_000
+
+    @cached_property
+    def OECD_upload_date(self) -> str:
+        """
+        Date of the latest OECD Economic Outlook, resolved on first use.
+        Transform-only runs take it from the newest extracted file so that they work offline.
+
+        """
+        if self.mode == 't':
+            local_date = self.latest_local_upload_date()
+            if local_date is not None:
+                return local_date
+        return get_last_upload_date_OECD(settings.OECD_SEARCH_ENDPOINT)
+
+    @cached_property
+    def file_path(self) -> Path:
+        return self.OECD_DIR / f"OECD_ECONOMIC_OUTLOOK_{self.OECD_upload_date}.csv"
 
-    def run_transform(self) -> pd.DataFrame:
+    def latest_local_upload_date(self) -> Optional[str]:
+        prefix = "OECD_ECONOMIC_OUTLOOK_"
+        dates = sorted(path.stem[len(prefix):] for path in self.OECD_DIR.glob(f"{prefix}*.csv"))
+        return dates[-1] if dates else None
+
+    def run_transform(self) -> None:
         self.logger.info(f"Start transforming data from {self.file_path}")
         try:
             # File existance check
             if not self.file_path.exists():
                 raise FileNotFoundError(
                     f"Data file not found. Run in 'e' mode first")
-            # Load data
-            raw_data = pd.read_csv(self.file_path, dtype=self.dtypes,)
-            self.logger.info("Data shape: " + str(raw_data.shape))
+            # Process the file in chunks of chunk_size rows, peak memory does not grow with its size
+            rows_read = rows_written = chunks_read = 0
+            chunks = pd.read_csv(self.file_path, dtype=self.dtypes, chunksize=self.chunk_size)
+            with self.storage.open_writer(self.file_path_for_loading) as writer:
+                for chunk in chunks:
+                    rows_read += len(chunk)
+                    chunks_read += 1
+                    transformed_df = self.transform_chunk(chunk)
+                    writer.write(transformed_df)
+                    rows_written += len(transformed_df)
+            self.logger.info(f"Rows read: {rows_read} in {chunks_read} chunks of up to {self.chunk_size} rows")
 
             # Validate data
-            if raw_data.empty:
+            if rows_read == 0:
                 raise ValueError("Data is empty")
-
-            # Rename columns
-            raw_data.rename(columns=self.column_mapping, inplace=True)
-
-            # Drop null values
-            raw_data.dropna(subset=['area_areaid', 'indic_indicid', 'value', 'date_from', 'FREQ'],
-                            inplace=True)
-            self.logger.info("Data shape after dropping nulls: " +
-                             str(raw_data.shape))
-
-            # Parse date - quarterly and annual - and create date_until
-            self.logger.info("Parsing date columns")
-            raw_data['date_from'] = raw_data['date_from'].apply(
-                self.parse_date)
-            raw_data['date_until'] = raw_data['date_from'] + pd.DateOffset(
-                years=1)
-            mask_quarterly = raw_data['FREQ'] == 'Q'
-            raw_data.loc[mask_quarterly, 'date_until'] = raw_data.loc[mask_quarterly, 'date_from'].apply(
-                lambda x: x + pd.DateOffset(months=3))
-            raw_data['date_published'] = pd.to_datetime(self.OECD_upload_date)
-
-            # Classify forecast data
-            self.logger.info("Classifying forecast data")
-            raw_data['is_forecast'] = 'N'
-            mask_forecast = raw_data['date_from'] >= pd.to_datetime(
-                self.OECD_upload_date)
-            raw_data.loc[mask_forecast, 'is_forecast'] = 'Y'
-
-            # Add institution id
-            raw_data['inst_instid'] = self.institution
-            transformed_df = raw_data[['inst_instid', 'indic_indicid', 'area_areaid',
-                                       'date_published',  'date_from',  'date_until', 'value', 'is_forecast']].copy()
-            transformed_df.to_csv(self.file_path_for_loading, index=False)
+            self.logger.info(f"Rows after dropping nulls: {rows_written}")
+            self.stats.set('rows_transformed', rows_written)
         except Exception as e:
             self.logger.error(
                 f"An error occurred during data transformation: {e}")
             raise
         self.logger.info(f"Data transformed and saved to {self.file_path_for_loading}")
 
-    def parse_date(self, date: str) -> pd.Timestamp:
-        try:
-            if len(date) == 4:
-                return pd.Timestamp(date + "-01-01")
-            if len(date) == 7 and "-Q" in date:
-                year, quarter = date.split("-Q")
-                month = int(quarter) * 3 - 2
-                return pd.Timestamp(f"{year}-{month:02d}-01")
-            return pd.Timestamp(date)
-        except Exception as e:
-            self.logger.error(f"Error parsing date {date}: {e}")
-            raise
+    def transform_chunk(self, raw_data: pd.DataFrame) -> pd.DataFrame:
+        # Rename columns
+        raw_data = raw_data.rename(columns=self.column_mapping)
+
+        # Drop null values
+        raw_data = raw_data.dropna(subset=['area_areaid', 'indic_indicid', 'value', 'date_from', 'FREQ']).copy()
+
+        # Parse date - quarterly and annual - and create date_until
+        periods = parse_periods(raw_data['date_from'])
+        raw_data['date_from'] = periods['date_from']
+        raw_data['date_until'] = periods['date_until']
+        raw_data['date_published'] = pd.to_datetime(self.OECD_upload_date)
+
+        # Classify forecast data
+        raw_data['is_forecast'] = 'N'
+        mask_forecast = raw_data['date_from'] >= pd.to_datetime(
+            self.OECD_upload_date)
+        raw_data.loc[mask_forecast, 'is_forecast'] = 'Y'
+
+        # Add institution id
+        raw_data['inst_instid'] = self.institution
+        return raw_data[['inst_instid', 'indic_indicid', 'area_areaid',
+                         'date_published',  'date_from',  'date_until', 'value', 'is_forecast']]
 
     def run_extract(self):
-        responses = self._get_data_concurrent()
-        data = self.merge_responses(responses)
-        self.save_data(data)
+        # The annual and quarterly responses are streamed to disk and concatenated, never held in memory
+        self.OECD_DIR.mkdir(parents=True, exist_ok=True)
+        endpoints = self.setup_endpoints()
+        parts = [self.file_path.with_suffix(f".part{i}") for i in range(len(endpoints))]
+        try:
+            part_by_endpoint = dict(zip(endpoints, parts))
+            modified = self.fetcher.fetch_all(
+                endpoints, lambda endpoint: self._download(endpoint, part_by_endpoint[endpoint])).values()
+            if not any(modified) and self.file_path.exists():
+                self.logger.info(f"OECD data not modified, keeping {self.file_path}")
+                return
+            self.concatenate_parts(parts)
+        finally:
+            for part in parts:
+                part.unlink(missing_ok=True)
         self.logger.info("Data saved to local file")
-        time.sleep(1)
 
     def setup_endpoints(self) -> List[str]:
         return [self.base_endpoint + "/..A"] + [self.base_endpoint + "/..Q"]
 
-    def merge_responses(self, responses: List[requests.Response]) -> str:
-        merged_list = responses[0].text.split(
-            '\r\n')[:-1] + responses[1].text.split('\r\n')[1:-1]
-        return '\n'.join(merged_list)
+    def concatenate_parts(self, parts: List[Path]) -> None:
+        """
+        Writes the SDMX CSV parts to file_path, keeping the header of the first part only.
+        The data lines are counted while copying.
+
+        """
+        rows = 0
+        with open(self.file_path, 'w+b') as out:
+            for i, part in enumerate(parts):
+                with open(part, 'rb') as f:
+                    header = f.readline()
+                    if i == 0:
+                        out.write(header)
+                    for block in iter(lambda: f.read(self.DOWNLOAD_CHUNK_SIZE), b''):
+                        out.write(block)
+                        rows += block.count(b'\n')
+                    if out.tell() > 0:
+                        out.seek(-1, 1)
+                        if out.read(1) != b'\n':
+                            out.write(b'\n')
+                            rows += 1
+        self.stats.set('rows_extracted', rows)
+
+    def probe_remote_version(self) -> Optional[str]:
+        # Upload date of the latest Economic Outlook, from the OECD search metadata
+        return self.OECD_upload_date
 
-    def save_data(self, data: str) -> None:
-        with open(self.file_path, "w") as f:
-            f.write(data)
-    
     def database_up_to_date(self) -> bool:
-        return self.get_last_update() >= self.OECD_upload_date
+        return super().database_up_to_date() or self.get_last_update() >= self.OECD_upload_date
     
     def get_last_update(self) -> Optional[str]:
+        # O(1) lookup of the watermark, databases loaded before it existed fall back to the latest stored publication
+        watermark = self.get_watermark()
+        if watermark is not None and watermark.date_published is not None:
+            return str(self._naive_utc(watermark.date_published).date())
         try:
             institution_id = Institution.objects.get(abbreviation=self.institution)
         except Institution.DoesNotExist:
@@ -0,0 +1,144 @@
+import concurrent.futures
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from django.db import connection, connections
+from .accuracy import refresh_accuracy
+from .base import BaseAPIClient
+from .ledger import RunLedger
+
+
+def _run_transform(client: BaseAPIClient) -> Tuple[float, Dict]:
+    """
+    Runs the transform phase of a client in a worker process and returns its duration
+    and the run statistics, which are otherwise lost with the worker's copy of the client.
+
+    """
+    start = time.perf_counter()
+    client.run_phase('transform')
+    return time.perf_counter() - start, client.stats.as_dict()
+
+
+class ETLOrchestrator:
+    """
+    Runs the ETL process of several sources at once.
+
+    Clients are constructed and extracted concurrently in a bounded thread pool (network bound),
+    transformed in a process pool (CPU bound, pandas) and loaded one at a time in the calling
+    process so that loads never compete for the same tables. Each source follows the phases of
+    its client's mode (see BaseAPIClient.PHASES); a failing source does not stop the others.
+    Every source run is recorded in etl_run like BaseAPIClient.run does.
+
+    Args:
+        factories (Dict[str, Callable]): Source name -> callable building its API client
+        mode (str): ETL mode applied to every source ('etl', 'e', 't' or 'l')
+        max_workers (int, optional): Size of the thread and process pools. Defaults to 4
+        logger (logging.Logger, optional): Logger for progress messages
+
+    """
+
+    def __init__(self,
+                 factories: Dict[str, Callable[[], BaseAPIClient]],
+                 mode: str,
+                 max_workers: int = 4,
+                 logger: Optional[logging.Logger] = None):
+        if mode not in BaseAPIClient.PHASES:
+            raise ValueError("Invalid mode. Choose from 'etl', 'e', 't' or 'l'")
+        self.factories = factories
+        self.mode = mode
+        self.max_workers = max_workers
+        self.logger = logger or logging.getLogger(__name__)
+        self.clients: Dict[str, BaseAPIClient] = {}
+        self.ledgers: Dict[str, RunLedger] = {}
+        self.summary = {source: {'source': source, 'status': 'pending', 'extract': None,
+                                 'transform': None, 'load': None, 'error': None}
+                        for source in factories}
+
+    def run(self) -> List[Dict]:
+        """
+        Runs all phases and returns one summary row (status and timings in seconds) per source.
+
+        """
+        self._run_extracts()
+        if 'transform' in BaseAPIClient.PHASES[self.mode]:
+            self._run_transforms()
+        if 'load' in BaseAPIClient.PHASES[self.mode]:
+            self._run_loads()
+        for row in self.summary.values():
+            if row['status'] == 'pending':
+                row['status'] = 'done'
+        for source, client in self.clients.items():
+            self.ledgers[source].finish('done', client.stats)
+        return list(self.summary.values())
+
+    def _fail(self, source: str, phase: str, error: Exception):
+        self.logger.error(f"{source}: {phase} failed: {error}")
+        self.summary[source]['status'] = f"{phase} failed"
+        self.summary[source]['error'] = str(error)
+        client = self.clients.pop(source, None)
+        if client is not None:
+            self.ledgers[source].finish('failed', client.stats, error)
+
+    def _construct_and_extract(self, source: str) -> Optional[float]:
+        try:
+            return self._extract(source)
+        finally:
+            # Database connections are per thread, close the ones opened by this worker
+            connections.close_all()
+
+    def _extract(self, source: str) -> Optional[float]:
+        client = self.factories[source]()
+        self.ledgers[source] = RunLedger(client.institution, self.mode, self.logger)
+        self.ledgers[source].start()
+        self.clients[source] = client
+        if self.mode == 'etl' and client.database_up_to_date():
+            self.logger.info(f"{source}: database is up-to-date, skipping")
+            self.summary[source]['status'] = 'up-to-date'
+            self.clients.pop(source)
+            self.ledgers[source].finish('up-to-date', client.stats)
+            return None
+        if 'extract' not in BaseAPIClient.PHASES[self.mode]:
+            return None
+        start = time.perf_counter()
+        client.run_phase('extract')
+        return time.perf_counter() - start
+
+    def _run_extracts(self):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._construct_and_extract, source): source for source in self.factories}
+            for future in concurrent.futures.as_completed(futures):
+                source = futures[future]
+                try:
+                    self.summary[source]['extract'] = future.result()
+                except Exception as e:
+                    self._fail(source, 'extract', e)
+
+    def _run_transforms(self):
+        # Forked workers must not share the database connections of this process
+        connections.close_all()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(_run_transform, client): source for source, client in self.clients.items()}
+            for future in concurrent.futures.as_completed(futures):
+                source = futures[future]
+                try:
+                    self.summary[source]['transform'], stats = future.result()
+                    self.clients[source].stats.update(stats)
+                except Exception as e:
+                    self._fail(source, 'transform', e)
+
+    def _run_loads(self):
+        loaded = False
+        for source, client in list(self.clients.items()):
+            start = time.perf_counter()
+            # forecast_accuracy compares keys of every institution, it is refreshed once below
+            client.refresh_accuracy = False
+            try:
+                client.run_phase('load')
+            except Exception as e:
+                self._fail(source, 'load', e)
+                continue
+            finally:
+                loaded = loaded or bool(client.stats.as_dict().get('rows_inserted'))
+            self.summary[source]['load'] = time.perf_counter() - start
+        if loaded and connection.vendor == 'postgresql':
+            refresh_accuracy(self.logger)
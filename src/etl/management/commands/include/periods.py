@@ -0,0 +1,73 @@
+import functools
+import re
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+from dateutil import parser as date_parser
+
+# "2024", "2024-Q1", "2024 Q1" and "2024:Q1"
+PERIOD_PATTERN = re.compile(r'^(\d{4})(?:[-: ]?Q([1-4]))?$')
+ANNUAL = pd.DateOffset(years=1)
+QUARTERLY = pd.DateOffset(months=3)
+MONTHLY = pd.DateOffset(months=1)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_period(period: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Returns the first day of the period and the first day of the next one.
+    Strings that are not years or quarters (e.g. "Sep. 2025") are parsed as months.
+
+    """
+    match = PERIOD_PATTERN.match(period.strip())
+    if match is not None:
+        year, quarter = match.groups()
+        if quarter is None:
+            start = pd.Timestamp(int(year), 1, 1)
+            return start, start + ANNUAL
+        start = pd.Timestamp(int(year), int(quarter) * 3 - 2, 1)
+        return start, start + QUARTERLY
+    try:
+        start = pd.Timestamp(date_parser.parse(period).replace(day=1))
+    except (ValueError, OverflowError):
+        raise ValueError(f"Date {period} not in expected format")
+    return start, start + MONTHLY
+
+
+def parse_period(period: str) -> pd.Timestamp:
+    """
+    Returns the first day of a single period string ("YYYY", "YYYY-Qn", "YYYY Qn").
+
+    """
+    return _parse_period(period)[0]
+
+
+def parse_periods(periods: pd.Series, span: Optional[pd.DateOffset] = None) -> pd.DataFrame:
+    """
+    Parses a whole column of period strings into date_from/date_until.
+
+    Only the distinct strings are parsed (a few dozen for hundreds of thousands of rows),
+    the results are then spread back to the rows by their factorized codes.
+    date_until is the start of the next period, or date_from + span when span is given.
+    Missing values give NaT.
+
+    """
+    codes, uniques = pd.factorize(periods)
+    bounds = [_parse_period(str(period)) for period in uniques]
+    starts = pd.DatetimeIndex([start for start, _ in bounds] + [pd.NaT])
+    if span is None:
+        ends = pd.DatetimeIndex([end for _, end in bounds] + [pd.NaT])
+    else:
+        ends = starts + span
+    # Code -1 (missing value) picks the trailing NaT
+    return pd.DataFrame({'date_from': starts[codes], 'date_until': ends[codes]}, index=periods.index)
+
+
+def period_ends(date_from: pd.Series, freq: pd.Series) -> pd.Series:
+    """
+    Returns the end (start of the next period) of annual ('A') or quarterly ('Q') periods starting at date_from.
+
+    """
+    date_from = pd.to_datetime(date_from)
+    return pd.Series(np.where(freq == 'Q', date_from + QUARTERLY, date_from + ANNUAL),
+                     index=date_from.index, dtype=date_from.dtype)
@@ -1,29 +1,31 @@
+from io import StringIO
+from functools import cached_property
 import pandas as pd
 from .base import BaseAPIClient
+from .periods import parse_period, parse_periods, period_ends
 from indicator.models import Publishes
 from institution.models import Institution
 from geography.models import Area
 import numpy as np
-import time
 url = 'https://www.philadelphiafed.org/surveys-and-data/real-time-data-research/spf-q4-2023'
 
 class PhiladelphiaClient(BaseAPIClient):
+    institution = 'FRBP'
+    # Every published quarter has its own page
+    freshness = 'vintage'
+
     def __init__(self, url, mode='t'):
         super().__init__(url)
         self.mode = mode
         self.url = url
-        self.institution = 'FRBP'
-        self.data = self.get_data()
-        self.PHILADELPHIA_DIR = self.BASE_DIR / 'data' / 'philadelphia'
-        self.forecasts = [self.data[0]] + [self.data[1]]
+        self.PHILADELPHIA_DIR = self.DATA_DIR / 'philadelphia'
         self.year_published = self.url.split('-')[-1]
         self.quarter_published = self.url.split('-')[-2].upper()
-        self.date_published = self.parse_date(f"{self.year_published}-{self.quarter_published}")
+        self.date_published = parse_period(f"{self.year_published}-{self.quarter_published}")
         self.file_path = self.PHILADELPHIA_DIR /  f"PHILADELPHIA_SPF_{self.year_published}-{self.quarter_published}.csv"
-        self.file_path_for_loading = self.PHILADELPHIA_DIR /  f"FRBP_data_transformed_{self.year_published}-{self.quarter_published}.csv"
+        self.file_path_for_loading = self.PHILADELPHIA_DIR /  f"FRBP_data_transformed_{self.year_published}-{self.quarter_published}{self.storage.suffix}"
         self.logger.info(f"Philadelphia URL: {self.url}")
         self.logger.info(f"Philadelphia file path: {self.file_path}")
-        self.PHILADELPHIA_DIR.mkdir(parents=True, exist_ok=True)
         self.DB_COLUMNS = ['inst_instid','indic_indicid','area_areaid','date_published','date_from','date_until','value','is_forecast']
         self.area = 'USA'
         self.indicator_mapping = {
@@ -36,12 +38,22 @@ class PhiladelphiaClient(BaseAPIClient):
             'Core PCE' : 'CPCE',
         }
     
+    # The page is only downloaded when the extract phase needs it
+    @cached_property
+    def data(self):
+        return self.get_data()
+
+    @cached_property
+    def forecasts(self):
+        return [self.data[0]] + [self.data[1]]
+
     def get_data(self):
-        tables = pd.read_html(self.url)
+        # Single download through the pooled session of BaseAPIClient
+        page = self.fetcher.fetch_one(self.url, self._get_data).text
+        tables = pd.read_html(StringIO(page))
         return tables
     
     def run_extract(self):
-        time.sleep(1)
         dfs = []
         for forecast in self.forecasts:
             if forecast.empty:
@@ -62,6 +74,8 @@ class PhiladelphiaClient(BaseAPIClient):
             dfs.append(df)
         df1, df2 = dfs
         final_df = df1.merge(df2, on=['date_from', 'FREQ'], how='outer')
+        self.stats.set('rows_extracted', len(final_df))
+        self.PHILADELPHIA_DIR.mkdir(parents=True, exist_ok=True)
         final_df.to_csv(self.file_path, index=False)
         self.logger.info(f"Data saved to {self.file_path}")
 
@@ -79,31 +93,16 @@ class PhiladelphiaClient(BaseAPIClient):
         df = df[date_related_mask].copy()
         self.logger.info("Data records after date filtering: " + str(df.shape[0]))
         df.reset_index(drop=True, inplace=True)
-        df['date_from'] = df['date_from'].str.replace(':', '-')
-        df['FREQ'] = df['date_from'].apply(lambda x: 'A' if len(x) == 4 else 'Q')
+        df['FREQ'] = np.where(df['date_from'].str.len() == 4, 'A', 'Q')
         try:
-            df['date_from'] = df['date_from'].apply(self.parse_date)
+            df['date_from'] = parse_periods(df['date_from'])['date_from']
         except Exception as e:
             self.logger.error(f"Error parsing date column: {e}")
             raise
         df.dropna(axis=1, how='all', inplace=True)
         return df
 
-    def parse_date(self, date: str) -> pd.Timestamp:
-        try:
-            if len(date) == 4:
-                return pd.Timestamp(date + "-01-01")
-            if len(date) == 7 and "-Q" in date:
-                year, quarter = date.split("-Q")
-                month = int(quarter) * 3 - 2
-                return pd.Timestamp(f"{year}-{month:02d}-01")
-            return pd.Timestamp(date)
-        except Exception as e:
-            self.logger.error(f"Error parsing date {date}: {e}")
-            raise
-
     def run_transform(self):
-        time.sleep(1)
         self.logger.info("Start transforming data")
         try:
             df = pd.read_csv(self.file_path)
@@ -119,10 +118,11 @@ class PhiladelphiaClient(BaseAPIClient):
         transformed_df['area_areaid'] = self.area
         transformed_df['date_published'] = self.date_published
         transformed_df['date_from'] = pd.to_datetime(unpivoted_df['date_from'])
-        transformed_df['date_until'] = unpivoted_df.apply(lambda x: 
-                                                          pd.to_datetime(x['date_from']) + pd.DateOffset(years=1) if x['FREQ'] == 'A' else pd.to_datetime(x['date_from']) + pd.DateOffset(months=3), axis=1)
-        transformed_df['value'] = unpivoted_df['value'].replace('N.A.', np.nan)
+        transformed_df['date_until'] = period_ends(transformed_df['date_from'], unpivoted_df['FREQ'])
+        transformed_df['value'] = pd.to_numeric(unpivoted_df['value'].replace('N.A.', np.nan))
         transformed_df.dropna(subset=['value'], inplace=True)
         transformed_df['is_forecast'] = 'Y'
-        transformed_df.to_csv(self.file_path_for_loading, index=False)
+        self.storage.write(transformed_df, self.file_path_for_loading)
+        self.stats.set('rows_transformed', len(transformed_df))
         self.logger.info(f"Data transformed and saved to {self.file_path_for_loading}")
+        return transformed_df
@@ -0,0 +1,195 @@
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is optional, CSV is used without it
+    pa = None
+
+# Code columns written as categoricals (dictionary encoded in Parquet/Feather)
+CATEGORICAL_COLUMNS = ['inst_instid', 'indic_indicid', 'area_areaid', 'is_forecast']
+
+
+class IntermediateFormat(ABC):
+    """
+    File format used to hand transformed data from the transform to the load phase.
+
+    Subclasses implement `write`, `read` and `open_writer` (for data written in chunks).
+
+    """
+    name = None
+    suffix = None
+
+    @abstractmethod
+    def write(self, df: pd.DataFrame, path: Path) -> None:
+        pass
+
+    @abstractmethod
+    def read(self, path: Path) -> pd.DataFrame:
+        pass
+
+    @abstractmethod
+    def open_writer(self, path: Path) -> 'ChunkWriter':
+        pass
+
+    @staticmethod
+    def with_categories(df: pd.DataFrame) -> pd.DataFrame:
+        columns = [column for column in CATEGORICAL_COLUMNS
+                   if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype)]
+        if not columns:
+            return df
+        return df.astype({column: 'category' for column in columns})
+
+
+class ChunkWriter(ABC):
+    """
+    Context manager appending data frames to a single intermediate file.
+
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @abstractmethod
+    def write(self, df: pd.DataFrame) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class CSVFormat(IntermediateFormat):
+    name = 'csv'
+    suffix = '.csv'
+
+    def write(self, df: pd.DataFrame, path: Path) -> None:
+        df.to_csv(path, index=False)
+
+    def read(self, path: Path) -> pd.DataFrame:
+        return pd.read_csv(path)
+
+    def open_writer(self, path: Path) -> ChunkWriter:
+        return CSVChunkWriter(path)
+
+
+class CSVChunkWriter(ChunkWriter):
+    def __init__(self, path: Path):
+        self.path = path
+        self.header = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        df.to_csv(self.path, index=False, mode='w' if self.header else 'a', header=self.header)
+        self.header = False
+
+
+class ArrowChunkWriter(ChunkWriter):
+    """
+    Writes every chunk as a record batch/row group, cast to the schema of the first chunk.
+    The dictionary of a code column only grows, Arrow IPC files can add to it but not replace it.
+
+    """
+
+    def __init__(self, path: Path, open_file):
+        self.path = path
+        self.open_file = open_file
+        self.writer = None
+        self.categories: Dict[str, pd.Index] = {}
+
+    def extend_categories(self, df: pd.DataFrame) -> pd.DataFrame:
+        df = IntermediateFormat.with_categories(df)
+        extended = {}
+        for column in df.columns:
+            if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                continue
+            categories = df[column].cat.categories
+            seen = self.categories.get(column)
+            if seen is not None:
+                categories = seen.append(categories[~categories.isin(seen)])
+            self.categories[column] = categories
+            extended[column] = df[column].cat.set_categories(categories)
+        return df.assign(**extended)
+
+    def write(self, df: pd.DataFrame) -> None:
+        table = pa.Table.from_pandas(self.extend_categories(df), preserve_index=False)
+        if self.writer is None:
+            # int32 indices, the int8 ones pandas picks for the first chunk overflow past 127 codes
+            self.schema = pa.schema([
+                field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                if pa.types.is_dictionary(field.type) else field
+                for field in table.schema], metadata=table.schema.metadata)
+            self.writer = self.open_file(self.path, self.schema)
+        self.writer.write_table(table.cast(self.schema))
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ParquetFormat(IntermediateFormat):
+    name = 'parquet'
+    suffix = '.parquet'
+
+    def write(self, df: pd.DataFrame, path: Path) -> None:
+        table = pa.Table.from_pandas(self.with_categories(df), preserve_index=False)
+        pq.write_table(table, path)
+
+    def read(self, path: Path) -> pd.DataFrame:
+        return pq.read_table(path, memory_map=True).to_pandas()
+
+    def open_writer(self, path: Path) -> ChunkWriter:
+        return ArrowChunkWriter(path, lambda path, schema: pq.ParquetWriter(path, schema))
+
+
+class FeatherFormat(IntermediateFormat):
+    name = 'feather'
+    suffix = '.feather'
+
+    def write(self, df: pd.DataFrame, path: Path) -> None:
+        table = pa.Table.from_pandas(self.with_categories(df), preserve_index=False)
+        feather.write_feather(table, path, compression='uncompressed')
+
+    def read(self, path: Path) -> pd.DataFrame:
+        # Uncompressed Arrow IPC files are read without copying from the memory map
+        return feather.read_table(path, memory_map=True).to_pandas()
+
+    def open_writer(self, path: Path) -> ChunkWriter:
+        return ArrowChunkWriter(path, lambda path, schema: pa.ipc.new_file(
+            str(path), schema, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)))
+
+
+FORMATS: Dict[str, type] = {
+    'parquet': ParquetFormat,
+    'feather': FeatherFormat,
+    'csv': CSVFormat,
+}
+ARROW_FORMATS = ('parquet', 'feather')
+
+
+def get_format(name: str, logger: Optional[logging.Logger] = None) -> IntermediateFormat:
+    """
+    Returns the intermediate format called name. Falls back to CSV when pyarrow is not installed.
+
+    """
+    if name not in FORMATS:
+        raise ValueError(f"Invalid intermediate format {name}. Choose from {', '.join(FORMATS)}")
+    if name in ARROW_FORMATS and pa is None:
+        (logger or logging.getLogger(__name__)).warning(f"pyarrow is not installed, using csv instead of {name}")
+        name = 'csv'
+    return FORMATS[name]()
+
+
+def read_any(paths: Iterable[Path]) -> pd.DataFrame:
+    """
+    Concatenates intermediate files, the format of each one is taken from its suffix.
+
+    """
+    suffixes = {cls.suffix: cls for cls in FORMATS.values()}
+    return pd.concat([suffixes[Path(path).suffix]().read(Path(path)) for path in paths], ignore_index=True)
@@ -0,0 +1,26 @@
+import threading
+
+
+class ThreadShared:
+    """
+    Base class of the objects a client shares between its fetcher threads.
+
+    Clients are pickled to the transform worker processes, and locks are not picklable: the
+    attributes listed in THREAD_ATTRIBUTES are left out of the pickled state and created again
+    by init_thread_state when unpickled. Subclasses call init_thread_state from __init__.
+
+    """
+    THREAD_ATTRIBUTES = ('lock',)
+
+    def init_thread_state(self) -> None:
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self.THREAD_ATTRIBUTES:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.init_thread_state()
@@ -14,9 +14,8 @@ import requests
 """
 
 
-def get_last_upload_date_OECD() -> str:
+def get_last_upload_date_OECD(url: str = "https://dotstat-search.oecd.org/api/search?tenant=oecd") -> str:
 
-    url = "https://dotstat-search.oecd.org/api/search?tenant=oecd"
     headers = {
         "accept": "application/json, text/plain, */*",
         "accept-encoding": "gzip, deflate, br, zstd",
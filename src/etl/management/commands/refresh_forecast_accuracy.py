@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from indicator.cache import invalidate_publications
+from .include.accuracy import AccuracyEngine
+
+
+class Command(BaseCommand):
+    help = """Compare the forecasts of publishes with the latest realized values and materialize the errors
+    in forecast_accuracy. Only the indicator/area/periods with rows loaded since the previous refresh
+    are recomputed, unless --full is given. Prints bias, MAE and RMSE by institution and horizon."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild forecast_accuracy from scratch (e.g. after rows were deleted from publishes)')
+        parser.add_argument('--institution', nargs='+',
+                            help='Institutions of the summary (default all)')
+        parser.add_argument('--no-summary', action='store_true',
+                            help='Only refresh, do not print the summary')
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Forecast accuracy can only be computed on PostgreSQL")
+        engine = AccuracyEngine()
+        refresh = engine.refresh(full=kwargs['full'])
+        invalidate_publications()
+        duration = (refresh.finished_at - refresh.started_at).total_seconds()
+        keys = 'all' if refresh.keys_refreshed is None else refresh.keys_refreshed
+        self.stdout.write(self.style.SUCCESS(
+            f"{refresh.mode.capitalize()} refresh: {keys} indicator/area/periods, "
+            f"{refresh.rows_refreshed} forecasts compared in {duration:.2f}s"))
+        if kwargs['no_summary']:
+            return
+        self.stdout.write(f"{'institution':<12}{'horizon':>8}{'forecasts':>11}{'bias':>16}{'MAE':>16}{'RMSE':>16}")
+        for row in engine.summary(kwargs['institution']):
+            self.stdout.write(f"{row['institution']:<12}{row['horizon']:>8}{row['forecasts']:>11,}"
+                              f"{row['bias']:>16.4f}{row['mae']:>16.4f}{row['rmse']:>16.4f}")
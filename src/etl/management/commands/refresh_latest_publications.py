@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from indicator.cache import invalidate_publications
+from institution.models import Institution
+from .include.latest import LatestVintages
+import time
+
+
+class Command(BaseCommand):
+    help = """Refresh publishes_latest, the latest vintage of every institution/indicator/area/period of publishes.
+    The ETL load phase refreshes it after every load; only the rows loaded since the previous refresh are
+    read, unless --full is given."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--institution', nargs='+',
+                            help='Abbreviations of the institutions to refresh (default all)')
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild from scratch (e.g. after rows were deleted from publishes)')
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'postgresql':
+            raise CommandError("publishes_latest is only maintained on PostgreSQL")
+        institutions = Institution.objects.order_by('abbreviation')
+        if kwargs['institution']:
+            institutions = institutions.filter(abbreviation__in=kwargs['institution'])
+            missing = set(kwargs['institution']) - {institution.abbreviation for institution in institutions}
+            if missing:
+                raise CommandError(f"Unknown institutions {', '.join(sorted(missing))}")
+        engine = LatestVintages()
+        start = time.perf_counter()
+        if kwargs['full']:
+            ids = [institution.pk for institution in institutions] if kwargs['institution'] else None
+            rows = engine.rebuild(ids)
+            invalidate_publications([institution.abbreviation for institution in institutions])
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt {rows} latest vintages in {time.perf_counter() - start:.2f}s"))
+            return
+        for institution in institutions:
+            rows = engine.refresh(institution.pk)
+            self.stdout.write(f"{institution.abbreviation}: {rows} keys updated")
+            invalidate_publications([institution.abbreviation])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed in {time.perf_counter() - start:.2f}s"))
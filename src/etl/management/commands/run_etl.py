@@ -1,8 +1,32 @@
+from django.conf import settings
+from django.core.management import call_command
 from django.core.management.base import BaseCommand, CommandError
 from .include.oecd import OECDClient
 from .include.imf import IMFClient
 from .include.philadephia import PhiladelphiaClient
 from .include.ecb import ECBClient
+from .include.orchestrator import ETLOrchestrator
+from .include.instrumentation import PROFILERS
+from .include.logs import source_logger
+SOURCES = ('oecd', 'imf', 'philadelphia', 'ecb')
+
+
+def build_client(source, mode, year, quarter, profile=None):
+    client = _build_client(source, mode, year, quarter)
+    client.instrumentation.profile = profile
+    return client
+
+
+def _build_client(source, mode, year, quarter):
+    if source == 'oecd':
+        return OECDClient(mode)
+    if source == 'imf':
+        return IMFClient(mode)
+    if source == 'philadelphia':
+        return PhiladelphiaClient(settings.PHILADELPHIA_ENDPOINT.format(year=year, quarter=quarter), mode)
+    if source == 'ecb':
+        return ECBClient(settings.ECB_ENDPOINT.format(year=year, quarter=quarter), mode)
+    raise CommandError("Source does not exist")
 
 
 class Command(BaseCommand):
@@ -12,38 +36,44 @@ class Command(BaseCommand):
         parser.add_argument('--mode', type=str,
                             help='Mode to run the ETL process (t, e, l, etl for full process)')
         parser.add_argument('--source', type=str,
-                            help='Run ETL process for a specific source')
-        
+                            help="Run ETL process for a specific source, or 'all' to run every source in parallel")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Number of parallel extract/transform workers when --source all (default 4)")
+        parser.add_argument('--snapshot', action='store_true',
+                            help='Take an incremental snapshot of publishes before loading (see snapshot_publications)')
+        parser.add_argument('--profile', choices=PROFILERS,
+                            help='Profile every phase with cProfile (statistics saved to data/profiles) or tracemalloc')
+
     def handle(self, *args, **kwargs):
         mode = kwargs['mode']
         source = kwargs['source']
         if mode not in ['t', 'e', 'l', 'etl']:
             raise CommandError("Invalid mode. Use 't', 'e', 'l', or 'etl'")
-        if source not in ('oecd', 'imf', 'philadelphia', 'ecb'):
-            raise CommandError("Invalid source. Use 'oecd' or 'imf' or 'philadelphia' or 'ecb'")
+        if source not in SOURCES + ('all',):
+            raise CommandError("Invalid source. Use 'oecd' or 'imf' or 'philadelphia' or 'ecb' or 'all'")
         with open('year.txt', 'r') as f:
             year = f.read()
         with open('quarter.txt', 'r') as f:
             quarter = f.read()
-        if source == 'oecd':
-            print("Running ETL for OECD")
-            oecd_client = OECDClient(mode)
-            oecd_client.run()
-        elif source == 'imf':
-            print("Running ETL for IMF")
-            imf_client = IMFClient(mode)
-            imf_client.run()
-        elif source == 'philadelphia':
-            print("Running ETL for Philadelphia")
-            url = f'https://www.philadelphiafed.org/surveys-and-data/real-time-data-research/spf-q{quarter}-{year}'
-            philly_client = PhiladelphiaClient(url, mode)
-            philly_client.run()
-
-        elif source == 'ecb':
-            print("Running ETL for ECB")
-            url = f'https://www.ecb.europa.eu/stats/ecb_surveys/survey_of_professional_forecasters/html/table_3_{year}q{quarter}.en.html'
-            ecb_client = ECBClient(url, mode)
-            ecb_client.run()
-        else:
-            raise CommandError("Source does not exist")
-        
\ No newline at end of file
+        if kwargs['snapshot'] and mode in ('l', 'etl'):
+            call_command('snapshot_publications', label=source)
+        if source == 'all':
+            self.run_all(mode, year, quarter, kwargs['workers'], kwargs['profile'])
+            return
+        source_logger(source).info(f"Running ETL for {source}")
+        client = build_client(source, mode, year, quarter, kwargs['profile'])
+        client.run()
+
+    def run_all(self, mode, year, quarter, workers, profile=None):
+        factories = {source: (lambda source=source: build_client(source, mode, year, quarter, profile))
+                     for source in SOURCES}
+        summary = ETLOrchestrator(factories, mode, max_workers=workers).run()
+        self.stdout.write(f"{'source':<14}{'status':<20}{'extract':>10}{'transform':>11}{'load':>10}")
+        for row in summary:
+            timings = ''.join(f"{row[phase]:>{width}.2f}" if row[phase] is not None else f"{'-':>{width}}"
+                              for phase, width in (('extract', 10), ('transform', 11), ('load', 10)))
+            line = f"{row['source']:<14}{row['status']:<20}{timings}"
+            if row['error']:
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
@@ -1,19 +1,50 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from .include.base import data_dir
+from .include.ledger import RunLedger, RunStats
+from .include.logs import source_logger
 from .include.oecd import OECDClient
 from .include.imf import IMFClient
 from .include.philadephia import PhiladelphiaClient
 from .include.ecb import ECBClient
-import time
+from .include.ratelimit import HostRateLimiter
+from .include.storage import read_any
+from pathlib import Path
+import concurrent.futures
+import json
+import threading
+
+# Client class and the setting holding its URL template
+BACKFILL_CLIENTS = {
+    'philadelphia': (PhiladelphiaClient, 'PHILADELPHIA_ENDPOINT'),
+    'ecb': (ECBClient, 'ECB_ENDPOINT'),
+}
+
 
 class Command(BaseCommand):
-    help = 'Run ETL process for each data source'
+    help = """Run ETL process for each data source.
+    For 'philadelphia' and 'ecb' every published quarter of the given range is backfilled:
+    quarters are extracted and transformed by a bounded pool of workers sharing a per-host
+    rate limit, then loaded in a single batch. Finished quarters are recorded in a checkpoint
+    file so that a run with failures resumes where it stopped."""
 
     def add_arguments(self, parser):
         parser.add_argument('--mode', type=str,
                             help='Mode to run the ETL process (t, e, l, etl for full process)')
         parser.add_argument('--source', type=str,
                             help='Run ETL process for a specific source')
-        
+        parser.add_argument('--start-year', type=int, default=2020)
+        parser.add_argument('--end-year', type=int, default=2024)
+        parser.add_argument('--start-quarter', type=int, default=1, choices=range(1, 5))
+        parser.add_argument('--end-quarter', type=int, default=4, choices=range(1, 5))
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of quarters processed concurrently (default 4)')
+        parser.add_argument('--rate', type=float, default=1.0,
+                            help='Maximum page downloads per second and host (default 1)')
+        parser.add_argument('--checkpoint', type=Path,
+                            help='Checkpoint file (default backfill_<source>.json in ETL_DATA_DIR)')
+
     def handle(self, *args, **kwargs):
         mode = kwargs['mode']
         source = kwargs['source']
@@ -21,44 +52,115 @@ class Command(BaseCommand):
             raise CommandError("Invalid mode. Use 't', 'e', 'l', or 'etl'")
         if source not in ('oecd', 'imf', 'philadelphia', 'ecb'):
             raise CommandError("Invalid source. Use 'oecd' or 'imf' or 'philadelphia' or 'ecb'")
-        
+
+        source_logger(source).info(f"Running ETL for {source}")
         if source == 'oecd':
-            print("Running ETL for OECD")
             oecd_client = OECDClient(mode)
             oecd_client.run()
         elif source == 'imf':
-            print("Running ETL for IMF")
             imf_client = IMFClient(mode)
             imf_client.run()
-        elif source == 'philadelphia':
-            print("Running ETL for Philadelphia")
-            start_year = 2020
-            end_year = 2024
-            start_quarter = 1
-            end_quarter = 4
-            for year in range(start_year, end_year+1):
-                for quarter in range(start_quarter, end_quarter+1):
-                    url = f'https://www.philadelphiafed.org/surveys-and-data/real-time-data-research/spf-q{quarter}-{year}'
-                    philly_client = PhiladelphiaClient(url, mode)
-                    philly_client.run()
-                    time.sleep(2)
-                    self.stdout.write(self.style.SUCCESS(f"Successfully extracted data for {year} Q{quarter}"))
-                    time.sleep(2)
-            
-        elif source == 'ecb':
-            print("Running ETL for ECB")
-            start_year = 2020
-            end_year = 2024
-            start_quarter = 1
-            end_quarter = 4
-            for year in range(start_year, end_year+1):
-                for quarter in range(start_quarter, end_quarter+1):
-                    url = f'https://www.ecb.europa.eu/stats/ecb_surveys/survey_of_professional_forecasters/html/table_3_{year}q{quarter}.en.html'
-                    ecb_client = ECBClient(url, mode)
-                    ecb_client.run()
-                    time.sleep(2)
-                    self.stdout.write(self.style.SUCCESS(f"Successfully extracted data for {year} Q{quarter}"))
-                    time.sleep(2)
         else:
-            raise CommandError("Source does not exist")
-        
\ No newline at end of file
+            self.backfill(source, mode, kwargs)
+
+    def quarters(self, start_year, end_year, start_quarter, end_quarter):
+        return [(year, quarter)
+                for year in range(start_year, end_year + 1)
+                for quarter in range(1, 5)
+                if (year, quarter) >= (start_year, start_quarter) and (year, quarter) <= (end_year, end_quarter)]
+
+    def backfill(self, source, mode, kwargs):
+        """
+        Runs the backfill of a source as a single run recorded in etl_run, with the statistics of every quarter.
+
+        """
+        client_class = BACKFILL_CLIENTS[source][0]
+        ledger = RunLedger(client_class.institution, mode, source_logger(client_class.institution))
+        ledger.start()
+        stats = RunStats()
+        try:
+            self.run_backfill(source, mode, kwargs, stats)
+        except Exception as e:
+            ledger.finish('failed', stats, e)
+            raise
+        ledger.finish('done', stats)
+
+    def run_backfill(self, source, mode, kwargs, stats):
+        client_class, endpoint_setting = BACKFILL_CLIENTS[source]
+        url_template = getattr(settings, endpoint_setting)
+        checkpoint_path = kwargs['checkpoint'] or data_dir() / f'backfill_{source}.json'
+        checkpoint = self.read_checkpoint(checkpoint_path)
+        rate_limiter = HostRateLimiter(kwargs['rate'])
+        lock = threading.Lock()
+        phases = [phase for phase in ('extract', 'transform') if phase in client_class.PHASES[mode]]
+        quarters = self.quarters(kwargs['start_year'], kwargs['end_year'],
+                                 kwargs['start_quarter'], kwargs['end_quarter'])
+
+        def process(year, quarter):
+            key = f"{year}-Q{quarter}"
+            done = checkpoint.get(key, {}).get('phases', [])
+            if key in checkpoint and all(phase in done for phase in phases):
+                self.stdout.write(f"{key} already processed, skipping")
+                return
+            url = url_template.format(year=year, quarter=quarter)
+            try:
+                client = client_class(url, mode)
+                # Every download and retry of the workers shares the per-host budget
+                client.fetcher.rate_limiter = rate_limiter
+                try:
+                    for phase in phases:
+                        if phase not in done:
+                            client.run_phase(phase)
+                            done = done + [phase]
+                finally:
+                    stats.merge(client.stats)
+                with lock:
+                    checkpoint[key] = {'phases': done, 'file': str(client.file_path_for_loading)}
+                    self.write_checkpoint(checkpoint_path, checkpoint)
+            finally:
+                connections.close_all()
+            self.stdout.write(self.style.SUCCESS(f"Successfully processed data for {key}"))
+
+        failures = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=kwargs['workers']) as executor:
+            futures = {executor.submit(process, year, quarter): f"{year}-Q{quarter}" for year, quarter in quarters}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failures.append(futures[future])
+                    self.stderr.write(f"Failed to process {futures[future]}: {e}")
+        if failures:
+            raise CommandError(f"{len(failures)} quarters failed ({', '.join(sorted(failures))}). "
+                               f"Run the command again to resume from {checkpoint_path}")
+
+        if 'load' in client_class.PHASES[mode]:
+            self.load(source, client_class, url_template, quarters, checkpoint, stats)
+        checkpoint_path.unlink(missing_ok=True)
+
+    def load(self, source, client_class, url_template, quarters, checkpoint, stats):
+        keys = [f"{year}-Q{quarter}" for year, quarter in quarters]
+        missing = [key for key in keys if key not in checkpoint]
+        if missing:
+            raise CommandError(f"No transformed data for {', '.join(missing)}. Run in 't' mode first")
+        df = read_any(checkpoint[key]['file'] for key in keys)
+        self.stdout.write(f"Loading {len(df)} records of {len(keys)} quarters in one batch")
+        year, quarter = quarters[-1]
+        client = client_class(url_template.format(year=year, quarter=quarter), 'l')
+        try:
+            client.run_phase('load', df)
+        finally:
+            stats.merge(client.stats)
+        self.stdout.write(self.style.SUCCESS(f"Successfully loaded {source} data"))
+
+    def read_checkpoint(self, path: Path):
+        if not path.exists():
+            return {}
+        self.stdout.write(f"Resuming from checkpoint {path}")
+        return json.loads(path.read_text())
+
+    def write_checkpoint(self, path: Path, checkpoint):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(checkpoint, indent=2))
+        tmp_path.replace(path)
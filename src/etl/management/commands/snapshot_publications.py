@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from indicator.cache import invalidate_publications
+from .include.accuracy import AccuracyEngine
+from .include.latest import LatestVintages
+REL_PATH_SNAPSHOT_SCRIPT = 'install/postgres/sp_savePublications.sql'
+
+
+class Command(BaseCommand):
+    help = """Take an incremental snapshot of the publishes table (only the rows inserted or rewritten
+    since the previous snapshot are copied), list the snapshots or restore publishes to one of them."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--label', type=str,
+                            help='Label stored with the snapshot, e.g. the ETL source about to be loaded')
+        parser.add_argument('--list', action='store_true',
+                            help='List the latest snapshots with their size and duration')
+        parser.add_argument('--restore', type=int, metavar='SNAPSHOT_ID',
+                            help='Restore publishes to its state at the given snapshot')
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Snapshots are only available on PostgreSQL")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regprocedure('save_publications(varchar)') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                raise CommandError(f"Function save_publications is missing. Run {REL_PATH_SNAPSHOT_SCRIPT} first")
+        if kwargs['list']:
+            self.list_snapshots()
+        elif kwargs['restore'] is not None:
+            self.restore(kwargs['restore'])
+        else:
+            self.snapshot(kwargs['label'])
+
+    def snapshot(self, label):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT snapshot_id, rows_copied, duration FROM save_publications(%s)", [label])
+            snapshot_id, rows_copied, duration = cursor.fetchone()
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {snapshot_id} saved: {rows_copied} rows copied in {duration.total_seconds():.2f}s"))
+
+    def restore(self, snapshot_id):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT rows_deleted, rows_restored FROM restore_publications(%s)", [snapshot_id])
+            rows_deleted, rows_restored = cursor.fetchone()
+            # Restored rows keep their old pub_id, below the watermark of incremental refreshes
+            LatestVintages().rebuild()
+            AccuracyEngine().refresh(full=True)
+        invalidate_publications()
+        self.stdout.write(self.style.SUCCESS(
+            f"Publishes restored to snapshot {snapshot_id}: {rows_deleted} rows deleted, {rows_restored} rows restored"))
+
+    def list_snapshots(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_size_pretty(pg_total_relation_size('publishes_save'))")
+            self.stdout.write(f"publishes_save size: {cursor.fetchone()[0]}")
+            cursor.execute("""
+                SELECT snapshot_id, label, started_at, rows_copied, duration
+                FROM publishes_snapshot
+                ORDER BY snapshot_id DESC
+                LIMIT 20""")
+            for snapshot_id, label, started_at, rows_copied, duration in cursor.fetchall():
+                seconds = duration.total_seconds() if duration is not None else float('nan')
+                self.stdout.write(f"{snapshot_id:>6}  {started_at:%Y-%m-%d %H:%M:%S}  {label or '-':<16} "
+                                  f"{rows_copied or 0:>10} rows  {seconds:8.2f}s")
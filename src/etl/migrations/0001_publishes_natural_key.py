@@ -0,0 +1,57 @@
+from django.db import migrations
+from gphome.migration_utils import run_postgres_sql
+
+NATURAL_KEY_INDEX = "publishes_natural_key_uidx"
+
+BACKUP_TABLE = "publishes_duplicates_backup"
+
+# Every duplicated natural key keeps its most recently inserted row, the unique index cannot be built
+# otherwise. The older rows are moved to publishes_duplicates_backup rather than lost, unapplying the
+# migration puts them back
+BACKUP_DUPLICATES_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {BACKUP_TABLE} (LIKE publishes);
+    INSERT INTO {BACKUP_TABLE}
+    SELECT p.*
+    FROM publishes p
+    WHERE EXISTS (
+        SELECT 1
+        FROM publishes newer
+        WHERE newer.inst_instid = p.inst_instid
+          AND newer.indic_indicid = p.indic_indicid
+          AND newer.area_areaid = p.area_areaid
+          AND newer.date_from = p.date_from
+          AND newer.date_until = p.date_until
+          AND newer.date_published = p.date_published
+          AND newer.pub_id > p.pub_id)
+"""
+
+DELETE_DUPLICATES_SQL = f"""
+    DELETE FROM publishes p
+    USING {BACKUP_TABLE} b
+    WHERE b.pub_id = p.pub_id
+"""
+
+CREATE_INDEX_SQL = f"""
+    CREATE UNIQUE INDEX IF NOT EXISTS {NATURAL_KEY_INDEX}
+    ON publishes (inst_instid, indic_indicid, area_areaid, date_from, date_until, date_published)
+"""
+
+DROP_INDEX_SQL = f"DROP INDEX IF EXISTS {NATURAL_KEY_INDEX}"
+
+RESTORE_DUPLICATES_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {BACKUP_TABLE} (LIKE publishes);
+    INSERT INTO publishes SELECT * FROM {BACKUP_TABLE};
+    DROP TABLE {BACKUP_TABLE}
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indicator', '0001_initial'),
+    ]
+
+    operations = [
+        run_postgres_sql([BACKUP_DUPLICATES_SQL, DELETE_DUPLICATES_SQL, CREATE_INDEX_SQL],
+                         [DROP_INDEX_SQL, RESTORE_DUPLICATES_SQL]),
+    ]
@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from gphome.migration_utils import run_postgres_sql
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS etl_watermark (
+      inst_instid integer PRIMARY KEY REFERENCES institution (instid),
+      date_published timestamp,
+      content_hash varchar(64),
+      remote_version varchar(255),
+      updated_at timestamp DEFAULT (now())
+    )
+"""
+
+DROP_TABLE_SQL = "DROP TABLE IF EXISTS etl_watermark"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0001_publishes_natural_key'),
+        ('institution', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('inst_instid', models.OneToOneField(db_column='inst_instid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, serialize=False, to='institution.institution')),
+                ('date_published', models.DateTimeField(blank=True, db_comment='Latest date_published loaded', null=True)),
+                ('content_hash', models.CharField(blank=True, db_comment='Hash of the last loaded transformed data', max_length=64, null=True)),
+                ('remote_version', models.CharField(blank=True, db_comment='Version reported by the source when it was last loaded', max_length=255, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'etl_watermark',
+                'managed': False,
+            },
+        ),
+        run_postgres_sql(CREATE_TABLE_SQL, DROP_TABLE_SQL),
+    ]
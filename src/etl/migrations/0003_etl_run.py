@@ -0,0 +1,67 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from gphome.migration_utils import run_postgres_sql
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS etl_run (
+      run_id INTEGER GENERATED BY DEFAULT AS IDENTITY UNIQUE PRIMARY KEY,
+      inst_instid integer REFERENCES institution (instid),
+      source varchar(24) NOT NULL,
+      mode varchar(3) NOT NULL,
+      status varchar(16) NOT NULL,
+      started_at timestamp NOT NULL,
+      finished_at timestamp,
+      rows_extracted bigint,
+      rows_transformed bigint,
+      rows_inserted bigint,
+      rows_skipped bigint,
+      bytes_downloaded bigint,
+      extract_seconds double precision,
+      transform_seconds double precision,
+      load_seconds double precision,
+      content_hash varchar(64),
+      error text
+    );
+    CREATE INDEX IF NOT EXISTS etl_run_source_started_idx ON etl_run (source, started_at)
+"""
+
+DROP_TABLE_SQL = "DROP TABLE IF EXISTS etl_run"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0002_etl_watermark'),
+        ('institution', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EtlRun',
+            fields=[
+                ('run_id', models.AutoField(db_comment='Auto incremental', primary_key=True, serialize=False)),
+                ('inst_instid', models.ForeignKey(blank=True, db_column='inst_instid', null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='institution.institution')),
+                ('source', models.CharField(max_length=24)),
+                ('mode', models.CharField(max_length=3)),
+                ('status', models.CharField(db_comment='running, done, up-to-date or failed', max_length=16)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('rows_extracted', models.BigIntegerField(blank=True, null=True)),
+                ('rows_transformed', models.BigIntegerField(blank=True, null=True)),
+                ('rows_inserted', models.BigIntegerField(blank=True, null=True)),
+                ('rows_skipped', models.BigIntegerField(blank=True, null=True)),
+                ('bytes_downloaded', models.BigIntegerField(blank=True, null=True)),
+                ('extract_seconds', models.FloatField(blank=True, null=True)),
+                ('transform_seconds', models.FloatField(blank=True, null=True)),
+                ('load_seconds', models.FloatField(blank=True, null=True)),
+                ('content_hash', models.CharField(blank=True, max_length=64, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'etl_run',
+                'ordering': ['-run_id'],
+                'managed': False,
+            },
+        ),
+        run_postgres_sql(CREATE_TABLE_SQL, DROP_TABLE_SQL),
+    ]
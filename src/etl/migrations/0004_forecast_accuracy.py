@@ -0,0 +1,92 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from gphome.migration_utils import run_postgres_sql
+
+CREATE_TABLES_SQL = """
+    CREATE TABLE IF NOT EXISTS forecast_accuracy (
+      forecast_pub_id integer PRIMARY KEY,
+      inst_instid integer,
+      indic_indicid integer,
+      area_areaid integer,
+      date_published timestamp NOT NULL,
+      date_from timestamp NOT NULL,
+      date_until timestamp NOT NULL,
+      horizon integer NOT NULL,
+      forecast_value double precision NOT NULL,
+      actual_pub_id integer NOT NULL,
+      actual_value double precision NOT NULL,
+      actual_date_published timestamp NOT NULL,
+      error double precision NOT NULL,
+      abs_error double precision NOT NULL,
+      refreshed_at timestamp NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS forecast_accuracy_key_idx
+      ON forecast_accuracy (indic_indicid, area_areaid, date_from, date_until);
+    CREATE INDEX IF NOT EXISTS forecast_accuracy_inst_horizon_idx ON forecast_accuracy (inst_instid, horizon);
+    CREATE TABLE IF NOT EXISTS forecast_accuracy_refresh (
+      refresh_id INTEGER GENERATED BY DEFAULT AS IDENTITY UNIQUE PRIMARY KEY,
+      mode varchar(11) NOT NULL,
+      last_created_at timestamp,
+      keys_refreshed bigint,
+      rows_refreshed bigint,
+      started_at timestamp NOT NULL,
+      finished_at timestamp
+    )
+"""
+
+DROP_TABLES_SQL = "DROP TABLE IF EXISTS forecast_accuracy, forecast_accuracy_refresh"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0003_etl_run'),
+        ('geography', '0001_initial'),
+        ('indicator', '0001_initial'),
+        ('institution', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccuracyRefresh',
+            fields=[
+                ('refresh_id', models.AutoField(db_comment='Auto incremental', primary_key=True, serialize=False)),
+                ('mode', models.CharField(db_comment='full or incremental', max_length=11)),
+                ('last_created_at', models.DateTimeField(blank=True, db_comment='Newest created_at of publishes covered by the refresh', null=True)),
+                ('keys_refreshed', models.BigIntegerField(blank=True, null=True)),
+                ('rows_refreshed', models.BigIntegerField(blank=True, null=True)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'forecast_accuracy_refresh',
+                'ordering': ['-refresh_id'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ForecastAccuracy',
+            fields=[
+                ('forecast_pub_id', models.IntegerField(db_comment='pub_id of the forecast in publishes', primary_key=True, serialize=False)),
+                ('inst_instid', models.ForeignKey(blank=True, db_column='inst_instid', null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='institution.institution')),
+                ('indic_indicid', models.ForeignKey(blank=True, db_column='indic_indicid', null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='indicator.indicator')),
+                ('area_areaid', models.ForeignKey(blank=True, db_column='area_areaid', null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='geography.area')),
+                ('date_published', models.DateTimeField(db_comment='Vintage of the forecast')),
+                ('date_from', models.DateTimeField()),
+                ('date_until', models.DateTimeField()),
+                ('horizon', models.IntegerField(db_comment='Quarters from the vintage to the end of the forecast period')),
+                ('forecast_value', models.FloatField()),
+                ('actual_pub_id', models.IntegerField(db_comment='pub_id of the latest realized value in publishes')),
+                ('actual_value', models.FloatField()),
+                ('actual_date_published', models.DateTimeField()),
+                ('error', models.FloatField(db_comment='forecast_value - actual_value')),
+                ('abs_error', models.FloatField()),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'forecast_accuracy',
+                'managed': False,
+            },
+        ),
+        run_postgres_sql(CREATE_TABLES_SQL, DROP_TABLES_SQL),
+    ]
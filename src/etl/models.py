@@ -1,3 +1,100 @@
 from django.db import models
+from institution.models import Institution
+from indicator.models import Indicator
+from geography.models import Area
 
 # Create your models here.
+
+
+class Watermark(models.Model):
+    inst_instid = models.OneToOneField(
+        Institution, models.DO_NOTHING, db_column='inst_instid', primary_key=True)
+    date_published = models.DateTimeField(blank=True, null=True, db_comment='Latest date_published loaded')
+    content_hash = models.CharField(max_length=64, blank=True, null=True,
+                                    db_comment='Hash of the last loaded transformed data')
+    remote_version = models.CharField(max_length=255, blank=True, null=True,
+                                      db_comment='Version reported by the source when it was last loaded')
+    updated_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self) -> str:
+        return f"{self.inst_instid} {self.remote_version}"
+
+    class Meta:
+        managed = False
+        db_table = 'etl_watermark'
+
+
+class EtlRun(models.Model):
+    run_id = models.AutoField(primary_key=True, db_comment='Auto incremental')
+    inst_instid = models.ForeignKey(
+        Institution, models.DO_NOTHING, db_column='inst_instid', blank=True, null=True)
+    source = models.CharField(max_length=24)
+    mode = models.CharField(max_length=3)
+    status = models.CharField(max_length=16, db_comment='running, done, up-to-date or failed')
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(blank=True, null=True)
+    rows_extracted = models.BigIntegerField(blank=True, null=True)
+    rows_transformed = models.BigIntegerField(blank=True, null=True)
+    rows_inserted = models.BigIntegerField(blank=True, null=True)
+    rows_skipped = models.BigIntegerField(blank=True, null=True)
+    bytes_downloaded = models.BigIntegerField(blank=True, null=True)
+    extract_seconds = models.FloatField(blank=True, null=True)
+    transform_seconds = models.FloatField(blank=True, null=True)
+    load_seconds = models.FloatField(blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+
+    def __str__(self) -> str:
+        return f"{self.source} {self.mode} {self.started_at:%Y-%m-%d %H:%M} {self.status}"
+
+    class Meta:
+        managed = False
+        db_table = 'etl_run'
+        ordering = ['-run_id']
+
+
+class ForecastAccuracy(models.Model):
+    forecast_pub_id = models.IntegerField(primary_key=True, db_comment='pub_id of the forecast in publishes')
+    inst_instid = models.ForeignKey(
+        Institution, models.DO_NOTHING, db_column='inst_instid', blank=True, null=True)
+    indic_indicid = models.ForeignKey(
+        Indicator, models.DO_NOTHING, db_column='indic_indicid', blank=True, null=True)
+    area_areaid = models.ForeignKey(
+        Area, models.DO_NOTHING, db_column='area_areaid', blank=True, null=True)
+    date_published = models.DateTimeField(db_comment='Vintage of the forecast')
+    date_from = models.DateTimeField()
+    date_until = models.DateTimeField()
+    horizon = models.IntegerField(db_comment='Quarters from the vintage to the end of the forecast period')
+    forecast_value = models.FloatField()
+    actual_pub_id = models.IntegerField(db_comment='pub_id of the latest realized value in publishes')
+    actual_value = models.FloatField()
+    actual_date_published = models.DateTimeField()
+    error = models.FloatField(db_comment='forecast_value - actual_value')
+    abs_error = models.FloatField()
+    refreshed_at = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"{self.forecast_pub_id} {self.error}"
+
+    class Meta:
+        managed = False
+        db_table = 'forecast_accuracy'
+
+
+class AccuracyRefresh(models.Model):
+    refresh_id = models.AutoField(primary_key=True, db_comment='Auto incremental')
+    mode = models.CharField(max_length=11, db_comment='full or incremental')
+    last_created_at = models.DateTimeField(blank=True, null=True,
+                                           db_comment='Newest created_at of publishes covered by the refresh')
+    keys_refreshed = models.BigIntegerField(blank=True, null=True)
+    rows_refreshed = models.BigIntegerField(blank=True, null=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self) -> str:
+        return f"{self.mode} {self.started_at:%Y-%m-%d %H:%M} up to {self.last_created_at}"
+
+    class Meta:
+        managed = False
+        db_table = 'forecast_accuracy_refresh'
+        ordering = ['-refresh_id']
@@ -1,3 +1,672 @@
+import asyncio
+import datetime
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from typing import Dict, Optional
+from unittest import mock
+import pandas as pd
+import requests
+from django.db import DatabaseError, connection
 from django.test import TestCase
+from geography.models import Area
+from gphome.testing import TablesMixin
+from indicator.models import Indicator, LatestPublication, Publishes
+from institution.models import Institution
+from .models import ForecastAccuracy, Watermark
+from .management.commands.include.accuracy import AccuracyEngine
+from .management.commands.include.base import BaseAPIClient
+from .management.commands.include.fetch import ThreadPoolFetcher
+from .management.commands.include.httpcache import HTTPCache
+from .management.commands.include.latest import LatestVintages
+from .management.commands.include.loader import PublishesLoader
+from .management.commands.include.orchestrator import ETLOrchestrator
+from .management.commands.include.periods import parse_period, parse_periods, period_ends
+from .management.commands.include.ratelimit import HostRateLimiter, TokenBucket
+from .management.commands.include.storage import (ARROW_FORMATS, FORMATS, IntermediateFormat,
+                                                  get_format, read_any)
 
-# Create your tests here.
+
+class FakeClock:
+    """
+    Stands in for the time module of the rate limiter, sleeping moves the clock forward.
+
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TokenBucketTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('etl.management.commands.include.ratelimit.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=2, capacity=3)
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        self.assertAlmostEqual(self.clock.now, 1.0)
+
+    def test_tokens_refill_up_to_the_capacity(self):
+        bucket = TokenBucket(rate=1)
+        bucket.acquire()
+        self.clock.now += 10
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+    def test_hosts_are_limited_independently(self):
+        limiter = HostRateLimiter(rate=1)
+        self.assertEqual(limiter.acquire('https://www.ecb.europa.eu/a'), 0.0)
+        self.assertEqual(limiter.acquire('https://www.philadelphiafed.org/b'), 0.0)
+        self.assertAlmostEqual(limiter.acquire('https://www.ecb.europa.eu/c'), 1.0)
+
+
+def http_response(status: int, body: bytes = b'', headers: Optional[Dict] = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers or {})
+    response.encoding = 'utf-8'
+    return response
+
+
+class ClientStub(BaseAPIClient):
+    institution = 'TEST'
+
+    def __init__(self):
+        super().__init__('http://localhost')
+
+
+class HTTPCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = HTTPCache(Path(self.directory.name), max_bytes=1024, max_age=3600)
+
+    def get(self, client: ClientStub, answer: requests.Response):
+        with mock.patch.object(client.session, 'get', return_value=answer) as get:
+            response = client._get_data('http://localhost/data')
+        return response, get.call_args.kwargs['headers']
+
+    def test_conditional_requests(self):
+        client = ClientStub()
+        client.http_cache = self.cache
+        response, headers = self.get(client, http_response(200, b'{"v": 1}', {'ETag': '"v1"'}))
+        self.assertNotIn('If-None-Match', headers)
+        self.assertFalse(response.from_cache)
+        response, headers = self.get(client, http_response(304))
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertTrue(response.from_cache)
+        self.assertEqual(response.json(), {'v': 1})
+        self.assertTrue(client.responses_unchanged([response]))
+        # A new version replaces the cached body
+        response, _ = self.get(client, http_response(200, b'{"v": 2}', {'ETag': '"v2"'}))
+        self.assertEqual(self.cache.lookup('http://localhost/data', client.params)['etag'], '"v2"')
+
+    def test_responses_without_validators_are_not_cached(self):
+        client = ClientStub()
+        client.http_cache = self.cache
+        self.get(client, http_response(200, b'data'))
+        _, headers = self.get(client, http_response(200, b'data'))
+        self.assertNotIn('If-None-Match', headers)
+        self.assertIsNone(self.cache.lookup('http://localhost/data', client.params))
+
+    def test_pickled_without_its_lock(self):
+        cache = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(cache.directory, self.cache.directory)
+        self.assertIsNot(cache.lock, self.cache.lock)
+        cache.store('http://localhost/data', None, http_response(200, b'data', {'ETag': '"v1"'}))
+        self.assertEqual(self.cache.lookup('http://localhost/data')['etag'], '"v1"')
+
+    def store(self, url: str, size: int, last_used: float):
+        self.cache.store(url, None, http_response(200, b'x' * size, {'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}))
+        body_path = self.cache.lookup(url)['body_path']
+        os.utime(body_path, (last_used, last_used))
+
+    def test_eviction(self):
+        now = time.time()
+        self.store('http://localhost/expired', 10, now - 7200)
+        self.store('http://localhost/old', 400, now - 60)
+        self.store('http://localhost/recent', 400, now - 30)
+        # Evicted by the next store
+        self.assertIsNone(self.cache.lookup('http://localhost/expired'))
+        self.assertEqual(self.cache.evict(), 0)
+        # Over max_bytes, the least recently used entry goes first
+        self.store('http://localhost/new', 400, now)
+        self.assertIsNone(self.cache.lookup('http://localhost/old'))
+        self.assertIsNotNone(self.cache.lookup('http://localhost/recent'))
+        self.assertIsNotNone(self.cache.lookup('http://localhost/new'))
+
+
+class IntermediateFormatTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    @staticmethod
+    def chunk(first: int, count: int) -> pd.DataFrame:
+        return pd.DataFrame({
+            'indic_indicid': [f'I{code}' for code in range(first, first + count)],
+            'area_areaid': ['USA'] * count,
+            'is_forecast': ['Y', 'N'] * (count // 2) + ['Y'] * (count % 2),
+            'value': [float(code) for code in range(first, first + count)],
+        })
+
+    def test_round_trip(self):
+        frame = self.chunk(0, 20).assign(date_published=pd.Timestamp('2024-06-01'))
+        for name in FORMATS:
+            with self.subTest(format=name):
+                storage = get_format(name)
+                path = Path(self.directory.name) / f'frame{storage.suffix}'
+                storage.write(frame, path)
+                result = storage.read(path)
+                if name == 'csv':
+                    result['date_published'] = pd.to_datetime(result['date_published'])
+                codes = {column: str for column in ('indic_indicid', 'area_areaid', 'is_forecast')}
+                pd.testing.assert_frame_equal(result.astype(codes), frame)
+
+    def test_chunks_round_trip(self):
+        # The second chunk brings 250 new codes, past the int8 dictionary index of the first one
+        chunks = [self.chunk(0, 10), self.chunk(5, 300), self.chunk(0, 3)]
+        expected = pd.concat(chunks, ignore_index=True)
+        for name in FORMATS:
+            with self.subTest(format=name):
+                storage = get_format(name)
+                path = Path(self.directory.name) / f'chunks{storage.suffix}'
+                with storage.open_writer(path) as writer:
+                    for chunk in chunks:
+                        writer.write(chunk)
+                result = read_any([path])
+                codes = {column: str for column in ('indic_indicid', 'area_areaid', 'is_forecast')}
+                pd.testing.assert_frame_equal(result.astype(codes), expected)
+
+    def test_chunks_do_not_modify_the_data_frames(self):
+        for name in ARROW_FORMATS:
+            storage = get_format(name)
+            chunk = IntermediateFormat.with_categories(self.chunk(0, 4))
+            with storage.open_writer(Path(self.directory.name) / f'frame{storage.suffix}') as writer:
+                writer.write(self.chunk(10, 4))
+                writer.write(chunk)
+            self.assertEqual(list(chunk['indic_indicid'].cat.categories), ['I0', 'I1', 'I2', 'I3'])
+
+
+class PeriodsTests(unittest.TestCase):
+
+    def test_years_quarters_and_months(self):
+        periods = pd.Series(['2024', '2024-Q2', '2024 Q4', '2025:Q1', 'Sep. 2025', None, '2024'])
+        parsed = parse_periods(periods)
+        self.assertEqual(list(parsed['date_from'][:5]), [pd.Timestamp(date) for date in
+                                                        ('2024-01-01', '2024-04-01', '2024-10-01', '2025-01-01', '2025-09-01')])
+        self.assertEqual(list(parsed['date_until'][:5]), [pd.Timestamp(date) for date in
+                                                         ('2025-01-01', '2024-07-01', '2025-01-01', '2025-04-01', '2025-10-01')])
+        self.assertTrue(parsed.loc[5].isna().all())
+        self.assertEqual(parsed.loc[6, 'date_from'], pd.Timestamp('2024-01-01'))
+
+    def test_span_and_index(self):
+        periods = pd.Series(['2024-Q1', '2024-Q3'], index=[10, 20])
+        parsed = parse_periods(periods, span=pd.DateOffset(months=6))
+        self.assertEqual(list(parsed.index), [10, 20])
+        self.assertEqual(list(parsed['date_until']), [pd.Timestamp('2024-07-01'), pd.Timestamp('2025-01-01')])
+
+    def test_invalid_period(self):
+        with self.assertRaises(ValueError):
+            parse_period('not a period')
+
+    def test_period_ends(self):
+        date_from = pd.Series(pd.to_datetime(['2024-01-01', '2024-04-01']), index=[3, 4])
+        ends = period_ends(date_from, pd.Series(['A', 'Q'], index=[3, 4]))
+        self.assertEqual(list(ends.index), [3, 4])
+        self.assertEqual(list(ends), [pd.Timestamp('2025-01-01'), pd.Timestamp('2024-07-01')])
+
+
+class ScriptedEndpoint:
+    """
+    Fetch callable answering with the given statuses in turn (200 returns the endpoint), raising
+    HTTPError for the others like BaseAPIClient._get_data.
+
+    """
+
+    def __init__(self, *statuses: int, headers: Optional[Dict] = None):
+        self.statuses = list(statuses)
+        self.headers = headers
+        self.calls = 0
+
+    def __call__(self, endpoint: str) -> str:
+        status = self.statuses[min(self.calls, len(self.statuses) - 1)]
+        self.calls += 1
+        if status != 200:
+            http_response(status, headers=self.headers).raise_for_status()
+        return endpoint
+
+
+class ThreadPoolFetcherTests(unittest.TestCase):
+
+    def fetcher(self, **kwargs) -> ThreadPoolFetcher:
+        return ThreadPoolFetcher(backoff=0, logger=logging.getLogger(__name__), **kwargs)
+
+    def test_throttled_and_server_errors_are_retried(self):
+        fetch = ScriptedEndpoint(429, 503, 500, 200)
+        self.assertEqual(self.fetcher(retries=3).fetch_all(['http://localhost/a'], fetch),
+                         {'http://localhost/a': 'http://localhost/a'})
+        self.assertEqual(fetch.calls, 4)
+
+    def test_retries_are_bounded(self):
+        fetch = ScriptedEndpoint(502)
+        with self.assertRaises(requests.HTTPError):
+            self.fetcher(retries=2).fetch_all(['http://localhost/a'], fetch)
+        self.assertEqual(fetch.calls, 3)
+
+    def test_client_errors_are_not_retried(self):
+        fetch = ScriptedEndpoint(404, 200)
+        with self.assertRaises(requests.HTTPError):
+            self.fetcher().fetch_all(['http://localhost/a'], fetch)
+        self.assertEqual(fetch.calls, 1)
+
+    def test_fetch_one_retries(self):
+        fetch = ScriptedEndpoint(503, 200)
+        self.assertEqual(self.fetcher().fetch_one('http://localhost/a', fetch), 'http://localhost/a')
+        self.assertEqual(fetch.calls, 2)
+
+    def test_rate_limit_applies_to_every_attempt(self):
+        rate_limiter = mock.Mock()
+        self.fetcher(rate_limiter=rate_limiter).fetch_one('http://localhost/a', ScriptedEndpoint(503, 200))
+        self.fetcher(rate_limiter=rate_limiter).fetch_all(['http://localhost/b'], ScriptedEndpoint(429, 200))
+        self.assertEqual([call.args for call in rate_limiter.acquire.call_args_list],
+                         [('http://localhost/a',)] * 2 + [('http://localhost/b',)] * 2)
+
+    def test_retry_after_is_honoured(self):
+        error = requests.HTTPError(response=http_response(429, headers={'Retry-After': '3'}))
+        self.assertEqual(self.fetcher()._retry_delay(error, 0), 3.0)
+        self.assertEqual(ThreadPoolFetcher(max_backoff=2)._retry_delay(error, 0), 2.0)
+        self.assertIsNone(self.fetcher(retries=1)._retry_delay(error, 1))
+
+    def test_requests_in_flight_per_host(self):
+        lock = threading.Lock()
+        in_flight = {'localhost': 0, 'example.com': 0}
+        peak = dict(in_flight)
+
+        def fetch(endpoint):
+            host = endpoint.split('/')[2]
+            with lock:
+                in_flight[host] += 1
+                peak[host] = max(peak[host], in_flight[host])
+            time.sleep(0.02)
+            with lock:
+                in_flight[host] -= 1
+            return endpoint
+
+        endpoints = [f'http://{host}/{i}' for host in in_flight for i in range(6)]
+        results = self.fetcher(max_per_host=2).fetch_all(endpoints, fetch)
+        self.assertEqual(list(results), endpoints)
+        self.assertEqual(peak, {'localhost': 2, 'example.com': 2})
+
+    def test_can_be_called_from_an_event_loop(self):
+        async def fetch_all():
+            return self.fetcher().fetch_all(['http://localhost/a'], ScriptedEndpoint(200))
+
+        self.assertEqual(asyncio.run(fetch_all()), {'http://localhost/a': 'http://localhost/a'})
+
+    def test_every_worker_has_its_own_session(self):
+        client = ClientStub()
+
+        def fetch(endpoint):
+            time.sleep(0.02)
+            return client.session
+
+        sessions = self.fetcher(max_per_host=2).fetch_all(['http://localhost/a', 'http://localhost/b'], fetch)
+        self.assertEqual(len({id(session) for session in [client.session, *sessions.values()]}), 3)
+        # The sessions are thread state, left out when the client is pickled to the transform workers
+        self.assertIsNone(getattr(pickle.loads(pickle.dumps(client)).sessions, 'session', None))
+
+
+def legacy_serialize_records(df, institution, indicator_mapper, area_mapper, mode='P'):
+    # Per-row serializer replaced by the vectorized prepare_records, dates compared as naive UTC
+    def naive(value):
+        value = pd.Timestamp(value)
+        return value.tz_convert('UTC').tz_localize(None) if value.tzinfo is not None else value
+
+    serialized = []
+    if mode == 'H':
+        existing = {}
+        for record in Publishes.objects.filter(inst_instid=institution, is_forecast='N').order_by(
+                'date_published', 'pub_id').values('indic_indicid', 'area_areaid', 'date_from', 'date_until', 'value'):
+            existing[(record['indic_indicid'], record['area_areaid'], naive(record['date_from']),
+                      naive(record['date_until']))] = float(record['value'])
+    for _, row in df.iterrows():
+        indicator = indicator_mapper.get(row['indic_indicid'])
+        area = area_mapper.get(row['area_areaid'])
+        if not indicator or not area:
+            continue
+        if mode == 'H':
+            key = (indicator.indicid, area.areaid, naive(row['date_from']), naive(row['date_until']))
+            if existing.get(key) == float(row['value']):
+                continue
+        serialized.append((indicator.indicid, area.areaid, naive(row['date_published']), naive(row['date_from']),
+                           naive(row['date_until']), float(row['value']), row['is_forecast']))
+    return serialized
+
+
+class SerializeRecordsTests(TablesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institution = Institution.objects.create(abbreviation='TEST', name='Test institution')
+        cls.indicators = {code: Indicator.objects.create(inst_instid=cls.institution, name=code, unit='%',
+                                                         abbreviation=code)
+                          for code in ('GDP', 'CPI')}
+        cls.areas = {code: Area.objects.create(code=code, name=code) for code in ('USA', 'FRA')}
+        stored = [('GDP', 'USA', '2023-01-01', 2.5), ('GDP', 'USA', '2024-01-01', 2.0), ('CPI', 'FRA', '2023-01-01', 4.1)]
+        for indicator, area, date_published, value in stored:
+            Publishes.objects.create(
+                inst_instid=cls.institution, indic_indicid=cls.indicators[indicator], area_areaid=cls.areas[area],
+                date_published=datetime.datetime.fromisoformat(date_published).replace(tzinfo=datetime.timezone.utc),
+                date_from=datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc),
+                date_until=datetime.datetime(2022, 12, 31, tzinfo=datetime.timezone.utc),
+                value=value, is_forecast='N')
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'indic_indicid': ['GDP', 'GDP', 'CPI', 'CPI', 'UNKNOWN', 'GDP'],
+            'area_areaid': ['USA', 'FRA', 'FRA', 'USA', 'USA', 'ZZZ'],
+            'date_published': ['2024-06-01'] * 6,
+            'date_from': ['2022-01-01', '2022-01-01', '2022-01-01', '2025-01-01', '2022-01-01', '2022-01-01'],
+            'date_until': ['2022-12-31', '2022-12-31', '2022-12-31', '2025-12-31', '2022-12-31', '2022-12-31'],
+            'value': [2.0, 1.1, 4.0, 3.2, 9.9, 9.9],
+            'is_forecast': ['N', 'N', 'N', 'Y', 'N', 'N'],
+        })
+
+    def serialize(self, mode):
+        client = ClientStub()
+        # The in-database deduplication of the COPY loader is covered by the loader, compare the Python one
+        with mock.patch.object(client.loader, 'supports_copy', return_value=False):
+            instances = client.serialize_records(self.frame(), self.institution, self.indicators, self.areas, mode=mode)
+        return [(instance.indic_indicid_id, instance.area_areaid_id, pd.Timestamp(instance.date_published),
+                 pd.Timestamp(instance.date_from), pd.Timestamp(instance.date_until), float(instance.value),
+                 instance.is_forecast) for instance in instances]
+
+    def test_projections_match_the_per_row_serializer(self):
+        expected = legacy_serialize_records(self.frame(), self.institution, self.indicators, self.areas, mode='P')
+        self.assertEqual(self.serialize('P'), expected)
+        self.assertEqual(len(expected), 4)
+
+    def test_history_skips_the_unchanged_values_like_the_per_row_serializer(self):
+        expected = legacy_serialize_records(self.frame(), self.institution, self.indicators, self.areas, mode='H')
+        self.assertEqual(self.serialize('H'), expected)
+        # GDP/USA equals its latest stored value (2.0), CPI/FRA was revised
+        self.assertNotIn(self.indicators['GDP'].indicid, [row[0] for row in expected if row[1] == self.areas['USA'].areaid])
+        self.assertEqual(len(expected), 3)
+
+    def run_load(self, loaded):
+        client = ClientStub()
+        with mock.patch.object(client.loader, 'load', side_effect=loaded), \
+                mock.patch.object(client, 'after_load') as after_load:
+            client.run_load(self.frame().assign(inst_instid='TEST'))
+        return client, after_load
+
+    def test_load_refreshes_the_derived_tables(self):
+        client, after_load = self.run_load([3, 1])
+        after_load.assert_called_once_with(self.institution)
+        self.assertEqual(client.stats.as_dict()['rows_inserted'], 4)
+        self.assertTrue(Watermark.objects.filter(inst_instid=self.institution).exists())
+
+    def test_failed_historized_load_still_refreshes_the_loaded_projections(self):
+        client, after_load = self.run_load([3, DatabaseError('connection lost')])
+        after_load.assert_called_once_with(self.institution)
+        self.assertEqual(client.stats.as_dict()['rows_inserted'], 3)
+        self.assertIn('connection lost', client.stats.as_dict()['error'])
+        # The next run loads the historized data again
+        self.assertFalse(Watermark.objects.filter(inst_instid=self.institution).exists())
+
+    def test_nothing_loaded_leaves_the_derived_tables(self):
+        _, after_load = self.run_load(DatabaseError('connection lost'))
+        after_load.assert_not_called()
+
+    def test_orchestrated_loads_leave_the_accuracy_refresh_to_the_orchestrator(self):
+        client = ClientStub()
+        client.refresh_accuracy = False
+        with mock.patch('etl.management.commands.include.base.connection') as connection_, \
+                mock.patch('etl.management.commands.include.base.LatestVintages') as latest, \
+                mock.patch('etl.management.commands.include.base.refresh_accuracy') as refresh:
+            connection_.vendor = 'postgresql'
+            client.after_load(self.institution)
+        latest.return_value.refresh.assert_called_once_with(self.institution.pk)
+        refresh.assert_not_called()
+
+
+class PublishesLoaderTests(TablesMixin, TestCase):
+    """
+    Runs with the COPY merge on PostgreSQL and the bulk_create fallback on the other backends.
+
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institution = Institution.objects.create(abbreviation='TEST', name='Test institution')
+        cls.indicator = Indicator.objects.create(inst_instid=cls.institution, name='GDP', unit='%', abbreviation='GDP')
+        cls.area = Area.objects.create(code='USA', name='United States')
+
+    def load(self, *values: float) -> int:
+        records = pd.DataFrame({
+            'indic_indicid': self.indicator.pk,
+            'area_areaid': self.area.pk,
+            'date_published': pd.Timestamp('2024-04-01'),
+            'date_from': pd.date_range('2025-01-01', periods=len(values), freq='YS'),
+            'date_until': pd.date_range('2026-01-01', periods=len(values), freq='YS'),
+            'value': values,
+            'is_forecast': 'Y',
+        })
+        return PublishesLoader(logging.getLogger(__name__)).load(records, self.institution)
+
+    def stored(self):
+        return [float(value) for value in Publishes.objects.order_by('date_from').values_list('value', flat=True)]
+
+    def test_reloaded_vintage_is_merged_on_the_natural_key(self):
+        self.assertEqual(self.load(2.0, 1.5), 2)
+        pub_ids = list(Publishes.objects.order_by('date_from').values_list('pub_id', flat=True))
+        self.assertEqual(self.load(2.0, 1.5), 0)
+        # Only the revised value is rewritten, in place
+        self.assertEqual(self.load(2.0, 1.7), 1)
+        self.assertEqual(self.stored(), [2.0, 1.7])
+        self.assertEqual(list(Publishes.objects.order_by('date_from').values_list('pub_id', flat=True)), pub_ids)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'COPY loader and derived tables require PostgreSQL')
+class DerivedTablesTestCase(TablesMixin, TestCase):
+    """
+    Loads publishes through the COPY loader, which merges a reloaded vintage in place.
+
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institution = Institution.objects.create(abbreviation='TEST', name='Test institution')
+        cls.indicator = Indicator.objects.create(inst_instid=cls.institution, name='GDP', unit='%', abbreviation='GDP')
+        cls.area = Area.objects.create(code='USA', name='United States')
+
+    def load(self, date_published: str, value: float, is_forecast: str = 'Y', period: str = '2025'):
+        # Periods are parsed like the sources do: date_until is the start of the next period
+        periods = parse_periods(pd.Series([period]))
+        records = pd.DataFrame({
+            'indic_indicid': [self.indicator.pk],
+            'area_areaid': [self.area.pk],
+            'date_published': [pd.Timestamp(date_published)],
+            'date_from': periods['date_from'],
+            'date_until': periods['date_until'],
+            'value': [value],
+            'is_forecast': [is_forecast],
+        })
+        return PublishesLoader(logging.getLogger(__name__)).load(records, self.institution, mode='P')
+
+
+class LatestVintagesTests(DerivedTablesTestCase):
+
+    def latest(self):
+        return [float(value) for value in LatestPublication.objects.values_list('value', flat=True)]
+
+    def refresh(self):
+        return LatestVintages().refresh(self.institution.pk)
+
+    def test_later_vintage_replaces_the_stored_one(self):
+        self.load('2024-04-01', 2.0)
+        self.refresh()
+        self.load('2024-10-01', 2.4)
+        self.assertEqual(self.refresh(), 1)
+        self.assertEqual(self.latest(), [2.4])
+
+    def test_reloaded_vintage_with_a_revised_value_is_refreshed(self):
+        self.load('2024-01-01', 2.0)
+        self.refresh()
+        # Same vintage loaded again with a new value: the loader rewrites the row in place, same pub_id
+        self.assertEqual(self.load('2024-01-01', 2.7), 1)
+        self.assertEqual(Publishes.objects.count(), 1)
+        self.assertEqual(self.refresh(), 1)
+        self.assertEqual(self.latest(), [2.7])
+        self.assertEqual(self.refresh(), 0)
+
+    def test_revised_older_vintage_does_not_replace_the_latest(self):
+        self.load('2024-01-01', 2.0)
+        self.load('2024-10-01', 2.4)
+        self.refresh()
+        self.load('2024-01-01', 1.5)
+        self.refresh()
+        self.assertEqual(self.latest(), [2.4])
+
+    def test_refresh_matches_a_rebuild(self):
+        self.load('2024-01-01', 2.0)
+        self.refresh()
+        self.load('2024-01-01', 2.2)
+        self.load('2024-06-01', 1.0, period='2026')
+        self.refresh()
+        refreshed = sorted(LatestPublication.objects.values_list('pub_id', 'value', 'created_at'))
+        LatestVintages().rebuild()
+        self.assertEqual(sorted(LatestPublication.objects.values_list('pub_id', 'value', 'created_at')), refreshed)
+
+
+class AccuracyEngineTests(DerivedTablesTestCase):
+
+    def errors(self):
+        return [(float(forecast), float(actual), float(error)) for forecast, actual, error in
+                ForecastAccuracy.objects.order_by('date_published').values_list('forecast_value', 'actual_value', 'error')]
+
+    def test_forecasts_are_compared_with_the_latest_actual(self):
+        self.load('2024-04-01', 2.0)
+        self.load('2025-04-01', 1.0, is_forecast='N')
+        self.load('2026-04-01', 1.5, is_forecast='N')
+        refresh = AccuracyEngine().refresh()
+        self.assertEqual(refresh.mode, 'full')
+        self.assertEqual(self.errors(), [(2.0, 1.5, 0.5)])
+        # Vintage in Q2 2024, period ending in Q4 2025
+        self.assertEqual(ForecastAccuracy.objects.get().horizon, 6)
+
+    def test_horizon_counts_the_quarters_to_the_last_day_of_the_period(self):
+        self.load('2024-04-01', 2.0, period='2024-Q4')
+        self.load('2024-05-01', 2.1, period='2024-Q2')
+        self.load('2025-04-01', 1.5, is_forecast='N', period='2024-Q4')
+        self.load('2025-04-01', 1.9, is_forecast='N', period='2024-Q2')
+        AccuracyEngine().refresh()
+        self.assertEqual(sorted(ForecastAccuracy.objects.values_list('horizon', flat=True)), [0, 2])
+
+    def test_actual_revised_in_place_is_compared_again(self):
+        self.load('2024-04-01', 2.0)
+        self.load('2026-01-01', 1.0, is_forecast='N')
+        AccuracyEngine().refresh()
+        # Same vintage of the actual loaded again with a new value: rewritten in place, same pub_id
+        self.load('2026-01-01', 1.25, is_forecast='N')
+        refresh = AccuracyEngine().refresh()
+        self.assertEqual((refresh.mode, refresh.keys_refreshed), ('incremental', 1))
+        self.assertEqual(self.errors(), [(2.0, 1.25, 0.75)])
+
+    def test_forecast_revised_in_place_is_compared_again(self):
+        self.load('2024-04-01', 2.0)
+        self.load('2026-01-01', 1.0, is_forecast='N')
+        AccuracyEngine().refresh()
+        self.load('2024-04-01', 3.0)
+        AccuracyEngine().refresh()
+        self.assertEqual(self.errors(), [(3.0, 1.0, 2.0)])
+        full = AccuracyEngine().refresh(full=True)
+        self.assertEqual(full.rows_refreshed, 1)
+        self.assertEqual(self.errors(), [(3.0, 1.0, 2.0)])
+
+
+class VintageFreshnessTests(TablesMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institution = Institution.objects.create(abbreviation='TEST', name='Test institution')
+
+    def client_for(self, period: str) -> ClientStub:
+        client = ClientStub()
+        client.freshness = 'vintage'
+        client.date_published = pd.Timestamp(period)
+        return client
+
+    def test_vintage_is_the_remote_version(self):
+        self.assertEqual(self.client_for('2024-07-01').remote_version, '2024-Q3')
+
+    def test_only_the_loaded_vintage_is_up_to_date(self):
+        self.assertFalse(self.client_for('2024-07-01').database_up_to_date())
+        Watermark.objects.create(inst_instid=self.institution, remote_version='2024-Q3',
+                                 date_published=datetime.datetime(2024, 7, 1, tzinfo=datetime.timezone.utc))
+        self.assertTrue(self.client_for('2024-07-01').database_up_to_date())
+        # Earlier vintages are not covered by a later one, e.g. when they are backfilled
+        self.assertFalse(self.client_for('2024-04-01').database_up_to_date())
+        self.assertFalse(self.client_for('2024-10-01').database_up_to_date())
+
+    def test_loads_record_the_vintage(self):
+        df = pd.DataFrame({'date_published': [pd.Timestamp('2024-04-01')]})
+        self.client_for('2024-04-01').update_watermark(self.institution, df, 'hash')
+        self.assertEqual(Watermark.objects.get(inst_instid=self.institution).remote_version, '2024-Q2')
+
+
+class LoadStub(ClientStub):
+
+    def __init__(self, rows: int):
+        super().__init__()
+        self.rows = rows
+        self.refreshed_accuracy = None
+
+    def run_load(self):
+        self.refreshed_accuracy = self.refresh_accuracy
+        self.stats.add('rows_inserted', self.rows)
+
+
+class OrchestratorTests(TablesMixin, TestCase):
+
+    def run_loads(self, *rows: int):
+        clients = {f'source{n}': LoadStub(count) for n, count in enumerate(rows)}
+        with mock.patch('etl.management.commands.include.orchestrator.connection') as connection_, \
+                mock.patch('etl.management.commands.include.orchestrator.refresh_accuracy') as refresh:
+            connection_.vendor = 'postgresql'
+            ETLOrchestrator({source: (lambda client=client: client) for source, client in clients.items()}, 'l').run()
+        return clients, refresh
+
+    def test_accuracy_is_refreshed_once_after_every_load(self):
+        clients, refresh = self.run_loads(3, 0, 5)
+        refresh.assert_called_once()
+        self.assertEqual([client.refreshed_accuracy for client in clients.values()], [False, False, False])
+
+    def test_accuracy_is_not_refreshed_without_new_rows(self):
+        _, refresh = self.run_loads(0, 0)
+        refresh.assert_not_called()
@@ -0,0 +1,38 @@
+import logging
+from typing import List, Union
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+Statements = Union[str, List[str]]
+
+
+def _statements(sql: Statements) -> List[str]:
+    return [sql] if isinstance(sql, str) else list(sql)
+
+
+def run_postgres_sql(sql: Statements, reverse_sql: Statements = ()) -> migrations.RunPython:
+    """
+    Migration operation executing raw SQL on the PostgreSQL databases of the project.
+
+    The tables of the unmanaged models are created by install/postgres/3. create_tables.sql, so the
+    statements only run where that script was applied (publishes exists): SQLite development databases
+    are left untouched, and so are empty databases (e.g. the test databases) with a warning.
+
+    """
+    def run(statements):
+        def operation(apps, schema_editor):
+            connection = schema_editor.connection
+            if connection.vendor != 'postgresql':
+                return
+            with connection.cursor() as cursor:
+                if 'publishes' not in connection.introspection.table_names(cursor):
+                    logger.warning(f"Table publishes does not exist in {connection.alias}, skipped "
+                                   f"{len(statements)} SQL statements. Run install/postgres/3. create_tables.sql, "
+                                   f"which creates the same tables and indexes")
+                    return
+            for statement in statements:
+                schema_editor.execute(statement)
+        return operation
+
+    return migrations.RunPython(run(_statements(sql)), run(_statements(reverse_sql)))
@@ -100,6 +100,82 @@ if DATABASE_URL:
     }
 
 
+# HTTP cache of the ETL clients (conditional requests with ETag/Last-Modified)
+HTTP_CACHE_ENABLED = decouple.config('HTTP_CACHE_ENABLED', cast=bool, default=True)
+HTTP_CACHE_MAX_SIZE_MB = decouple.config('HTTP_CACHE_MAX_SIZE_MB', cast=int, default=1024)
+HTTP_CACHE_MAX_AGE_DAYS = decouple.config('HTTP_CACHE_MAX_AGE_DAYS', cast=int, default=30)
+
+
+# Concurrency and retries of the ETL downloads
+HTTP_MAX_PER_HOST = decouple.config('HTTP_MAX_PER_HOST', cast=int, default=4)
+HTTP_MAX_RETRIES = decouple.config('HTTP_MAX_RETRIES', cast=int, default=4)
+HTTP_BACKOFF = decouple.config('HTTP_BACKOFF', cast=float, default=0.5)
+
+# Logging of the ETL: level of all sources, per-source levels (e.g. OECD=DEBUG,IMF=WARNING)
+# and format of the lines (text or json). Records are written by a background thread.
+ETL_LOG_LEVEL = decouple.config('ETL_LOG_LEVEL', default='INFO').upper()
+ETL_LOG_LEVELS = dict(
+    (source.strip(), level.strip().upper()) for source, _, level in
+    (item.partition('=') for item in decouple.config('ETL_LOG_LEVELS', cast=decouple.Csv(), default='')))
+ETL_LOG_FORMAT = decouple.config('ETL_LOG_FORMAT', default='text')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'text': {'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'},
+        'json': {'()': 'etl.management.commands.include.logs.JsonFormatter'},
+    },
+    'handlers': {
+        'etl_queue': {
+            'class': 'etl.management.commands.include.logs.QueueListenerHandler',
+            'formatter': 'json' if ETL_LOG_FORMAT == 'json' else 'text',
+        },
+    },
+    'loggers': {
+        'etl': {'handlers': ['etl_queue'], 'level': ETL_LOG_LEVEL, 'propagate': False},
+        **{f'etl.{source}': {'level': level} for source, level in ETL_LOG_LEVELS.items()},
+    },
+}
+
+# Format of the files handed from the transform to the load phase (parquet, feather or csv)
+ETL_INTERMEDIATE_FORMAT = decouple.config('ETL_INTERMEDIATE_FORMAT', default='parquet')
+
+# Directory of the downloaded and transformed files, defaults to etl/management/commands/data
+ETL_DATA_DIR = decouple.config('ETL_DATA_DIR', default=None)
+
+# Source endpoints, overridden e.g. by the benchmark to point at a local stand-in server
+OECD_ENDPOINT = decouple.config(
+    'OECD_ENDPOINT', default='https://sdmx.oecd.org/public/rest/data/OECD.ECO.MAD,DSD_EO@DF_EO')
+OECD_SEARCH_ENDPOINT = decouple.config(
+    'OECD_SEARCH_ENDPOINT', default='https://dotstat-search.oecd.org/api/search?tenant=oecd')
+IMF_ENDPOINT = decouple.config('IMF_ENDPOINT', default='https://www.imf.org/external/datamapper/api/v1')
+ECB_ENDPOINT = decouple.config(
+    'ECB_ENDPOINT',
+    default='https://www.ecb.europa.eu/stats/ecb_surveys/survey_of_professional_forecasters/html/table_3_{year}q{quarter}.en.html')
+PHILADELPHIA_ENDPOINT = decouple.config(
+    'PHILADELPHIA_ENDPOINT',
+    default='https://www.philadelphiafed.org/surveys-and-data/real-time-data-research/spf-q{quarter}-{year}')
+
+# Cache of the query API. The ETL invalidates it from its own process, so the default backend is
+# shared through files; a local-memory cache (CACHE_BACKEND=locmem) only suits a single process.
+CACHE_BACKEND = decouple.config('CACHE_BACKEND', default='file')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    } if CACHE_BACKEND == 'locmem' else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': decouple.config('CACHE_DIR', default=str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': decouple.config('CACHE_MAX_ENTRIES', cast=int, default=10000)},
+    },
+}
+
+# Query API: rows per page (default and maximum) and lifetime of the cached responses in seconds
+API_PAGE_SIZE = decouple.config('API_PAGE_SIZE', cast=int, default=1000)
+API_MAX_PAGE_SIZE = decouple.config('API_MAX_PAGE_SIZE', cast=int, default=10000)
+API_CACHE_TIMEOUT = decouple.config('API_CACHE_TIMEOUT', cast=int, default=86400)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -0,0 +1,37 @@
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+
+CREATE_TABLES_SCRIPT = settings.BASE_DIR.parent / 'install' / 'postgres' / '3. create_tables.sql'
+
+
+def create_tables():
+    """
+    Creates the tables of the unmanaged models in the test database, which migrate leaves empty:
+    with install/postgres/3. create_tables.sql on PostgreSQL, from the models on other backends.
+    Called from setUpClass before the transaction of the test case is opened.
+
+    """
+    with connection.cursor() as cursor:
+        existing = set(connection.introspection.table_names(cursor))
+    if connection.vendor == 'postgresql':
+        if 'publishes' not in existing:
+            with connection.cursor() as cursor:
+                cursor.execute(CREATE_TABLES_SCRIPT.read_text())
+        return
+    with connection.schema_editor() as editor:
+        for model in apps.get_models():
+            if not model._meta.managed and model._meta.db_table not in existing:
+                editor.create_model(model)
+
+
+class TablesMixin:
+    """
+    Test case mixin creating the tables of the unmanaged models once per test database.
+
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+        super().setUpClass()
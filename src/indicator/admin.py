@@ -1,7 +1,15 @@
+import datetime
+from django.conf import settings
 from django.contrib import admin
+from django.db.models import Min, Q, QuerySet
+from django.utils import timezone
 from .models import Indicator, Mapping, Publishes, UnifiedIndicator
+from .paginator import EstimatedCountPaginator
 # Register your models here.
 
+# Lookups of the search_fields prefixes of PublishesAdmin
+SEARCH_LOOKUPS = {'=': 'iexact', '^': 'istartswith'}
+
 
 @admin.register(Indicator)
 class IndicatorAdmin(admin.ModelAdmin):
@@ -15,11 +23,90 @@ class IndicatorAdmin(admin.ModelAdmin):
 class MappingAdmin(admin.ModelAdmin):
     pass
 
+class DateHierarchyQuerySet(QuerySet):
+    """
+    Changelist queryset whose date hierarchy finds the years, months or days of a datetime field by
+    walking its index, one MIN() per value listed, instead of truncating and sorting every row.
+
+    """
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if kind not in ('year', 'month', 'day') or self.query.is_sliced:
+            return super().datetimes(field_name, kind, order, tzinfo)
+        if settings.USE_TZ and tzinfo is None:
+            tzinfo = timezone.get_current_timezone()
+        values = []
+        current = self.aggregate(first=Min(field_name))['first']
+        while current is not None:
+            if tzinfo is not None:
+                # timestamp columns without time zone hold UTC
+                current = timezone.localtime(current if timezone.is_aware(current)
+                                             else current.replace(tzinfo=datetime.timezone.utc), tzinfo)
+            start = current.replace(month=1 if kind == 'year' else current.month,
+                                    day=1 if kind in ('year', 'month') else current.day,
+                                    hour=0, minute=0, second=0, microsecond=0)
+            values.append(start)
+            if kind == 'year':
+                following = start.replace(year=start.year + 1)
+            elif kind == 'month':
+                following = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+            else:
+                following = start + datetime.timedelta(days=1)
+            current = self.filter(**{f'{field_name}__gte': following}).aggregate(first=Min(field_name))['first']
+        return values[::-1] if order == 'DESC' else values
+
+
+class ForecastFilter(admin.SimpleListFilter):
+    # Fixed choices, the default filter of the field would scan publishes for its distinct values
+    title = 'type'
+    parameter_name = 'is_forecast'
+
+    def lookups(self, request, model_admin):
+        return [('Y', 'Forecast'), ('N', 'Historical')]
+
+    def queryset(self, request, queryset):
+        if self.value() in ('Y', 'N'):
+            return queryset.filter(is_forecast=self.value())
+        return queryset
+
+
 @admin.register(Publishes)
 class PublishesAdmin(admin.ModelAdmin):
-    list_display = ['get_institution_name', 'get_indicator_symbol', 'get_indicator_name', 'get_publication_value', 
-                    'get_date_from', 'get_date_until', 'get_date_published']
-    search_fields = ['inst_instid__abbreviation__icontains', 'indic_indicid__abbreviation__icontains']
+    list_display = ['get_institution_name', 'get_indicator_symbol', 'get_indicator_name', 'get_area_code',
+                    'get_publication_value', 'get_date_from', 'get_date_until', 'get_date_published']
+    list_select_related = ['inst_instid', 'indic_indicid', 'area_areaid']
+    list_filter = ['inst_instid', ForecastFilter]
+    date_hierarchy = 'date_published'
+    # Newest vintage first, read from publishes_published_idx (publishes_inst_published_idx when
+    # filtered by institution); the changelist never counts the whole table
+    ordering = ['-date_published', '-pub_id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ['=inst_instid__abbreviation', '^indic_indicid__abbreviation', '=area_areaid__code']
+    search_help_text = 'Institution or area code (exact match) and indicator code (prefix), e.g. "IMF USA NGDP"'
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return DateHierarchyQuerySet(self.model, query=queryset.query, using=queryset.db)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Every word must match one of the search_fields, a field of a related table ('=' exact match,
+        '^' prefix). The related rows are looked up in their (small) tables first, so that publishes
+        is only filtered on its indexed foreign keys instead of being joined to every table.
+
+        """
+        for term in search_term.split():
+            matches = Q()
+            for search_field in self.get_search_fields(request):
+                lookup = SEARCH_LOOKUPS.get(search_field[0], 'icontains')
+                relation, field = search_field.lstrip(''.join(SEARCH_LOOKUPS)).split('__', 1)
+                related = self.model._meta.get_field(relation).related_model
+                keys = related.objects.filter(**{f'{field}__{lookup}': term}).values_list('pk', flat=True)
+                matches |= Q(**{f'{relation}__in': list(keys)})
+            queryset = queryset.filter(matches)
+        return queryset, False
+
     def get_institution_name(self, obj):
         return obj.inst_instid.abbreviation  # Assuming inst_instid is a ForeignKey to Institution model
 
@@ -29,6 +116,9 @@ class PublishesAdmin(admin.ModelAdmin):
     def get_indicator_name(self, obj):
         return obj.indic_indicid.name
     
+    def get_area_code(self, obj):
+        return obj.area_areaid.code if obj.area_areaid else None
+
     def get_publication_value(self, obj):
         return obj.value
     
@@ -44,6 +134,7 @@ class PublishesAdmin(admin.ModelAdmin):
     get_institution_name.short_description = 'Institution'
     get_indicator_symbol.short_description = 'Indicator'
     get_indicator_name.short_description = 'Indicator Name'
+    get_area_code.short_description = 'Area'
     get_publication_value.short_description = 'Value'
     get_date_from.short_description = 'Date From'
     get_date_until.short_description = 'Date Until'
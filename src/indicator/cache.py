@@ -0,0 +1,48 @@
+import hashlib
+import time
+from typing import Iterable, Optional
+from django.core.cache import cache
+
+VERSION_KEY = 'publishes:version:{institution}'
+# Bumped by every invalidation, the version of the queries over every institution
+GLOBAL_VERSION_KEY = 'publishes:version'
+# Bumped when every institution is invalidated, part of the versions of the filtered queries
+ALL_INSTITUTIONS_VERSION_KEY = 'publishes:version:*'
+
+
+def publications_versions(institutions: Optional[Iterable[str]] = None) -> str:
+    """
+    Versions of the publications of the institutions (all of them by default), part of the cache keys
+    of the query API. A missing version (never set or evicted) is initialized with a new one so that
+    entries cached before can not be served again.
+
+    """
+    if institutions is None:
+        keys = [GLOBAL_VERSION_KEY]
+    else:
+        keys = [ALL_INSTITUTIONS_VERSION_KEY] + [VERSION_KEY.format(institution=institution)
+                                                 for institution in sorted(set(institutions))]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return ','.join(f"{key}={versions[key]}" for key in keys)
+
+
+def invalidate_publications(institutions: Optional[Iterable[str]] = None) -> None:
+    """
+    Invalidates the cached queries over the publications of the institutions (all of them by default),
+    called after every load into publishes.
+
+    """
+    if institutions is None:
+        keys = [ALL_INSTITUTIONS_VERSION_KEY]
+    else:
+        keys = [VERSION_KEY.format(institution=institution) for institution in institutions]
+    cache.set_many(dict.fromkeys(keys + [GLOBAL_VERSION_KEY], time.time_ns()), None)
+
+
+def query_cache_key(path: str, params: dict, versions: str) -> str:
+    digest = hashlib.sha256(repr((path, sorted(params.items()), versions)).encode()).hexdigest()
+    return f"publishes:query:{digest}"
@@ -0,0 +1,151 @@
+import csv
+import datetime
+import io
+from typing import Iterable, Iterator
+from django.db.models import QuerySet
+from django.utils import timezone
+from .models import Publishes
+from .query import PUBLICATION_FIELDS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is optional, only CSV can be exported without it
+    pa = None
+
+EXPORT_FORMATS = {
+    'csv': {'suffix': '.csv', 'content_type': 'text/csv; charset=utf-8'},
+    'parquet': {'suffix': '.parquet', 'content_type': 'application/vnd.apache.parquet'},
+}
+# Rows fetched per round trip of the server-side cursor
+CHUNK_SIZE = 5000
+# Rows per Parquet row group, i.e. held in memory at once
+ROW_GROUP_SIZE = 100_000
+ARROW_SCHEMA = [
+    ('pub_id', 'int64'),
+    ('institution', 'string'),
+    ('indicator', 'string'),
+    ('area', 'string'),
+    ('date_published', 'timestamp'),
+    ('date_from', 'timestamp'),
+    ('date_until', 'timestamp'),
+    ('value', 'float64'),
+    ('is_forecast', 'string'),
+]
+
+
+def export_rows(filters: dict, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    """
+    Publications matching the filters (see indicator.query.publication_filters) with the codes of
+    their institution, indicator and area, read with a server-side cursor in chunks of chunk_size rows.
+
+    """
+    queryset: QuerySet = (Publishes.objects
+                          .filter(**filters)
+                          .order_by('pub_id')
+                          .values_list(*PUBLICATION_FIELDS.values()))
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def csv_chunks(rows: Iterable[tuple], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Encodes the rows as CSV (with a header) in blocks of chunk_size rows.
+
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(PUBLICATION_FIELDS)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+class _Sink(io.RawIOBase):
+    """
+    Write-only stream whose content is drained by the Parquet generator after every row group.
+
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_schema():
+    types = {'int64': pa.int64(), 'string': pa.string(), 'float64': pa.float64(),
+             'timestamp': pa.timestamp('us', tz='UTC')}
+    return pa.schema([(name, types[kind]) for name, kind in ARROW_SCHEMA])
+
+
+def _utc(value):
+    # Naive datetimes come from timestamp columns without time zone, stored in UTC
+    if isinstance(value, datetime.datetime) and timezone.is_naive(value):
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def parquet_chunks(rows: Iterable[tuple], row_group_size: int = ROW_GROUP_SIZE) -> Iterator[bytes]:
+    """
+    Encodes the rows as a Parquet file written one row group (row_group_size rows) at a time.
+
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required to export Parquet")
+    schema = _arrow_schema()
+    sink = _Sink()
+    columns = [[] for _ in ARROW_SCHEMA]
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for row in rows:
+            for column, value in zip(columns, row):
+                column.append(value)
+            if len(columns[0]) == row_group_size:
+                writer.write_batch(_batch(columns, schema))
+                columns = [[] for _ in ARROW_SCHEMA]
+                yield sink.drain()
+        if columns[0]:
+            writer.write_batch(_batch(columns, schema))
+    yield sink.drain()
+
+
+def _batch(columns, schema):
+    arrays = []
+    for (name, kind), values in zip(ARROW_SCHEMA, columns):
+        if kind == 'timestamp':
+            values = [_utc(value) for value in values]
+        elif kind == 'float64':
+            values = [None if value is None else float(value) for value in values]
+        arrays.append(pa.array(values, type=schema.field(name).type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_chunks(filters: dict, output: str) -> Iterator[bytes]:
+    """
+    Streams the publications matching the filters in the given format ('csv' or 'parquet'), in constant memory.
+
+    """
+    if output not in EXPORT_FORMATS:
+        raise ValueError(f"Invalid export format {output}. Choose from {', '.join(EXPORT_FORMATS)}")
+    rows = export_rows(filters)
+    return parquet_chunks(rows) if output == 'parquet' else csv_chunks(rows)
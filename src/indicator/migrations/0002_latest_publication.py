@@ -0,0 +1,69 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from gphome.migration_utils import run_postgres_sql
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS publishes_latest (
+      pub_id integer PRIMARY KEY,
+      inst_instid integer,
+      indic_indicid integer,
+      area_areaid integer,
+      date_published timestamp NOT NULL,
+      date_from timestamp NOT NULL,
+      date_until timestamp NOT NULL,
+      value numeric NOT NULL,
+      is_forecast char(1) NOT NULL,
+      created_at timestamp
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS publishes_latest_key_uidx
+      ON publishes_latest (indic_indicid, area_areaid, date_from, date_until, inst_instid);
+    CREATE INDEX IF NOT EXISTS publishes_latest_inst_idx ON publishes_latest (inst_instid, pub_id)
+"""
+
+# Latest vintage of the publications already loaded, the ETL keeps it up to date afterwards
+POPULATE_SQL = """
+    INSERT INTO publishes_latest
+    SELECT DISTINCT ON (indic_indicid, area_areaid, date_from, date_until, inst_instid)
+           pub_id, inst_instid, indic_indicid, area_areaid, date_published, date_from, date_until, value, is_forecast,
+           created_at
+    FROM publishes
+    WHERE inst_instid IS NOT NULL AND indic_indicid IS NOT NULL AND area_areaid IS NOT NULL
+    ORDER BY indic_indicid, area_areaid, date_from, date_until, inst_instid, date_published DESC, pub_id DESC
+    ON CONFLICT DO NOTHING
+"""
+
+DROP_TABLE_SQL = "DROP TABLE IF EXISTS publishes_latest"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geography', '0001_initial'),
+        ('indicator', '0001_initial'),
+        ('institution', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestPublication',
+            fields=[
+                ('pub_id', models.IntegerField(db_comment='pub_id of the latest vintage in publishes', primary_key=True, serialize=False)),
+                ('inst_instid', models.ForeignKey(blank=True, db_column='inst_instid', null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='institution.institution')),
+                ('indic_indicid', models.ForeignKey(blank=True, db_column='indic_indicid', null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='indicator.indicator')),
+                ('area_areaid', models.ForeignKey(blank=True, db_column='area_areaid', null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='geography.area')),
+                ('date_published', models.DateTimeField()),
+                ('date_from', models.DateTimeField()),
+                ('date_until', models.DateTimeField()),
+                ('value', models.FloatField()),
+                ('is_forecast', models.CharField(max_length=1)),
+                ('created_at', models.DateTimeField(blank=True, db_comment='created_at of the row in publishes', null=True)),
+            ],
+            options={
+                'verbose_name': 'Latest publication',
+                'verbose_name_plural': 'Latest publications',
+                'db_table': 'publishes_latest',
+                'managed': False,
+            },
+        ),
+        run_postgres_sql([CREATE_TABLE_SQL, POPULATE_SQL], DROP_TABLE_SQL),
+    ]
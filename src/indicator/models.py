@@ -64,6 +64,33 @@ class Publishes(models.Model):
         ordering = ['-created_at']
 
 
+class LatestPublication(models.Model):
+    """
+    Latest vintage of every (institution, indicator, area, period) of publishes: the current forecast or
+    value. Maintained by the ETL load phase (see etl refresh_latest_publications).
+
+    """
+    pub_id = models.IntegerField(primary_key=True, db_comment='pub_id of the latest vintage in publishes')
+    inst_instid = models.ForeignKey(
+        Institution, models.DO_NOTHING, db_column='inst_instid', blank=True, null=True)
+    indic_indicid = models.ForeignKey(
+        Indicator, models.DO_NOTHING, db_column='indic_indicid', blank=True, null=True)
+    area_areaid = models.ForeignKey(
+        Area, models.DO_NOTHING, db_column='area_areaid', blank=True, null=True)
+    date_published = models.DateTimeField()
+    date_from = models.DateTimeField()
+    date_until = models.DateTimeField()
+    value = models.FloatField()
+    is_forecast = models.CharField(max_length=1)
+    created_at = models.DateTimeField(blank=True, null=True, db_comment='created_at of the row in publishes')
+
+    class Meta:
+        managed = False
+        db_table = 'publishes_latest'
+        verbose_name_plural = 'Latest publications'
+        verbose_name = 'Latest publication'
+
+
 class UnifiedIndicator(models.Model):
     uindicid = models.AutoField(
         primary_key=True, db_comment='Auto incremental')
@@ -0,0 +1,43 @@
+import json
+from functools import cached_property
+from typing import Optional
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+
+
+def estimated_count(queryset) -> Optional[int]:
+    """
+    Number of rows of the queryset estimated by the PostgreSQL planner (EXPLAIN), None on other databases.
+
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    except EmptyResultSet:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator of large tables. An exact COUNT(*) reads every matching row, so above EXACT_COUNT_LIMIT
+    rows the count (and thus the number of pages) is the planner's estimate: the last pages may be
+    missing or empty. Small results and other databases are counted exactly.
+
+    """
+    EXACT_COUNT_LIMIT = 10_000
+
+    @cached_property
+    def count(self) -> int:
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < self.EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
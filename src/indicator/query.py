@@ -0,0 +1,63 @@
+import datetime
+from django.utils.dateparse import parse_date
+
+# Projection of the query API: publishes columns with the codes of the related rows
+PUBLICATION_FIELDS = {
+    'pub_id': 'pub_id',
+    'institution': 'inst_instid__abbreviation',
+    'indicator': 'indic_indicid__abbreviation',
+    'area': 'area_areaid__code',
+    'date_published': 'date_published',
+    'date_from': 'date_from',
+    'date_until': 'date_until',
+    'value': 'value',
+    'is_forecast': 'is_forecast',
+}
+# Query parameter -> lookup of the filters
+LIST_FILTERS = {
+    'institution': 'inst_instid__abbreviation__in',
+    'indicator': 'indic_indicid__abbreviation__in',
+    'area': 'area_areaid__code__in',
+}
+DATE_FILTERS = {
+    'period_from': 'date_from__gte',
+    'period_until': 'date_until__lte',
+    'published': 'date_published',
+    'published_from': 'date_published__gte',
+    'published_until': 'date_published__lte',
+}
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _parse_date(name: str, value: str) -> datetime.datetime:
+    try:
+        date = parse_date(value)
+    except ValueError:
+        date = None
+    if date is None:
+        raise QueryError(f"Invalid {name} {value}, expected YYYY-MM-DD")
+    # Dates of publishes are stored as UTC midnights
+    return datetime.datetime.combine(date, datetime.time.min, tzinfo=datetime.timezone.utc)
+
+
+def publication_filters(params) -> dict:
+    """
+    Lookups of the query parameters (institution, indicator, area, period and vintage ranges, is_forecast),
+    shared by the query API and the exports. Raises QueryError on invalid values.
+
+    """
+    filters = {}
+    for name, lookup in LIST_FILTERS.items():
+        if params.get(name):
+            filters[lookup] = [value.strip() for value in params[name].split(',') if value.strip()]
+    for name, lookup in DATE_FILTERS.items():
+        if params.get(name):
+            filters[lookup] = _parse_date(name, params[name])
+    if params.get('is_forecast'):
+        if params['is_forecast'] not in ('Y', 'N'):
+            raise QueryError(f"Invalid is_forecast {params['is_forecast']}, expected Y or N")
+        filters['is_forecast'] = params['is_forecast']
+    return filters
@@ -1,3 +1,158 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+from django.contrib import admin
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from geography.models import Area
+from gphome.testing import TablesMixin
+from institution.models import Institution
+from .cache import invalidate_publications, publications_versions
+from .models import Indicator, LatestPublication, Publishes
 
-# Create your tests here.
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'indicator-tests'}}
+
+
+def utc(date: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(date).replace(tzinfo=datetime.timezone.utc)
+
+
+class PublicationsMixin(TablesMixin):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institutions = {code: Institution.objects.create(abbreviation=code, name=code) for code in ('OECD', 'IMF')}
+        cls.area = Area.objects.create(code='USA', name='United States')
+        cls.indicators = {code: Indicator.objects.create(inst_instid=institution, name='GDP', unit='%',
+                                                         abbreviation='GDP')
+                          for code, institution in cls.institutions.items()}
+        rows = [('OECD', '2024-01-01', 2.0, 'Y'), ('OECD', '2024-06-01', 2.2, 'Y'), ('OECD', '2024-07-01', 1.8, 'N'),
+                ('IMF', '2024-04-01', 2.1, 'Y')]
+        for institution, date_published, value, is_forecast in rows:
+            Publishes.objects.create(inst_instid=cls.institutions[institution], indic_indicid=cls.indicators[institution],
+                                     area_areaid=cls.area, date_published=utc(date_published),
+                                     date_from=utc('2025-01-01'), date_until=utc('2025-12-31'),
+                                     value=value, is_forecast=is_forecast)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, API_PAGE_SIZE=2, API_MAX_PAGE_SIZE=3)
+class PublicationsAPITests(PublicationsMixin, TestCase):
+
+    def setUp(self):
+        invalidate_publications()
+
+    def get(self, name: str, **params):
+        return self.client.get(reverse(name), params)
+
+    def test_filters(self):
+        response = self.get('publications', institution='OECD', is_forecast='Y', published_from='2024-03-01')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([(row['institution'], row['value'], row['is_forecast']) for row in results],
+                         [('OECD', 2.2, 'Y')])
+        self.assertEqual(results[0]['indicator'], 'GDP')
+        self.assertEqual(results[0]['area'], 'USA')
+
+    def test_pages(self):
+        response = self.get('publications')
+        page = response.json()
+        self.assertEqual(page['count'], 2)
+        self.assertIn('rel="next"', response['Link'])
+        after = page['results'][-1]['pub_id']
+        self.assertIn(f'after={after}', page['next'])
+        page = self.get('publications', after=after).json()
+        self.assertEqual(page['count'], 2)
+        self.assertIsNone(page['next'])
+        self.assertTrue(all(row['pub_id'] > after for row in page['results']))
+        # limit is capped by API_MAX_PAGE_SIZE
+        self.assertEqual(self.get('publications', limit=100).json()['count'], 3)
+
+    def test_csv(self):
+        response = self.get('publications', institution='IMF', format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(response.content.decode())))
+        self.assertEqual([(row['institution'], float(row['value'])) for row in rows], [('IMF', 2.1)])
+
+    def test_invalid_parameters(self):
+        for params in ({'format': 'xml'}, {'published_from': '2024-13-01'}, {'is_forecast': 'X'}, {'limit': '0'},
+                       {'after': 'last'}):
+            with self.subTest(**params):
+                response = self.get('publications', **params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_loads_invalidate_the_cached_pages(self):
+        self.assertEqual(self.get('publications', institution='IMF')['X-Cache'], 'miss')
+        self.assertEqual(self.get('publications', institution='IMF')['X-Cache'], 'hit')
+        # Loads of another institution leave the cached page
+        invalidate_publications(['OECD'])
+        self.assertEqual(self.get('publications', institution='IMF')['X-Cache'], 'hit')
+        Publishes.objects.create(inst_instid=self.institutions['IMF'], indic_indicid=self.indicators['IMF'],
+                                 area_areaid=self.area, date_published=utc('2024-10-01'),
+                                 date_from=utc('2025-01-01'), date_until=utc('2025-12-31'), value=2.3, is_forecast='Y')
+        invalidate_publications(['IMF'])
+        response = self.get('publications', institution='IMF')
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual([row['value'] for row in response.json()['results']], [2.1, 2.3])
+
+    def test_versions_of_the_unfiltered_and_filtered_pages(self):
+        # The queries over every institution have a single version, read without querying the database
+        with self.assertNumQueries(0):
+            versions = publications_versions()
+        invalidate_publications(['OECD'])
+        self.assertNotEqual(publications_versions(), versions)
+        versions = publications_versions(['IMF'])
+        invalidate_publications(['OECD'])
+        self.assertEqual(publications_versions(['IMF']), versions)
+        invalidate_publications()
+        self.assertNotEqual(publications_versions(['IMF']), versions)
+
+    def test_latest(self):
+        publication = Publishes.objects.get(inst_instid=self.institutions['OECD'], date_published=utc('2024-06-01'),
+                                            is_forecast='Y')
+        LatestPublication.objects.create(pub_id=publication.pub_id, inst_instid=publication.inst_instid,
+                                         indic_indicid=publication.indic_indicid, area_areaid=publication.area_areaid,
+                                         date_published=publication.date_published, date_from=publication.date_from,
+                                         date_until=publication.date_until, value=publication.value, is_forecast='Y')
+        results = self.get('latest_publications').json()['results']
+        self.assertEqual([(row['pub_id'], row['value']) for row in results], [(publication.pub_id, 2.2)])
+
+    def test_export(self):
+        response = self.get('publications_export', institution='OECD')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('publications.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(sorted(float(row['value']) for row in rows), [1.8, 2.0, 2.2])
+        self.assertEqual(self.get('publications_export', format='xml').status_code, 400)
+
+
+
+class PublishesAdminTests(PublicationsMixin, TestCase):
+
+    def setUp(self):
+        self.admin = admin.site._registry[Publishes]
+        self.request = RequestFactory().get('/')
+
+    def search(self, term: str):
+        queryset, _ = self.admin.get_search_results(self.request, Publishes.objects.all(), term)
+        return sorted(float(value) for value in queryset.values_list('value', flat=True))
+
+    def test_search_fields(self):
+        self.assertEqual(self.search('imf'), [2.1])
+        self.assertEqual(self.search('OECD USA GD'), [1.8, 2.0, 2.2])
+        # Institution and area codes match exactly, indicator codes by prefix
+        self.assertEqual(self.search('OE'), [])
+        self.assertEqual(self.search('GDPX'), [])
+
+    def test_date_hierarchy(self):
+        queryset = self.admin.get_queryset(self.request)
+        for kind in ('year', 'month', 'day'):
+            with self.subTest(kind=kind):
+                self.assertEqual(queryset.datetimes('date_published', kind, 'DESC'),
+                                 list(Publishes.objects.datetimes('date_published', kind, 'DESC')))
+        # Values are in the current time zone, 2024-01-01 UTC is still in 2023 in New York
+        with timezone.override('America/New_York'):
+            self.assertEqual([value.year for value in queryset.datetimes('date_published', 'year')], [2023, 2024])
+            self.assertEqual([(value.year, value.month) for value in queryset.datetimes('date_published', 'month')],
+                             [(2023, 12), (2024, 3), (2024, 5), (2024, 6)])
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('publications/', views.publications, name='publications'),
+    path('publications/latest/', views.latest_publications, name='latest_publications'),
+    path('publications/export/', views.publications_export, name='publications_export'),
+]
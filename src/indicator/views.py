@@ -1,3 +1,150 @@
-from django.shortcuts import render
+import csv
+import decimal
+import io
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from .cache import publications_versions, query_cache_key
+from .export import EXPORT_FORMATS, export_chunks, pa
+from .query import PUBLICATION_FIELDS, QueryError, publication_filters
+from .models import LatestPublication, Publishes
 
-# Create your views here.
+FORMATS = ('json', 'csv')
+
+
+class PublicationsEncoder(DjangoJSONEncoder):
+    # Values are numbers in the JSON output, not the strings DjangoJSONEncoder makes of decimals
+    def default(self, o):
+        if isinstance(o, decimal.Decimal):
+            return float(o)
+        return super().default(o)
+
+
+def _parse_int(name: str, value: str, minimum: int) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise QueryError(f"Invalid {name} {value}, expected an integer")
+    if number < minimum:
+        raise QueryError(f"Invalid {name} {value}, expected at least {minimum}")
+    return number
+
+
+def _page(params, model=Publishes) -> dict:
+    """
+    Runs the query of one page. Pages are delimited by pub_id (keyset pagination): the next page
+    starts after the last pub_id of this one, so deep pages cost as little as the first one.
+
+    """
+    after = _parse_int('after', params['after'], 0) if params.get('after') else 0
+    limit = min(_parse_int('limit', params['limit'], 1) if params.get('limit') else settings.API_PAGE_SIZE,
+                settings.API_MAX_PAGE_SIZE)
+    rows = list(model.objects
+                .filter(pub_id__gt=after, **publication_filters(params))
+                .order_by('pub_id')
+                .values_list(*PUBLICATION_FIELDS.values())[:limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    return {'rows': rows, 'next_after': rows[-1][0] if has_next else None}
+
+
+def _render(page: dict, output: str, next_url) -> tuple:
+    columns = list(PUBLICATION_FIELDS)
+    if output == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        writer.writerows(page['rows'])
+        return buffer.getvalue().encode(), 'text/csv; charset=utf-8'
+    payload = {
+        'count': len(page['rows']),
+        'next': next_url,
+        'results': [dict(zip(columns, row)) for row in page['rows']],
+    }
+    return json.dumps(payload, cls=PublicationsEncoder).encode(), 'application/json'
+
+
+def _query(request, model):
+    params = {name: request.GET.get(name) for name in request.GET}
+    output = params.pop('format', None) or 'json'
+    if output not in FORMATS:
+        return JsonResponse({'error': f"Invalid format {output}, expected {' or '.join(FORMATS)}"}, status=400)
+    institutions = [value.strip() for value in params['institution'].split(',')] if params.get('institution') else None
+    key = query_cache_key(request.path, {**params, 'format': output}, publications_versions(institutions))
+    cached = cache.get(key)
+    if cached is None:
+        try:
+            page = _page(params, model)
+        except QueryError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        next_url = None
+        if page['next_after'] is not None:
+            query = request.GET.copy()
+            query['after'] = page['next_after']
+            next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+        content, content_type = _render(page, output, next_url)
+        cached = {'content': content, 'content_type': content_type, 'next': next_url}
+        cache.set(key, cached, settings.API_CACHE_TIMEOUT)
+        status = 'miss'
+    else:
+        status = 'hit'
+    response = HttpResponse(cached['content'], content_type=cached['content_type'])
+    if cached['next']:
+        response['Link'] = f'<{cached["next"]}>; rel="next"'
+    response['X-Cache'] = status
+    return response
+
+
+@require_GET
+def publications(request):
+    """
+    Read-only query API over the publications (publishes), as JSON (default) or CSV (?format=csv).
+
+    Filters: institution, indicator and area (comma separated abbreviations/codes), period_from and
+    period_until (range of the periods), published, published_from and published_until (vintage)
+    and is_forecast (Y or N). Pages hold `limit` rows ordered by pub_id, the next one is requested
+    with after=<last pub_id> and linked from the response (next, Link header).
+
+    Responses are cached; the cache keys contain the versions of the queried institutions, which
+    are bumped by every ETL load (see indicator.cache).
+
+    """
+    return _query(request, Publishes)
+
+
+@require_GET
+def latest_publications(request):
+    """
+    Same API over the latest vintage of every institution, indicator, area and period (publishes_latest):
+    the current forecasts and values, read with an index lookup instead of a scan over every vintage.
+
+    """
+    return _query(request, LatestPublication)
+
+
+@require_GET
+def publications_export(request):
+    """
+    Streams every publication matching the filters of the query API as CSV (default) or Parquet
+    (?format=parquet), without pagination. The rows are read with a server-side cursor and written
+    as they arrive, so the memory used does not depend on the size of the export.
+
+    """
+    params = {name: request.GET.get(name) for name in request.GET}
+    output = params.pop('format', None) or 'csv'
+    if output not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"Invalid format {output}, expected {' or '.join(EXPORT_FORMATS)}"},
+                            status=400)
+    if output == 'parquet' and pa is None:
+        return JsonResponse({'error': "Parquet exports require pyarrow"}, status=400)
+    try:
+        filters = publication_filters(params)
+    except QueryError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    response = StreamingHttpResponse(export_chunks(filters, output),
+                                     content_type=EXPORT_FORMATS[output]['content_type'])
+    response['Content-Disposition'] = f'attachment; filename="publications{EXPORT_FORMATS[output]["suffix"]}"'
+    return response